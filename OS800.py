@@ -4,13 +4,12 @@ import base64
 from datetime import datetime, timedelta
 
 import pytz
-import numpy as np
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 from fpdf import FPDF
 from streamlit_option_menu import option_menu
-from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
+from st_aggrid import JsCode
 
 # =========================
 # Configs básicas
@@ -27,26 +26,44 @@ st.set_page_config(
 # =========================
 # Módulos internos
 # =========================
-from autenticacao import authenticate, add_user, is_admin, list_users, force_change_password
+from autenticacao import (
+    authenticate,
+    add_user,
+    is_admin,
+    list_users,
+    force_change_password,
+    set_role_claim,
+    clear_role_claim
+)
 from chamados import (
     add_chamado,
     get_chamado_by_protocolo,
-    list_chamados,
-    list_chamados_em_aberto,
+    get_chamado_by_id,
+    list_chamados_paginado,
+    preparar_fila_tecnicos,
+    contar_chamados,
+    COLUNAS_FILA_TECNICOS,
+    ORDENS_FILA,
     buscar_no_inventario_por_patrimonio,
     finalizar_chamado,
-    calculate_working_hours,
+    calculate_working_hours_array,
     reabrir_chamado
 )
 from inventario import (
     show_inventory_list,
     cadastro_maquina,
-    get_machines_from_inventory,
     dashboard_inventario
 )
 from ubs import get_ubs_list
 from setores import get_setores_list
 from estoque import manage_estoque, get_estoque
+from snapshot import garantir_snapshot, consultar, versao_dados
+from rollup import relatorio_filtrado, resumo_dashboard
+from exportacao import exportacao_sob_demanda, paginar_tabela, EXPORT_LOTE
+from instrumentacao import avisar_orcamento_pagina
+from metricas import medir_pagina, fase, painel_diagnostico
+from grade import exibir_grade
+from esquemas import tabela_chamados
 
 # =========================
 # Estado de sessão
@@ -168,12 +185,15 @@ def login_page():
     if st.button("Entrar", type="primary"):
         if not username or not password:
             st.error("Preencha todos os campos.")
-        elif authenticate(username, password):
-            st.success(f"Bem-vindo, {username}!")
-            st.session_state["logged_in"] = True
-            st.session_state["username"] = username
         else:
-            st.error("Usuário ou senha incorretos.")
+            role = authenticate(username, password)
+            if role:
+                st.success(f"Bem-vindo, {username}!")
+                st.session_state["logged_in"] = True
+                st.session_state["username"] = username
+                set_role_claim(username, role)
+            else:
+                st.error("Usuário ou senha incorretos.")
 
 # =========================
 # Página: Dashboard
@@ -183,66 +203,105 @@ def dashboard_page():
     agora_fortaleza = datetime.now(FORTALEZA_TZ)
     st.markdown(f"**Horário local (Fortaleza):** {agora_fortaleza.strftime('%d/%m/%Y %H:%M:%S')}")
 
-    chamados = list_chamados()
-    if not chamados:
+    # KPIs e tendências calculados no servidor (RPC dashboard_resumo): alguns KB por carga
+    try:
+        resumo = resumo_dashboard(48)
+    except Exception as e:
+        print(f"Erro ao carregar resumo do dashboard: {e}")
+        resumo = _resumo_dashboard_snapshot(48)
+    if not resumo.get("total"):
         st.info("Nenhum chamado registrado.")
         return
 
-    df = pd.DataFrame(chamados)
-    df["hora_abertura_dt"] = pd.to_datetime(df["hora_abertura"], format='%d/%m/%Y %H:%M:%S', errors='coerce')
-
-    total_chamados = len(df)
-    abertos = df["hora_fechamento"].isnull().sum()
-    fechados = df["hora_fechamento"].notnull().sum()
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Chamados", total_chamados)
-    col2.metric("Em Aberto", abertos)
-    col3.metric("Fechados", fechados)
-
-    # Atrasados (>48h úteis)
-    atrasados = 0
-    for c in chamados:
-        if c.get("hora_fechamento") is None:
-            try:
-                abertura = datetime.strptime(c["hora_abertura"], '%d/%m/%Y %H:%M:%S')
-                agora_local = datetime.now(FORTALEZA_TZ)
-                tempo_util = calculate_working_hours(abertura, agora_local)
-                if tempo_util > timedelta(hours=48):
-                    atrasados += 1
-            except:
-                pass
+    col1.metric("Total Chamados", int(resumo["total"]))
+    col2.metric("Em Aberto", int(resumo["abertos"]))
+    col3.metric("Fechados", int(resumo["fechados"]))
+
+    # Atrasados (SLA vencido; chamados sem prazo gravado contam a partir de 48h úteis)
+    atrasados = int(resumo.get("atrasados") or 0)
     if atrasados:
-        st.warning(f"Atenção: {atrasados} chamados abertos há mais de 48h úteis!")
+        st.warning(f"Atenção: {atrasados} chamados abertos com o SLA vencido!")
 
     # Tendência Mensal
-    df["mes"] = df["hora_abertura_dt"].dt.to_period("M").astype(str)
-    tendencia_mensal = df.groupby("mes").size().reset_index(name="qtd_mensal")
+    tendencia_mensal = pd.DataFrame(resumo.get("mensal") or [], columns=["mes", "qtd_mensal"])
     st.markdown("### Tendência de Chamados por Mês")
     if not tendencia_mensal.empty:
         fig_mensal = px.line(tendencia_mensal, x="mes", y="qtd_mensal", markers=True, title="Chamados por Mês")
-        st.plotly_chart(fig_mensal, use_container_width=True)
+        with fase("charts"):
+            st.plotly_chart(fig_mensal, use_container_width=True)
 
-    # Tendência Semanal
-    df["semana"] = df["hora_abertura_dt"].dt.to_period("W").astype(str)
-    tendencia_semanal = df.groupby("semana").size().reset_index(name="qtd_semanal")
-
-    def parse_ano_semana(semana_str):
-        try:
-            ano, wk = semana_str.split("-")
-            return (int(ano), int(wk))
-        except:
-            return (9999, 9999)
-
-    tendencia_semanal["ano_semana"] = tendencia_semanal["semana"].apply(parse_ano_semana)
-    tendencia_semanal.sort_values("ano_semana", inplace=True)
+    # Tendência Semanal (rótulo = segunda-feira da semana)
+    tendencia_semanal = pd.DataFrame(resumo.get("semanal") or [], columns=["semana", "qtd_semanal"])
     st.markdown("### Tendência de Chamados por Semana")
     if not tendencia_semanal.empty:
         fig_semanal = px.line(tendencia_semanal, x="semana", y="qtd_semanal", markers=True, title="Chamados por Semana")
-        st.plotly_chart(fig_semanal, use_container_width=True)
+        with fase("charts"):
+            st.plotly_chart(fig_semanal, use_container_width=True)
+
+def _resumo_dashboard_snapshot(limite_horas):
+    """
+    Mesmo formato de resumo_dashboard, calculado no snapshot local (DuckDB);
+    usado quando a RPC não está disponível (ex.: migração 007 ainda não aplicada).
+    """
+    garantir_snapshot()
+    contagens = consultar("""
+        select count(*) as total,
+               count(*) filter (where hora_fechamento is null) as abertos
+        from chamados
+    """)
+    if contagens.empty:
+        return {}
+    total, abertos = int(contagens.at[0, "total"]), int(contagens.at[0, "abertos"])
+    # Como em sql/008_sla_deadline.sql: sla_deadline vencido; sem prazo gravado, horas úteis > limite_horas
+    df_abertos = tabela_chamados(consultar("select * exclude (mes) from chamados where hora_fechamento is null"))
+    agora_local = datetime.now(FORTALEZA_TZ)
+    segundos_uteis = pd.Series(
+        calculate_working_hours_array(df_abertos["abertura_dt"], agora_local), index=df_abertos.index
+    )
+    prazo = df_abertos["sla_deadline"] if "sla_deadline" in df_abertos.columns else pd.Series(pd.NaT, index=df_abertos.index)
+    vencidos = (prazo < pd.Timestamp(agora_local.replace(tzinfo=None))).where(
+        prazo.notna(), segundos_uteis > limite_horas * 3600
+    )
+    mensal = consultar("""
+        select strftime(abertura_dt, '%Y-%m') as mes, count(*) as qtd_mensal
+        from chamados
+        where abertura_dt is not null
+        group by 1 order by 1
+    """)
+    semanal = consultar("""
+        select strftime(date_trunc('week', abertura_dt), '%Y-%m-%d') as semana, count(*) as qtd_semanal
+        from chamados
+        where abertura_dt is not null
+        group by 1 order by 1
+    """)
+    return {
+        "total": total,
+        "abertos": abertos,
+        "fechados": total - abertos,
+        "atrasados": int(vencidos.sum()),
+        "mensal": mensal.to_dict("records"),
+        "semanal": semanal.to_dict("records"),
+    }
 
 # =========================
 # Página: Abrir Chamado
 # =========================
+# Tipos de defeito oferecidos por tipo de máquina (também listados na configuração de SLA)
+TIPOS_DEFEITO = {
+    "Computador": [
+        "Computador não liga", "Computador lento", "Tela azul", "Sistema travando",
+        "Erro de disco", "Problema com atualização", "Desligamento inesperado",
+        "Problema com internet", "Problema com Wi-Fi", "Sem conexão de rede",
+        "Mouse não funciona", "Teclado não funciona"
+    ],
+    "Impressora": [
+        "Impressora não imprime", "Impressão borrada", "Toner vazio",
+        "Troca de toner", "Papel enroscado", "Erro de conexão com a impressora"
+    ],
+    "Outro": ["Solicitação de suporte geral", "Outros tipos de defeito"],
+}
+
 def abrir_chamado_page():
     st.subheader("Abrir Chamado Técnico")
     patrimonio = st.text_input("Número de Patrimônio (opcional)")
@@ -268,20 +327,7 @@ def abrir_chamado_page():
         setor = st.selectbox("Setor", get_setores_list())
         machine_type = st.selectbox("Tipo de Máquina", ["Computador", "Impressora", "Outro"])
 
-    if machine_type == "Computador":
-        defect_options = [
-            "Computador não liga", "Computador lento", "Tela azul", "Sistema travando",
-            "Erro de disco", "Problema com atualização", "Desligamento inesperado",
-            "Problema com internet", "Problema com Wi-Fi", "Sem conexão de rede",
-            "Mouse não funciona", "Teclado não funciona"
-        ]
-    elif machine_type == "Impressora":
-        defect_options = [
-            "Impressora não imprime", "Impressão borrada", "Toner vazio",
-            "Troca de toner", "Papel enroscado", "Erro de conexão com a impressora"
-        ]
-    else:
-        defect_options = ["Solicitação de suporte geral", "Outros tipos de defeito"]
+    defect_options = TIPOS_DEFEITO.get(machine_type, TIPOS_DEFEITO["Outro"])
 
     tipo_defeito = st.selectbox("Tipo de Defeito/Solicitação", defect_options)
     problema = st.text_area("Descreva o problema ou solicitação")
@@ -320,214 +366,167 @@ def buscar_chamado_page():
 # =========================
 # Página: Chamados Técnicos
 # =========================
+# Colunas da grade da fila e rótulos das ordenações (chamados.ORDENS_FILA)
+COLUNAS_GRADE_FILA = [
+    "protocolo", "ubs", "setor", "tipo_defeito", "problema",
+    "hora_abertura", "Prazo SLA", "Tempo Útil", "idade_uteis_h"
+]
+ROTULOS_ORDEM_FILA = {
+    "prazo": "Prazo SLA (em aberto, mais urgente)", "recentes": "Mais recentes", "antigos": "Mais antigos"
+}
+
 def chamados_tecnicos_page():
     st.subheader("Chamados Técnicos")
 
-    # Filtros principais
+    # Filtros principais (aplicados no servidor, sobre todos os chamados)
     colf1, colf2, colf3 = st.columns([1.2, 1, 1])
     with colf1:
         mostrar = st.radio("Mostrar", ["Todos", "Somente em aberto"], index=0, horizontal=True)
     with colf2:
-        apenas48 = st.toggle("Apenas >48h úteis", value=False)
+        apenas_vencidos = st.toggle("Apenas SLA vencido", value=False)
     with colf3:
-        priorizar48 = st.toggle("Priorizar >48h úteis", value=True)
-
-    # Fonte de dados
-    chamados = list_chamados_em_aberto() if mostrar == "Somente em aberto" else list_chamados()
+        ordem = st.selectbox("Ordenar por", list(ORDENS_FILA), format_func=ROTULOS_ORDEM_FILA.get)
+
+    colf4, colf5, colf6 = st.columns([1.2, 1, 1])
+    with colf4:
+        filtro_ubs = st.multiselect("UBS", get_ubs_list(), key="fila_ubs")
+    with colf5:
+        filtro_setor = st.multiselect("Setor", get_setores_list(), key="fila_setor")
+    with colf6:
+        por_pagina = st.selectbox("Chamados por página", [25, 50, 100], index=1)
+
+    # Fonte de dados: só a página visível, paginada por chave e ordenada no servidor.
+    # A pilha de cursores permite voltar páginas e recomeça quando filtros/ordem mudam.
+    # "SLA vencido" é filtrado no servidor pelo sla_deadline gravado em cada chamado
+    # A ordem por prazo considera só os chamados em aberto (como list_chamados_paginado)
+    status = "atrasados" if apenas_vencidos else ("abertos" if mostrar == "Somente em aberto" else None)
+    if ordem == "prazo" and status is None:
+        status = "abertos"
+    filtros = (status, tuple(filtro_ubs), tuple(filtro_setor), por_pagina, ordem)
+    if st.session_state.get("fila_filtros") != filtros:
+        st.session_state["fila_filtros"] = filtros
+        st.session_state["fila_cursores"] = [None]
+    cursores = st.session_state["fila_cursores"]
+
+    pagina = list_chamados_paginado(
+        COLUNAS_FILA_TECNICOS, status=status, ubs=filtro_ubs, setor=filtro_setor,
+        cursor=cursores[-1], limite=por_pagina, ordem=ordem
+    )
+    chamados = pagina["dados"]
     if not chamados:
-        st.success("Sem chamados em aberto 🎉" if mostrar == "Somente em aberto" else "Nenhum chamado encontrado.")
+        st.success("Sem chamados em aberto 🎉" if status else "Nenhum chamado encontrado.")
         return
 
-    df = pd.DataFrame(chamados)
-
-    # Helpers de status/tempo
-    def _eh_fechado(v):
-        return (pd.notna(v)) and (str(v).strip().lower() not in ("none", ""))
-
-    def _idade_uteis_h(row):
-        try:
-            ab = datetime.strptime(row["hora_abertura"], "%d/%m/%Y %H:%M:%S")
-            if _eh_fechado(row.get("hora_fechamento")):
-                fe = datetime.strptime(row["hora_fechamento"], "%d/%m/%Y %H:%M:%S")
-                delta = calculate_working_hours(ab, fe)
-            else:
-                agora_local = datetime.now(FORTALEZA_TZ)
-                delta = calculate_working_hours(ab, agora_local)
-            return round(delta.total_seconds() / 3600.0, 2)
-        except Exception:
-            return None
-
-    df["idade_uteis_h"] = df.apply(_idade_uteis_h, axis=1)
-
-    # Flag >48h úteis
-    df[">48h_uteis"] = df.apply(
-        lambda r: (not _eh_fechado(r.get("hora_fechamento"))) and r.get("idade_uteis_h") is not None and r["idade_uteis_h"] > 48,
-        axis=1
-    )
-
-    def _tempo_util_txt(row):
-        try:
-            ab = datetime.strptime(row["hora_abertura"], "%d/%m/%Y %H:%M:%S")
-            if _eh_fechado(row.get("hora_fechamento")):
-                fe = datetime.strptime(row["hora_fechamento"], "%d/%m/%Y %H:%M:%S")
-                return str(calculate_working_hours(ab, fe))
-            else:
-                return "Em aberto"
-        except Exception:
-            return "Erro"
-
-    df["Tempo Útil"] = df.apply(_tempo_util_txt, axis=1)
-
-    # Filtro >48h
-    if apenas48:
-        df = df[df[">48h_uteis"] == True]
-
-    # Ordenação
-    if priorizar48 and not df.empty:
-        df = df.sort_values(by=[">48h_uteis", "idade_uteis_h"], ascending=[False, False])
-    else:
-        if "hora_abertura" in df.columns:
-            try:
-                _ab = pd.to_datetime(df["hora_abertura"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
-                df = df.assign(_ab=_ab).sort_values("_ab", ascending=False).drop(columns=["_ab"])
-            except Exception:
-                pass
-
-    # Métricas
-    total = len(df)
-    atrasados = int(df[">48h_uteis"].sum())
-    c1, c2 = st.columns(2)
-    c1.metric("Total listados", total)
-    c2.metric("Abertos >48h úteis", atrasados)
-
-    # Reorganiza colunas úteis primeiro
-    prefer = [c for c in ["protocolo", "ubs", "setor", "tipo_defeito", "problema",
-                          "hora_abertura", "Tempo Útil", "idade_uteis_h", ">48h_uteis", "hora_fechamento", "id"] if c in df.columns]
-    others = [c for c in df.columns if c not in prefer]
-    df = df[prefer + others].copy()
-
-    # Tipos serializáveis pro AgGrid
-    if "idade_uteis_h" in df.columns:
-        df["idade_uteis_h"] = pd.to_numeric(df["idade_uteis_h"], errors="coerce")
-    if ">48h_uteis" in df.columns:
-        df[">48h_uteis"] = df[">48h_uteis"].fillna(False).astype(bool)
-    if "Tempo Útil" in df.columns:
-        df["Tempo Útil"] = df["Tempo Útil"].astype(str)
-
-    # Grid
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_default_column(filter=True, sortable=True, resizable=True, wrapText=True,
-                                autoHeight=True, minColumnWidth=180, flex=1)
-    gb.configure_column("problema", minColumnWidth=320)
-    gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=10)
-
-    # Destaque visual pra >48h
+    # Status/tempo útil calculados de uma vez para todas as linhas
+    df = preparar_fila_tecnicos(tabela_chamados(chamados))
+
+    # Métricas (contagens feitas no servidor, sem baixar as linhas)
+    total = contar_chamados(status=status, ubs=filtro_ubs, setor=filtro_setor)
+    em_aberto = total if status == "abertos" else contar_chamados(status="abertos", ubs=filtro_ubs, setor=filtro_setor)
+    atrasados = total if status == "atrasados" else contar_chamados(status="atrasados", ubs=filtro_ubs, setor=filtro_setor)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Total (filtros)", total)
+    c2.metric("Em aberto", em_aberto)
+    c3.metric("SLA vencido", atrasados)
+
+    # Grade: só a página e as colunas exibidas; o problema vai truncado e o
+    # chamado completo é carregado ao selecionar a linha
+    df["idade_uteis_h"] = pd.to_numeric(df["idade_uteis_h"], errors="coerce")
+    df["sla_vencido"] = df["sla_vencido"].fillna(False).astype(bool)
+    df["Tempo Útil"] = df["Tempo Útil"].astype(str)
+
+    # Destaque visual pra SLA vencido
     get_row_style = JsCode("""
         function(params) {
-            if (params.data && params.data[">48h_uteis"] === true) {
+            if (params.data && params.data["sla_vencido"] === true) {
                 return { 'background': '#ffe6e6' };
             }
             return null;
         }
     """)
-    gb.configure_grid_options(getRowStyle=get_row_style)
-
-    grid_options = gb.build()
-    grid_options["domLayout"] = "normal"
-
-    AgGrid(
-        df,
-        gridOptions=grid_options,
-        enable_enterprise_modules=False,
-        theme="streamlit",
-        height=460,
-        allow_unsafe_jscode=True,
+    st.caption("Selecione um chamado na tabela para ver os detalhes, finalizar ou reabrir.")
+    id_selecionado = exibir_grade(
+        df, COLUNAS_GRADE_FILA, "id", truncadas=("problema",), ocultas=("sla_vencido",),
+        fixada="protocolo", estilo_linha=get_row_style, key=f"fila_grade_{len(cursores)}"
     )
 
-    # ===== Finalizar Chamado (por PROTOCOLO)
-    if mostrar == "Somente em aberto":
-        df_aberto = df.copy()
-    else:
-        df_aberto = df[df["Tempo Útil"] == "Em aberto"]
+    # Navegação entre páginas
+    def _pagina_anterior():
+        if len(st.session_state["fila_cursores"]) > 1:
+            st.session_state["fila_cursores"].pop()
 
-    if df_aberto.empty:
-        st.write("Não há chamados abertos para finalizar.")
-    else:
+    def _proxima_pagina():
+        st.session_state["fila_cursores"].append(pagina["proximo_cursor"])
+
+    n1, n2, n3 = st.columns([1, 1, 4])
+    n1.button("◀ Anterior", on_click=_pagina_anterior, disabled=len(cursores) <= 1)
+    n2.button("Próxima ▶", on_click=_proxima_pagina, disabled=pagina["proximo_cursor"] is None)
+    n3.caption(f"Página {len(cursores)} de {max(1, -(-total // por_pagina))}")
+
+    if id_selecionado is None:
+        return
+    chamado = get_chamado_by_id(int(id_selecionado))
+    if not chamado:
+        return
+    chamado_id = chamado["id"]
+
+    # ===== Detalhe do chamado selecionado
+    st.markdown(f"### Chamado {chamado.get('protocolo')}")
+    d1, d2, d3 = st.columns(3)
+    d1.write(f"**UBS / Setor:** {chamado.get('ubs')} / {chamado.get('setor')}")
+    d2.write(f"**Tipo:** {chamado.get('tipo_defeito')}")
+    d3.write(f"**Aberto por:** {chamado.get('username') or '—'}")
+    if chamado.get("patrimonio"):
+        st.write(f"**Patrimônio:** {chamado['patrimonio']}")
+    st.write(f"**Problema:** {chamado.get('problema') or '(sem descrição)'}")
+
+    if not chamado.get("hora_fechamento"):
+        # ===== Finalizar Chamado
         st.markdown("### Finalizar Chamado Técnico")
-        protos_abertos = df_aberto["protocolo"].astype(str).tolist() if "protocolo" in df_aberto.columns else []
-        if protos_abertos:
-            protocolo_escolhido = st.selectbox("Selecione o PROTOCOLO para finalizar", protos_abertos)
-            sel = df_aberto[df_aberto["protocolo"].astype(str) == str(protocolo_escolhido)]
-            if sel.empty:
-                st.error("Protocolo não encontrado na lista atual.")
-            else:
-                row = sel.iloc[0]
-                try:
-                    chamado_id = int(row["id"]) if "id" in row and pd.notna(row["id"]) else None
-                except Exception:
-                    chamado_id = None
-
-                st.write(f"Problema: {row.get('problema','(sem descrição)')}")
-
-                # Opções de solução
-                if "impressora" in str(row.get("tipo_defeito","")).lower():
-                    solucao_options = [
-                        "Limpeza e recalibração da impressora",
-                        "Substituição de cartucho/toner",
-                        "Verificação de conexão e drivers",
-                        "Reinicialização da impressora"
-                    ]
-                else:
-                    solucao_options = [
-                        "Reinicialização do sistema",
-                        "Atualização de drivers/software",
-                        "Substituição de componente (ex.: SSD, Fonte, Memória)",
-                        "Verificação de vírus/malware",
-                        "Limpeza física e manutenção preventiva",
-                        "Reinstalação do sistema operacional",
-                        "Atualização do BIOS/firmware",
-                        "Verificação e limpeza de superaquecimento",
-                        "Otimização de configurações do sistema",
-                        "Reset da BIOS"
-                    ]
-                solucao_selecionada = st.selectbox("Selecione a solução", solucao_options)
-                solucao_complementar = st.text_area("Detalhes adicionais (opcional)")
-                comentarios = st.text_area("Comentários (opcional)")
-
-                # Peças usadas
-                estoque_data = get_estoque()
-                pieces_list = [item["nome"] for item in estoque_data] if estoque_data else []
-                pecas_selecionadas = st.multiselect("Peças utilizadas (se houver)", pieces_list)
-
-                if st.button("Finalizar Chamado", type="primary"):
-                    if not chamado_id:
-                        st.error("Não foi possível identificar o ID interno do chamado.")
-                    else:
-                        solucao_final = solucao_selecionada + (f" - {solucao_complementar}" if solucao_complementar else "")
-                        if comentarios:
-                            solucao_final += f" | Comentários: {comentarios}"
-                        finalizar_chamado(chamado_id, solucao_final, pecas_usadas=pecas_selecionadas)
-
-    # ===== Reabrir Chamado (por PROTOCOLO) — somente quando mostrando “Todos”
-    df_fechado = df[df["Tempo Útil"] != "Em aberto"] if mostrar == "Todos" else pd.DataFrame()
-    if not df_fechado.empty and "protocolo" in df_fechado.columns:
+
+        # Opções de solução
+        if "impressora" in str(chamado.get("tipo_defeito", "")).lower():
+            solucao_options = [
+                "Limpeza e recalibração da impressora",
+                "Substituição de cartucho/toner",
+                "Verificação de conexão e drivers",
+                "Reinicialização da impressora"
+            ]
+        else:
+            solucao_options = [
+                "Reinicialização do sistema",
+                "Atualização de drivers/software",
+                "Substituição de componente (ex.: SSD, Fonte, Memória)",
+                "Verificação de vírus/malware",
+                "Limpeza física e manutenção preventiva",
+                "Reinstalação do sistema operacional",
+                "Atualização do BIOS/firmware",
+                "Verificação e limpeza de superaquecimento",
+                "Otimização de configurações do sistema",
+                "Reset da BIOS"
+            ]
+        solucao_selecionada = st.selectbox("Selecione a solução", solucao_options)
+        solucao_complementar = st.text_area("Detalhes adicionais (opcional)")
+        comentarios = st.text_area("Comentários (opcional)")
+
+        # Peças usadas
+        estoque_data = get_estoque()
+        pieces_list = [item["nome"] for item in estoque_data] if estoque_data else []
+        pecas_selecionadas = st.multiselect("Peças utilizadas (se houver)", pieces_list)
+
+        if st.button("Finalizar Chamado", type="primary"):
+            solucao_final = solucao_selecionada + (f" - {solucao_complementar}" if solucao_complementar else "")
+            if comentarios:
+                solucao_final += f" | Comentários: {comentarios}"
+            finalizar_chamado(chamado_id, solucao_final, pecas_usadas=pecas_selecionadas)
+    else:
+        # ===== Reabrir Chamado
+        st.write(f"**Fechado em:** {chamado.get('hora_fechamento')}")
+        st.write(f"**Solução:** {chamado.get('solucao') or '—'}")
         st.markdown("### Reabrir Chamado Técnico")
-        protos_fechados = df_fechado["protocolo"].astype(str).tolist()
-        protocolo_fechado = st.selectbox("Selecione o PROTOCOLO para reabrir", protos_fechados)
-        sel_f = df_fechado[df_fechado["protocolo"].astype(str) == str(protocolo_fechado)]
-        if not sel_f.empty:
-            row_f = sel_f.iloc[0]
-            try:
-                chamado_fechado_id = int(row_f["id"]) if "id" in row_f and pd.notna(row_f["id"]) else None
-            except Exception:
-                chamado_fechado_id = None
-
-            remover_hist = st.checkbox("Remover registro de manutenção criado no fechamento anterior?", value=False)
-            if st.button("Reabrir Chamado"):
-                if not chamado_fechado_id:
-                    st.error("Não foi possível identificar o ID interno do chamado.")
-                else:
-                    reabrir_chamado(chamado_fechado_id, remover_historico=remover_hist)
+        remover_hist = st.checkbox("Remover registro de manutenção criado no fechamento anterior?", value=False)
+        if st.button("Reabrir Chamado"):
+            reabrir_chamado(chamado_id, remover_historico=remover_hist)
 
 # =========================
 # Página: Inventário
@@ -555,7 +554,8 @@ def administracao_page():
     st.subheader("Administração")
     admin_option = st.selectbox(
         "Opções de Administração",
-        ["Cadastro de Usuário", "Gerenciar UBSs", "Gerenciar Setores", "Lista de Usuários", "Redefinir Senha de Usuário"]
+        ["Cadastro de Usuário", "Gerenciar UBSs", "Gerenciar Setores", "SLA por Tipo de Defeito", "Lista de Usuários",
+         "Redefinir Senha de Usuário", "Diagnóstico de Desempenho"]
     )
     if admin_option == "Cadastro de Usuário":
         novo_user = st.text_input("Novo Usuário")
@@ -572,6 +572,9 @@ def administracao_page():
     elif admin_option == "Gerenciar Setores":
         from setores import manage_setores
         manage_setores()
+    elif admin_option == "SLA por Tipo de Defeito":
+        from sla import manage_sla
+        manage_sla([t for tipos in TIPOS_DEFEITO.values() for t in tipos])
     elif admin_option == "Lista de Usuários":
         usuarios = list_users()
         if usuarios:
@@ -588,12 +591,12 @@ def administracao_page():
                 st.success("Senha redefinida!")
             else:
                 st.error("Falha ao redefinir senha.")
+    elif admin_option == "Diagnóstico de Desempenho":
+        painel_diagnostico()
 
 # =========================
 # Página: Relatórios (2.0)
 # =========================
-import io
-
 def relatorios_page():
     st.subheader("Relatórios 2.0")
 
@@ -636,80 +639,30 @@ def relatorios_page():
             st.error("Data início não pode ser maior que data fim.")
             return
 
-    # ---------- Carrega chamados ----------
-    chamados = list_chamados()
-    if not chamados:
-        st.info("Nenhum chamado encontrado.")
-        return
-
-    df = pd.DataFrame(chamados).copy()
-
-    # Convertendo datas (strings dd/mm/yyyy HH:MM:SS)
-    df["abertura_dt"] = pd.to_datetime(df["hora_abertura"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
-    df["fechamento_dt"] = pd.to_datetime(df["hora_fechamento"], format="%d/%m/%Y %H:%M:%S", errors="coerce")
-
-    # Filtro por período (baseado na abertura)
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt = datetime.combine(end_date, datetime.max.time())
-    df = df[(df["abertura_dt"] >= start_dt) & (df["abertura_dt"] <= end_dt)]
-
-    # Filtros UBS/Setor
-    if filtro_ubs:
-        df = df[df["ubs"].isin(filtro_ubs)]
-    if filtro_setor:
-        df = df[df["setor"].isin(filtro_setor)]
-
-    if df.empty:
+    # ---------- Relatório (snapshot local + rollup; cache por filtros e versão dos dados) ----------
+    # Voltar a uma combinação de filtros já vista, sem gravações em chamados desde
+    # então, serve o resultado do cache (rollup.relatorio_filtrado)
+    garantir_snapshot()
+    resultado = relatorio_filtrado(
+        start_date, end_date, tuple(sorted(filtro_ubs)), tuple(sorted(filtro_setor)), sla_horas, versao_dados()
+    )
+    if resultado is None:
         st.warning("Sem dados para os filtros selecionados.")
         return
-
-    # ---------- Cálculos de SLA / tempos ----------
-    def _tempo_uteis_seg(row):
-        try:
-            ab = datetime.strptime(row["hora_abertura"], "%d/%m/%Y %H:%M:%S")
-            if pd.notna(row["fechamento_dt"]):
-                fe = row["fechamento_dt"].to_pydatetime()
-                delta = calculate_working_hours(ab, fe)
-                return delta.total_seconds()
-            return np.nan
-        except Exception:
-            return np.nan
-
-    def _idade_uteis_h(row):
-        try:
-            ab = datetime.strptime(row["hora_abertura"], "%d/%m/%Y %H:%M:%S")
-            fim = row["fechamento_dt"].to_pydatetime() if pd.notna(row["fechamento_dt"]) else datetime.now(FORTALEZA_TZ)
-            delta = calculate_working_hours(ab, fim)
-            return round(delta.total_seconds() / 3600.0, 2)
-        except Exception:
-            return np.nan
-
-    df["tempo_uteis_seg"] = df.apply(_tempo_uteis_seg, axis=1)
-    df["idade_uteis_h"] = df.apply(_idade_uteis_h, axis=1)
-    df["em_aberto"] = df["fechamento_dt"].isna()
-    df["dentro_sla"] = (~df["em_aberto"]) & (df["tempo_uteis_seg"] <= sla_horas * 3600)
-
-    # ---------- KPIs ----------
-    total = len(df)
-    abertos = int(df["em_aberto"].sum())
-    fechados = total - abertos
-
-    tma_h = None
-    mediana_h = None
-    if fechados > 0:
-        tma_h = (df.loc[~df["em_aberto"], "tempo_uteis_seg"].mean() or 0) / 3600
-        mediana_h = (df.loc[~df["em_aberto"], "tempo_uteis_seg"].median() or 0) / 3600
-    pct_sla = (df.loc[~df["em_aberto"], "dentro_sla"].mean() * 100) if fechados > 0 else 0.0
-    backlog_sla = int(((df["em_aberto"]) & (df["idade_uteis_h"] > sla_horas)).sum())
+    rel, rollup_disponivel = resultado
+    if not rollup_disponivel:
+        st.caption("Rollup indisponível; agregados calculados a partir dos chamados filtrados.")
+    sem_ab, sem_fe, heat = rel.aberturas_semana, rel.fechamentos_semana, rel.heatmap
+    top_ubs, top_setor, pvt = rel.top_ubs, rel.top_setor, rel.pivot_ubs_mes
 
     k1, k2, k3, k4, k5 = st.columns(5)
-    k1.metric("Total", total)
-    k2.metric("Abertos", abertos)
-    k3.metric("Fechados", fechados)
-    k4.metric("TMA (média útil)", f"{tma_h:.1f} h" if tma_h is not None else "—")
-    k5.metric("% dentro do SLA", f"{pct_sla:.0f}%")
+    k1.metric("Total", rel.total)
+    k2.metric("Abertos", rel.abertos)
+    k3.metric("Fechados", rel.fechados)
+    k4.metric("TMA (média útil)", f"{rel.tma_h:.1f} h" if rel.tma_h is not None else "—")
+    k5.metric("% dentro do SLA", f"{rel.pct_sla:.0f}%")
 
-    st.caption(f"Backlog acima do SLA: **{backlog_sla}** chamados (> {sla_horas}h úteis).")
+    st.caption(f"Backlog acima do SLA: **{rel.backlog_sla}** chamados (> {sla_horas}h úteis).")
 
     st.divider()
 
@@ -717,22 +670,19 @@ def relatorios_page():
     colT1, colT2 = st.columns(2)
     with colT1:
         st.markdown("**Aberturas por semana**")
-        df["semana"] = df["abertura_dt"].dt.to_period("W").astype(str)
-        sem_ab = df.groupby("semana").size().reset_index(name="qtd")
         if not sem_ab.empty:
             fig1 = px.line(sem_ab, x="semana", y="qtd", markers=True)
-            st.plotly_chart(fig1, use_container_width=True)
+            with fase("charts"):
+                st.plotly_chart(fig1, use_container_width=True)
         else:
             st.info("Sem dados.")
 
     with colT2:
         st.markdown("**Fechamentos por semana**")
-        tmp = df.dropna(subset=["fechamento_dt"]).copy()
-        tmp["semana"] = tmp["fechamento_dt"].dt.to_period("W").astype(str)
-        sem_fe = tmp.groupby("semana").size().reset_index(name="qtd")
         if not sem_fe.empty:
             fig2 = px.line(sem_fe, x="semana", y="qtd", markers=True)
-            st.plotly_chart(fig2, use_container_width=True)
+            with fase("charts"):
+                st.plotly_chart(fig2, use_container_width=True)
         else:
             st.info("Sem dados.")
 
@@ -740,20 +690,10 @@ def relatorios_page():
 
     # ---------- Heatmap: Dia x Hora das aberturas ----------
     st.markdown("**Heatmap de Aberturas (dia x hora)**")
-    mapa = df.copy()
-    mapa["dia_semana"] = mapa["abertura_dt"].dt.day_name()
-    mapa["hora"] = mapa["abertura_dt"].dt.hour
-    ordem = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
-    nomes_pt = {
-        "Monday":"Segunda","Tuesday":"Terça","Wednesday":"Quarta",
-        "Thursday":"Quinta","Friday":"Sexta","Saturday":"Sábado","Sunday":"Domingo"
-    }
-    mapa["dia_semana"] = pd.Categorical(mapa["dia_semana"], categories=ordem, ordered=True)
-    heat = mapa.pivot_table(index="dia_semana", columns="hora", values="id", aggfunc="count", fill_value=0)
-    heat.index = [nomes_pt[str(x)] for x in heat.index]
     if not heat.empty:
         fig_hm = px.imshow(heat, aspect="auto", title="", labels=dict(x="Hora do dia", y="Dia da semana", color="Aberturas"))
-        st.plotly_chart(fig_hm, use_container_width=True)
+        with fase("charts"):
+            st.plotly_chart(fig_hm, use_container_width=True)
     else:
         st.info("Sem dados para heatmap.")
 
@@ -763,84 +703,44 @@ def relatorios_page():
     colR1, colR2 = st.columns(2)
     with colR1:
         st.markdown("**Top UBS (aberturas)**")
-        if "ubs" in df.columns:
-            top_ubs = df.groupby("ubs").size().reset_index(name="qtd").sort_values("qtd", ascending=False).head(15)
-            st.dataframe(top_ubs, use_container_width=True)
-            fig_ubs = px.bar(top_ubs, x="ubs", y="qtd")
-            fig_ubs.update_layout(xaxis_title=None, yaxis_title="Chamados")
+        st.dataframe(top_ubs, use_container_width=True)
+        fig_ubs = px.bar(top_ubs, x="ubs", y="qtd")
+        fig_ubs.update_layout(xaxis_title=None, yaxis_title="Chamados")
+        with fase("charts"):
             st.plotly_chart(fig_ubs, use_container_width=True)
-        else:
-            st.info("Coluna 'ubs' não encontrada.")
 
     with colR2:
         st.markdown("**Top Setores (aberturas)**")
-        if "setor" in df.columns:
-            top_setor = df.groupby("setor").size().reset_index(name="qtd").sort_values("qtd", ascending=False).head(15)
-            st.dataframe(top_setor, use_container_width=True)
-            fig_setor = px.bar(top_setor, x="setor", y="qtd")
-            fig_setor.update_layout(xaxis_title=None, yaxis_title="Chamados")
+        st.dataframe(top_setor, use_container_width=True)
+        fig_setor = px.bar(top_setor, x="setor", y="qtd")
+        fig_setor.update_layout(xaxis_title=None, yaxis_title="Chamados")
+        with fase("charts"):
             st.plotly_chart(fig_setor, use_container_width=True)
-        else:
-            st.info("Coluna 'setor' não encontrada.")
 
     st.divider()
 
     # ---------- Pivot UBS x Mês ----------
     st.markdown("**UBS x Mês (aberturas)**")
-    df["mes"] = df["abertura_dt"].dt.to_period("M").astype(str)
-    if "ubs" in df.columns:
-        pvt = df.pivot_table(index="ubs", columns="mes", values="id", aggfunc="count", fill_value=0)
-        st.dataframe(pvt, use_container_width=True)
-    else:
-        st.info("Coluna 'ubs' não encontrada.")
+    st.dataframe(pvt, use_container_width=True)
 
     st.divider()
 
     # ---------- Exportações ----------
     st.markdown("### Exportar dados filtrados")
-    # CSV
-    csv_bytes = df.to_csv(index=False).encode("utf-8")
-    st.download_button("Baixar CSV", data=csv_bytes, file_name="chamados_filtrados.csv", mime="text/csv")
-
-    # Excel com abas úteis
-    with io.BytesIO() as buffer:
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Chamados")
-            if 'top_ubs' in locals():
-                top_ubs.to_excel(writer, index=False, sheet_name="Top_UBS")
-            if 'top_setor' in locals():
-                top_setor.to_excel(writer, index=False, sheet_name="Top_Setores")
-            if 'sem_ab' in locals():
-                sem_ab.to_excel(writer, index=False, sheet_name="Aberturas_Semana")
-            if 'sem_fe' in locals():
-                sem_fe.to_excel(writer, index=False, sheet_name="Fechamentos_Semana")
-            if 'pvt' in locals():
-                pvt.to_excel(writer, sheet_name="Pivot_UBS_Mes")
-        xlsx_data = buffer.getvalue()
-    st.download_button("Baixar Excel", data=xlsx_data, file_name="relatorio_chamados.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    # Os chamados saem em blocos; os agregados pequenos viram abas extras no Excel
+    exportacao_sob_demanda("rel_export", "relatorio_chamados", lambda: rel.abas_excel(EXPORT_LOTE))
 
 # =========================
 # Página: Exportar Dados
 # =========================
 def exportar_dados_page():
     st.subheader("Exportar Dados")
-    st.markdown("### Exportar Chamados em CSV")
-    chamados = list_chamados()
-    if chamados:
-        df_chamados = pd.DataFrame(chamados)
-        csv_chamados = df_chamados.to_csv(index=False).encode("utf-8")
-        st.download_button("Baixar Chamados CSV", data=csv_chamados, file_name="chamados.csv", mime="text/csv")
-    else:
-        st.write("Nenhum chamado para exportar.")
-
-    st.markdown("### Exportar Inventário em CSV")
-    inventario_data = get_machines_from_inventory()
-    if inventario_data:
-        df_inv = pd.DataFrame(inventario_data)
-        csv_inv = df_inv.to_csv(index=False).encode("utf-8")
-        st.download_button("Baixar Inventário CSV", data=csv_inv, file_name="inventario.csv", mime="text/csv")
-    else:
-        st.write("Nenhum item de inventário para exportar.")
+    st.caption("As tabelas são lidas do banco em lotes e gravadas direto no arquivo, sem carregar tudo em memória.")
+    st.markdown("### Exportar Chamados")
+    exportacao_sob_demanda("exp_chamados", "chamados", lambda: {"Chamados": paginar_tabela("chamados")})
+
+    st.markdown("### Exportar Inventário")
+    exportacao_sob_demanda("exp_inventario", "inventario", lambda: {"Inventario": paginar_tabela("inventario")})
 
 # =========================
 # Página: Sair
@@ -848,6 +748,7 @@ def exportar_dados_page():
 def sair_page():
     st.session_state["logged_in"] = False
     st.session_state["username"] = ""
+    clear_role_claim()
     st.success("Você saiu.")
 
 # =========================
@@ -868,7 +769,9 @@ pages = {
 }
 
 if selected in pages:
-    pages[selected]()
+    with medir_pagina(selected) as registro_pagina:
+        pages[selected]()
+    avisar_orcamento_pagina(registro_pagina)
 else:
     st.write("Página não encontrada.")
 
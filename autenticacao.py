@@ -1,16 +1,28 @@
 # autenticacao.py
 
+import os
+import time
+
 import bcrypt
+import streamlit as st
 from supabase_client import supabase
 
+# Validade (segundos) da role guardada na sessão antes de ser relida do banco
+ROLE_CLAIM_TTL = int(os.getenv("ROLE_CLAIM_TTL", "900"))
+
+# username -> instante da última alteração de role/remoção feita neste processo.
+# Claims emitidos antes disso deixam de valer em todas as sessões.
+_role_changed_at = {}
+
 def authenticate(username, password):
     """
     Verifica se 'username' existe na tabela 'usuarios' do Supabase
     e se a senha 'password' confere com o hash armazenado (bcrypt).
-    Retorna True se autenticar, False caso contrário.
+    A role é lida na mesma consulta do hash.
+    Retorna a role ('admin' ou 'user') se autenticar, None caso contrário.
     """
     try:
-        resp = supabase.table("usuarios").select("password").eq("username", username).execute()
+        resp = supabase.table("usuarios").select("password, role").eq("username", username).execute()
         data = resp.data
         if data:
             stored = data[0]['password']  # Hash armazenado como string
@@ -19,11 +31,53 @@ def authenticate(username, password):
                 stored = stored.encode('utf-8')
             # Verifica a senha
             if bcrypt.checkpw(password.encode('utf-8'), stored):
-                return True
-        return False
+                return data[0].get('role') or 'user'
+        return None
     except Exception as e:
         print(f"Erro na autenticação: {e}")
-        return False
+        return None
+
+def set_role_claim(username, role):
+    """
+    Guarda na sessão a role verificada do usuário logado, com prazo de validade.
+    """
+    agora = time.time()
+    st.session_state["role_claim"] = {
+        "username": username,
+        "role": role,
+        "issued_at": agora,
+        "expires_at": agora + ROLE_CLAIM_TTL,
+    }
+
+def clear_role_claim():
+    st.session_state.pop("role_claim", None)
+
+def _get_valid_claim(username):
+    claim = st.session_state.get("role_claim")
+    if not claim or claim.get("username") != username:
+        return None
+    if time.time() >= claim["expires_at"]:
+        return None
+    if claim["issued_at"] <= _role_changed_at.get(username, 0):
+        return None
+    return claim
+
+def _revoke_role_claims(username):
+    _role_changed_at[username] = time.time()
+
+def get_role(username):
+    """
+    Retorna a role do usuário. Usa o claim da sessão enquanto ele for válido;
+    caso contrário consulta a tabela 'usuarios' e renova o claim da sessão.
+    """
+    claim = _get_valid_claim(username)
+    if claim:
+        return claim["role"]
+    resp = supabase.table("usuarios").select("role").eq("username", username).execute()
+    role = resp.data[0]['role'] if resp.data else None
+    if role and st.session_state.get("username") == username:
+        set_role_claim(username, role)
+    return role
 
 def add_user(username, password, is_admin=False):
     """
@@ -55,11 +109,7 @@ def is_admin(username):
     Retorna True se o usuário tiver role='admin', caso contrário False.
     """
     try:
-        resp = supabase.table("usuarios").select("role").eq("username", username).execute()
-        data = resp.data
-        if data and data[0]['role'] == 'admin':
-            return True
-        return False
+        return get_role(username) == 'admin'
     except Exception as e:
         print(f"Erro ao verificar admin: {e}")
         return False
@@ -82,6 +132,7 @@ def remove_user(admin_username, target_username):
     if is_admin(admin_username):
         try:
             supabase.table("usuarios").delete().eq("username", target_username).execute()
+            _revoke_role_claims(target_username)
             print(f"Usuário '{target_username}' removido.")
             return True
         except Exception as e:
@@ -100,6 +151,7 @@ def update_user_role(admin_username, target_username, new_role):
         return False
     try:
         supabase.table("usuarios").update({"role": new_role}).eq("username", target_username).execute()
+        _revoke_role_claims(target_username)
         print(f"Função do usuário '{target_username}' atualizada para '{new_role}'.")
         return True
     except Exception as e:
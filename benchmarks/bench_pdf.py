@@ -0,0 +1,59 @@
+# benchmarks/bench_pdf.py — tempo e memória do PDF de inventário por número de linhas
+#
+# Uso: python benchmarks/bench_pdf.py [linhas ...]
+#      (padrão: 1000 5000 20000; imprime um JSON por tamanho)
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inventario_pdf import PDF, gerar_relatorio_inventario_pdf  # noqa: E402
+from gerador import gerar_inventario, gerar_ubs  # noqa: E402
+
+
+def gerar_pdf_legado(df_inventario):
+    """
+    Implementação anterior (iterrows célula a célula), mantida só para comparação.
+    """
+    pdf = PDF(orientation="L", format="A4", logo_path="infocustec.png")
+    pdf.add_page()
+    pdf.set_font("Arial", "", 10)
+    cols = [c for c in ["numero_patrimonio", "tipo", "marca", "modelo", "status", "localizacao", "setor", "data_aquisicao", "data_garantia_fim"] if c in df_inventario.columns]
+    widths = [36, 28, 28, 36, 28, 36, 32, 26, 27][:len(cols)]
+    pdf.set_font("Arial", "", 8)
+    for _, row in df_inventario.iterrows():
+        for i, c in enumerate(cols):
+            val = "" if pd.isna(row.get(c)) else str(row.get(c))
+            pdf.cell(widths[i], 6, val[:25], border=1)
+        pdf.ln(6)
+    return bytes(pdf.output())
+
+
+def medir(func, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": round(duracao, 4), "pico_mb": round(pico / 2**20, 2), "bytes_saida": len(resultado)}
+
+
+def main(tamanhos):
+    for n in tamanhos:
+        df = gerar_inventario(n, gerar_ubs())
+        print(json.dumps({
+            "linhas": n,
+            "atual": medir(gerar_relatorio_inventario_pdf, df),
+            "legado": medir(gerar_pdf_legado, df),
+        }))
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 5000, 20000])
@@ -0,0 +1,210 @@
+# benchmarks/gerador.py — dados sintéticos determinísticos no formato das tabelas do Supabase
+#
+# Uso: from gerador import gerar_dados
+#      dados = gerar_dados(100_000)   # {"ubs": df, "setores": df, "inventario": df, ...}
+# A mesma semente gera sempre os mesmos dados, para comparar execuções.
+#
+# Carga para o cliente em memória (supabase_fake.py):
+#      python benchmarks/gerador.py 10000 dados.json
+#      SUPABASE_FAKE=1 SUPABASE_FAKE_DADOS=dados.json streamlit run OS800.py
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from horas_uteis import add_working_hours_array  # noqa: E402
+
+TIPOS_EQUIPAMENTO = ["Computador", "Impressora", "Monitor", "Nobreak", "Notebook", "Roteador"]
+MARCAS = ["Dell", "HP", "Lenovo", "Epson", "Positivo", "Samsung", "Brother"]
+MODELOS = {
+    "Computador": ["OptiPlex 3080", "ProDesk 400 G7", "ThinkCentre M70q", "Master D3400"],
+    "Impressora": ["L3150", "LaserJet M428", "DCP-L5652DN"],
+    "Monitor": ["P2219H", "E22 G4", "S24R350"],
+    "Nobreak": ["SMS Net 4+", "APC BZ1200"],
+    "Notebook": ["Latitude 3420", "IdeaPad 3", "ProBook 440"],
+    "Roteador": ["Archer C6", "RB750Gr3"],
+}
+STATUS_INVENTARIO = ["Ativo", "Em Manutencao", "Inativo"]
+SETORES = [
+    "Recepção", "Farmácia", "Consultório Médico", "Consultório Odontológico", "Vacinação",
+    "Triagem", "Administração", "Almoxarifado", "Sala de Curativos", "Laboratório",
+]
+TIPOS_DEFEITO = [
+    "Computador não liga", "Computador lento", "Impressora não imprime", "Sem acesso à internet",
+    "Monitor sem imagem", "Erro no sistema", "Troca de toner", "Teclado/Mouse com defeito",
+]
+PECAS = [
+    "SSD 240GB", "Memória RAM 8GB", "Fonte ATX", "Teclado USB", "Mouse USB",
+    "Cabo de rede", "Toner", "Cabo HDMI", "Bateria CMOS", "Placa de rede",
+]
+SOLUCOES = ["Troca de peça", "Reinstalação do sistema", "Configuração de rede", "Limpeza", "Ajuste de drivers"]
+
+_FORMATO_LEGADO = "%d/%m/%Y %H:%M:%S"
+
+
+def _rng(seed, nome):
+    # Uma sequência independente por tabela: mudar o tamanho de uma não altera as outras
+    return np.random.default_rng([seed, sum(map(ord, nome))])
+
+
+def gerar_ubs(n_ubs=60, seed=0):
+    return pd.DataFrame({"id": np.arange(1, n_ubs + 1), "nome_ubs": [f"UBS {i:03d}" for i in range(1, n_ubs + 1)]})
+
+
+def gerar_setores():
+    return pd.DataFrame({"id": np.arange(1, len(SETORES) + 1), "nome_setor": SETORES})
+
+
+def gerar_inventario(n, ubs, seed=0):
+    rng = _rng(seed, "inventario")
+    tipos = rng.choice(TIPOS_EQUIPAMENTO, n, p=[0.4, 0.2, 0.2, 0.08, 0.07, 0.05])
+    modelos = np.array([MODELOS[t][i % len(MODELOS[t])] for t, i in zip(tipos, rng.integers(0, 12, n))])
+    aquisicao = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, n), unit="D")
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "numero_patrimonio": [f"{i:08d}" for i in range(100000, 100000 + n)],
+        "tipo": tipos,
+        "marca": rng.choice(MARCAS, n),
+        "modelo": modelos,
+        "numero_serie": [f"SN{v:010X}" for v in rng.integers(0, 2**40, n)],
+        "status": rng.choice(STATUS_INVENTARIO, n, p=[0.85, 0.1, 0.05]),
+        "localizacao": rng.choice(ubs["nome_ubs"].to_numpy(), n),
+        "propria_locada": rng.choice(["Própria", "Locada"], n, p=[0.7, 0.3]),
+        "setor": rng.choice(SETORES, n),
+        "data_aquisicao": aquisicao.strftime("%Y-%m-%d"),
+        "data_garantia_fim": (aquisicao + pd.Timedelta(days=1095)).strftime("%Y-%m-%d"),
+    })
+
+
+def _horarios_abertura(rng, n, inicio, dias):
+    """
+    Aberturas concentradas no expediente (seg–sex, 07h–17h), com uma fração fora dele.
+    """
+    dia = pd.Timestamp(inicio) + pd.to_timedelta(rng.integers(0, dias, n), unit="D")
+    fim_de_semana = dia.dayofweek >= 5
+    # 90% dos fins de semana são empurrados para a segunda seguinte
+    mover = fim_de_semana & (rng.random(n) < 0.9)
+    dia = dia + pd.to_timedelta(np.where(mover, 7 - dia.dayofweek, 0), unit="D")
+    segundos = np.where(rng.random(n) < 0.9, rng.integers(7 * 3600, 17 * 3600, n), rng.integers(0, 86400, n))
+    return dia + pd.to_timedelta(segundos, unit="s")
+
+
+def gerar_chamados(n, ubs, inventario, seed=0, inicio="2023-01-02", dias=730, fracao_ts=0.5):
+    """
+    Chamados com ~75% fechados. 'fracao_ts' das linhas já tem as colunas *_ts
+    preenchidas (como após a migração); as demais só têm o texto legado.
+    Todos têm o prazo de SLA padrão (48h úteis desde a abertura).
+    """
+    rng = _rng(seed, "chamados")
+    abertura = _horarios_abertura(rng, n, inicio, dias)
+    duracao = pd.to_timedelta(rng.gamma(1.5, 16, n) * 3600, unit="s")
+    fechamento = pd.Series(abertura + duracao)
+    aberto = rng.random(n) < 0.25
+    fechamento[aberto] = pd.NaT
+
+    com_ts = rng.random(n) < fracao_ts
+    abertura_txt = abertura.strftime(_FORMATO_LEGADO)
+    fechamento_txt = fechamento.dt.strftime(_FORMATO_LEGADO)
+
+    def _iso(serie, mascara=True):
+        # Como o PostgREST devolve timestamptz: ISO em UTC com "+00:00"
+        utc = pd.Series(serie).dt.tz_localize("America/Fortaleza").dt.tz_convert("UTC")
+        return utc.dt.strftime("%Y-%m-%dT%H:%M:%S+00:00").astype(object).where(mascara & utc.notna(), None)
+
+    patrimonios = inventario["numero_patrimonio"].to_numpy()
+    com_patrimonio = rng.random(n) < 0.7
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "protocolo": np.arange(1, n + 1),
+        "username": rng.choice([f"usuario{i}" for i in range(200)], n),
+        "ubs": rng.choice(ubs["nome_ubs"].to_numpy(), n),
+        "setor": rng.choice(SETORES, n),
+        "tipo_defeito": rng.choice(TIPOS_DEFEITO, n),
+        "problema": rng.choice(["Não funciona", "Travando", "Erro ao abrir", "Sem conexão"], n),
+        "hora_abertura": abertura_txt,
+        "hora_fechamento": fechamento_txt.astype(object).where(~aberto, None),
+        "hora_abertura_ts": _iso(abertura, com_ts),
+        "hora_fechamento_ts": _iso(fechamento, com_ts).where(~aberto, None),
+        "sla_inicio_ts": _iso(abertura),
+        "sla_deadline": _iso(add_working_hours_array(abertura, 48)),
+        "solucao": np.where(aberto, None, rng.choice(SOLUCOES, n)),
+        "patrimonio": np.where(com_patrimonio, rng.choice(patrimonios, n), None),
+        "machine": None,
+    })
+
+
+def gerar_pecas_usadas(chamados, seed=0):
+    rng = _rng(seed, "pecas_usadas")
+    fechados = chamados[chamados["hora_fechamento"].notna()]
+    qtd = rng.poisson(0.6, len(fechados))
+    linhas = fechados.loc[fechados.index.repeat(qtd)]
+    return pd.DataFrame({
+        "id": np.arange(1, len(linhas) + 1),
+        "chamado_id": linhas["id"].to_numpy(),
+        "peca_nome": rng.choice(PECAS, len(linhas)),
+        "data_uso": linhas["hora_fechamento"].to_numpy(),
+    })
+
+
+def gerar_estoque(seed=0):
+    rng = _rng(seed, "estoque")
+    n = len(PECAS)
+    datas = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, n), unit="s")
+    # data_adicao mistura o texto legado e ISO, como na tabela real
+    texto = np.where(np.arange(n) % 2 == 0, datas.strftime(_FORMATO_LEGADO), datas.strftime("%Y-%m-%dT%H:%M:%S"))
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "nome": PECAS,
+        "quantidade": rng.integers(0, 200, n),
+        "descricao": "",
+        "nota_fiscal": None,
+        "data_adicao": texto,
+    })
+
+
+def gerar_dados(n, seed=0):
+    """
+    Conjunto completo com 'n' itens de inventário e 'n' chamados.
+    """
+    ubs = gerar_ubs(seed=seed)
+    inventario = gerar_inventario(n, ubs, seed)
+    chamados = gerar_chamados(n, ubs, inventario, seed)
+    return {
+        "ubs": ubs,
+        "setores": gerar_setores(),
+        "inventario": inventario,
+        "chamados": chamados,
+        "pecas_usadas": gerar_pecas_usadas(chamados, seed),
+        "estoque": gerar_estoque(seed),
+    }
+
+
+def salvar_json(dados, caminho):
+    """
+    Grava os DataFrames como {"tabela": [linhas]} (nulos como null).
+    """
+    saida = {
+        tabela: json.loads(df.to_json(orient="records", force_ascii=False))
+        for tabela, df in dados.items()
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(saida, f, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos do OS800 em JSON.")
+    parser.add_argument("linhas", type=int, help="itens de inventário e chamados")
+    parser.add_argument("saida", help="arquivo JSON de saída")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    salvar_json(gerar_dados(args.linhas, args.seed), args.saida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
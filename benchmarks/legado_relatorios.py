@@ -0,0 +1,82 @@
+# benchmarks/legado_relatorios.py — lógica da página de Relatórios antes de relatorio.py
+#
+# Cópia fiel dos cálculos que a página fazia inline (KPIs com duas chamadas de horas
+# úteis e agregados com to_period/pivot_table sobre texto), mantida só como
+# referência para benchmarks/run.py (relatorios_legado x relatorios_pipeline).
+import pandas as pd
+
+from horas_uteis import calculate_working_hours_array
+
+_DIAS_SEMANA = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_DIAS_SEMANA_PT = {
+    "Monday": "Segunda", "Tuesday": "Terça", "Wednesday": "Quarta",
+    "Thursday": "Quinta", "Friday": "Sexta", "Saturday": "Sábado", "Sunday": "Domingo"
+}
+
+
+def kpis_legado(df, sla_horas, agora_local):
+    df["tempo_uteis_seg"] = calculate_working_hours_array(df["abertura_dt"], df["fechamento_dt"])
+    df["idade_uteis_h"] = (
+        calculate_working_hours_array(df["abertura_dt"], df["fechamento_dt"].fillna(pd.Timestamp(agora_local))) / 3600.0
+    ).round(2)
+    df["em_aberto"] = df["fechamento_dt"].isna()
+    df["dentro_sla"] = (~df["em_aberto"]) & (df["tempo_uteis_seg"] <= sla_horas * 3600)
+
+    total = len(df)
+    abertos = int(df["em_aberto"].sum())
+    fechados = total - abertos
+    tma_h = None
+    mediana_h = None
+    if fechados > 0:
+        tma_h = (df.loc[~df["em_aberto"], "tempo_uteis_seg"].mean() or 0) / 3600
+        mediana_h = (df.loc[~df["em_aberto"], "tempo_uteis_seg"].median() or 0) / 3600
+    pct_sla = (df.loc[~df["em_aberto"], "dentro_sla"].mean() * 100) if fechados > 0 else 0.0
+    backlog_sla = int(((df["em_aberto"]) & (df["idade_uteis_h"] > sla_horas)).sum())
+    return {
+        "total": total, "abertos": abertos, "fechados": fechados, "tma_h": tma_h,
+        "mediana_h": mediana_h, "pct_sla": pct_sla, "backlog_sla": backlog_sla,
+    }
+
+
+def agregar_relatorio(rl, top=15):
+    rl = rl.assign(
+        semana=rl["dia"].dt.to_period("W").astype(str),
+        mes=rl["dia"].dt.to_period("M").astype(str),
+    )
+    com_abertura = rl[rl["aberturas"] > 0]
+
+    def _por_semana(coluna):
+        serie = rl.groupby("semana")[coluna].sum()
+        return serie[serie > 0].reset_index(name="qtd")
+
+    def _ranking(coluna):
+        return (
+            com_abertura[com_abertura[coluna] != ""].groupby(coluna)["aberturas"].sum().reset_index(name="qtd")
+            .sort_values("qtd", ascending=False).head(top)
+        )
+
+    dia_semana = pd.Categorical(com_abertura["dia"].dt.day_name(), categories=_DIAS_SEMANA, ordered=True)
+    heat = com_abertura.assign(dia_semana=dia_semana).pivot_table(
+        index="dia_semana", columns="hora", values="aberturas", aggfunc="sum", fill_value=0, observed=True
+    )
+    heat.index = [_DIAS_SEMANA_PT[str(x)] for x in heat.index]
+
+    pvt = com_abertura[com_abertura["ubs"] != ""].pivot_table(
+        index="ubs", columns="mes", values="aberturas", aggfunc="sum", fill_value=0
+    )
+    return {
+        "aberturas_semana": _por_semana("aberturas"),
+        "fechamentos_semana": _por_semana("fechamentos"),
+        "heatmap": heat,
+        "top_ubs": _ranking("ubs"),
+        "top_setor": _ranking("setor"),
+        "pivot_ubs_mes": pvt,
+    }
+
+
+def relatorio_legado(df, rl, sla_horas=48, agora_local=None):
+    """
+    KPIs + agregados como a página calculava (o DataFrame de chamados é copiado,
+    pois a página acrescentava as colunas in place).
+    """
+    return kpis_legado(df.copy(), sla_horas, agora_local), agregar_relatorio(rl)
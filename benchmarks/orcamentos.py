@@ -0,0 +1,124 @@
+# benchmarks/orcamentos.py — orçamento de requisições ao Supabase dos fluxos principais
+#
+# Uso: python benchmarks/orcamentos.py [--linhas 2000] [--detalhes]
+# Roda cada fluxo contra o cliente em memória (supabase_fake.py) e falha (código 1)
+# se algum passar do número de requisições ou de bytes declarado em ORCAMENTOS.
+# Um N+1 novo (uma consulta por item de uma lista) aparece aqui antes de chegar à produção.
+import argparse
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["SUPABASE_FAKE"] = "1"
+os.environ.setdefault("SUPABASE_FAKE_MAX_LINHAS", "1000")
+
+import streamlit.logger  # noqa: E402
+
+streamlit.logger.set_log_level("error")
+
+from gerador import gerar_dados  # noqa: E402
+from instrumentacao import OrcamentoExcedido, registrar_requisicoes, verificar_orcamento  # noqa: E402
+from supabase_client import supabase  # noqa: E402
+
+# =====================================================
+# Fluxos: cada função recebe os dados gerados e executa o fluxo uma vez
+# =====================================================
+def fluxo_abrir_chamado(dados):
+    from chamados import add_chamado
+    inv = dados["inventario"].iloc[0]
+    add_chamado("usuario1", inv["localizacao"], inv["setor"], "Computador lento", "Travando",
+                patrimonio=inv["numero_patrimonio"])
+
+
+def fluxo_finalizar_chamado(dados):
+    from chamados import finalizar_chamado
+    aberto = dados["chamados"][dados["chamados"]["hora_fechamento"].isna()].iloc[0]
+    finalizar_chamado(int(aberto["id"]), "Troca de peça", ["SSD 240GB", "SSD 240GB", "Fonte ATX"])
+
+
+def fluxo_reabrir_chamado(dados):
+    from chamados import reabrir_chamado
+    fechado = dados["chamados"][dados["chamados"]["hora_fechamento"].notna()].iloc[0]
+    reabrir_chamado(int(fechado["id"]), remover_historico=True)
+
+
+def fluxo_fila_tecnicos(dados):
+    from chamados import list_chamados_paginado, contar_chamados, COLUNAS_FILA_TECNICOS
+    contar_chamados(status="abertos")
+    list_chamados_paginado(COLUNAS_FILA_TECNICOS, status="abertos", limite=50)
+
+
+def fluxo_listar_ubs(dados):
+    from ubs import get_resumo_ubs
+    get_resumo_ubs()
+
+
+def fluxo_historico_maquina(dados):
+    # Mesmas chamadas do expander "Histórico da Máquina" (inventario.show_inventory_list)
+    from chamados import get_chamados_por_patrimonio
+    from inventario import get_pecas_usadas_por_patrimonio, get_historico_manutencao_por_patrimonio
+    patrimonio = dados["chamados"]["patrimonio"].dropna().iloc[0]
+    chamados_ = get_chamados_por_patrimonio(patrimonio)
+    get_pecas_usadas_por_patrimonio(patrimonio, chamados_ or [])
+    get_historico_manutencao_por_patrimonio(patrimonio)
+
+
+def fluxo_movimentar_estoque(dados):
+    # Entrada de uma nota fiscal com várias peças: um único lote de movimentos
+    from estoque import aplicar_movimentos
+    pecas = dados["estoque"]["nome"].head(5)
+    aplicar_movimentos([
+        {"nome": nome, "tipo": "entrada", "quantidade": 10, "nota_fiscal": "NF-0001"} for nome in pecas
+    ])
+
+
+# fluxo: (máximo de requisições, máximo de bytes de resposta)
+ORCAMENTOS = {
+    # inclui a leitura de sla_config, que fica em cache nas aberturas seguintes
+    "abrir_chamado": (fluxo_abrir_chamado, 4, 10_000),
+    "finalizar_chamado": (fluxo_finalizar_chamado, 2, 10_000),
+    "reabrir_chamado": (fluxo_reabrir_chamado, 3, 20_000),
+    "fila_tecnicos": (fluxo_fila_tecnicos, 2, 100_000),
+    "listar_ubs": (fluxo_listar_ubs, 1, 50_000),
+    "historico_maquina": (fluxo_historico_maquina, 3, 50_000),
+    "movimentar_estoque": (fluxo_movimentar_estoque, 1, 10_000),
+}
+
+
+def carregar_dados(linhas, seed=0):
+    dados = gerar_dados(linhas, seed)
+    for tabela, df in dados.items():
+        supabase.carregar(tabela, df)
+    return dados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica o orçamento de requisições dos fluxos do OS800.")
+    parser.add_argument("--linhas", type=int, default=2000)
+    parser.add_argument("--fluxo", action="append", choices=sorted(ORCAMENTOS))
+    parser.add_argument("--detalhes", action="store_true", help="lista as requisições de cada fluxo")
+    args = parser.parse_args(argv)
+
+    dados = carregar_dados(args.linhas)
+    falhas = 0
+    for nome in args.fluxo or list(ORCAMENTOS):
+        fluxo, max_consultas, max_bytes = ORCAMENTOS[nome]
+        with registrar_requisicoes(nome) as registro:
+            fluxo(dados)
+        try:
+            verificar_orcamento(registro, max_consultas, max_bytes)
+            print(f"ok     {nome}: {registro.total_consultas}/{max_consultas} requisições, "
+                  f"{registro.total_bytes}/{max_bytes} bytes")
+            if args.detalhes:
+                print(registro.resumo())
+        except OrcamentoExcedido as e:
+            falhas += 1
+            print(f"FALHOU {e}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
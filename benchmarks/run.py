@@ -0,0 +1,316 @@
+# benchmarks/run.py — tempo e pico de memória dos caminhos críticos do app
+#
+# Uso: python benchmarks/run.py [--tamanhos 1000,100000,1000000] [--bench fila_tecnicos ...]
+#                               [--repeticoes 3] [--saida arquivo.json]
+#      python benchmarks/run.py --comparar antes.json depois.json
+# O resultado vai para benchmarks/resultados/<data>-<commit>.json (um registro por
+# benchmark x tamanho), para comparar execuções antes e depois de uma otimização.
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Os módulos do app criam o cliente do Supabase na importação; nenhum benchmark
+# faz requisições, então um endereço local basta quando o ambiente não define um.
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import streamlit.logger  # noqa: E402
+
+# Fora do "streamlit run" os caches avisam a cada chamada que não há runtime
+streamlit.logger.set_log_level("error")
+
+from gerador import gerar_dados  # noqa: E402
+
+TAMANHOS_PADRAO = [1_000, 100_000]
+PASTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+# Benchmarks lentos por natureza rodam sobre no máximo este número de linhas
+LIMITE_LINHAS = {
+    "horas_uteis_escalar": 20_000,
+    "export_pdf": 100_000,
+    "export_excel": 200_000,
+}
+
+# =====================================================
+# Benchmarks: cada função recebe os dados e devolve (callable, linhas)
+# =====================================================
+def _limitar(nome, df):
+    limite = LIMITE_LINHAS.get(nome)
+    return df if limite is None else df.iloc[:limite]
+
+
+def bench_horas_uteis_escalar(dados):
+    from datas import coluna_data
+    from horas_uteis import calculate_working_hours
+    ch = _limitar("horas_uteis_escalar", dados["chamados"])
+    ch = ch[ch["hora_fechamento"].notna()]
+    pares = list(zip(coluna_data(ch, "hora_abertura"), coluna_data(ch, "hora_fechamento")))
+    return (lambda: [calculate_working_hours(a, f) for a, f in pares]), len(pares)
+
+
+def bench_horas_uteis_vetorizado(dados):
+    from datas import coluna_data
+    from horas_uteis import calculate_working_hours_array
+    ch = dados["chamados"]
+    abertura, fechamento = coluna_data(ch, "hora_abertura"), coluna_data(ch, "hora_fechamento")
+    return (lambda: calculate_working_hours_array(abertura, fechamento)), len(ch)
+
+
+def bench_parse_datas(dados):
+    from datas import coluna_data
+    ch = dados["chamados"]
+    return (lambda: (coluna_data(ch, "hora_abertura"), coluna_data(ch, "hora_fechamento"))), len(ch)
+
+
+def bench_fila_tecnicos(dados):
+    from chamados import preparar_fila_tecnicos
+    ch = dados["chamados"]
+    agora = datetime(2025, 1, 15, 10, 0, 0)
+    return (lambda: preparar_fila_tecnicos(ch.copy(), agora)), len(ch)
+
+
+def bench_relatorios_rollup(dados):
+    from rollup import calcular_rollup
+    ch = dados["chamados"]
+    return (lambda: calcular_rollup(ch)), len(ch)
+
+
+def _dados_relatorio(dados):
+    from datas import coluna_data
+    from rollup import calcular_rollup
+    ch = dados["chamados"]
+    df = ch.assign(abertura_dt=coluna_data(ch, "hora_abertura"), fechamento_dt=coluna_data(ch, "hora_fechamento"))
+    rl = calcular_rollup(ch)
+    rl["dia"] = pd.to_datetime(rl["dia"])
+    return df, rl
+
+
+def bench_relatorios_legado(dados):
+    from legado_relatorios import relatorio_legado
+    df, rl = _dados_relatorio(dados)
+    agora = datetime(2025, 1, 15, 10, 0, 0)
+    return (lambda: relatorio_legado(df, rl, 48, agora)), len(df)
+
+
+def bench_relatorios_pipeline(dados):
+    from relatorio import construir_relatorio
+    df, rl = _dados_relatorio(dados)
+    agora = datetime(2025, 1, 15, 10, 0, 0)
+    return (lambda: construir_relatorio(df, rl, 48, agora)), len(df)
+
+
+def bench_carregar_chamados_bruto(dados):
+    linhas = dados["chamados"].astype(object).where(dados["chamados"].notna(), None).to_dict("records")
+    return (lambda: pd.DataFrame(linhas)), len(linhas)
+
+
+def bench_carregar_chamados_tipado(dados):
+    from esquemas import tabela_chamados
+    linhas = dados["chamados"].astype(object).where(dados["chamados"].notna(), None).to_dict("records")
+    return (lambda: tabela_chamados(linhas)), len(linhas)
+
+
+def bench_carregar_inventario_bruto(dados):
+    linhas = dados["inventario"].astype(object).where(dados["inventario"].notna(), None).to_dict("records")
+    return (lambda: pd.DataFrame(linhas)), len(linhas)
+
+
+def bench_carregar_inventario_tipado(dados):
+    from esquemas import tabela_inventario
+    linhas = dados["inventario"].astype(object).where(dados["inventario"].notna(), None).to_dict("records")
+    return (lambda: tabela_inventario(linhas)), len(linhas)
+
+
+def bench_inventario_indice(dados):
+    from busca import IndiceBusca
+    inv = dados["inventario"]
+    return (lambda: IndiceBusca(inv)), len(inv)
+
+
+def bench_inventario_filtro(dados):
+    from busca import IndiceBusca
+    from inventario import filtrar_inventario
+    inv = dados["inventario"]
+    indice = IndiceBusca(inv)
+    consultas = [
+        ("", {"status": "Ativo"}),
+        ("dell opti", {}),
+        ("ubs 01", {"setor": "Farmácia"}),
+        ("sn00", {"localizacao": "UBS 007"}),
+    ]
+    return (lambda: [filtrar_inventario(inv, indice, t, **f) for t, f in consultas]), len(inv)
+
+
+def _em_arquivo_temporario(escrever, sufixo):
+    def executar():
+        with tempfile.NamedTemporaryFile(suffix=sufixo) as tmp:
+            escrever(tmp)
+            tmp.flush()
+            return os.path.getsize(tmp.name)
+    return executar
+
+
+def bench_export_pdf(dados):
+    from inventario_pdf import escrever_relatorio_inventario_pdf
+    inv = _limitar("export_pdf", dados["inventario"])
+    logo = os.path.join(RAIZ, "infocustec.png")
+    return _em_arquivo_temporario(lambda f: escrever_relatorio_inventario_pdf(inv, f, logo), ".pdf"), len(inv)
+
+
+def bench_export_excel(dados):
+    from exportacao import escrever_excel, blocos_dataframe
+    ch = _limitar("export_excel", dados["chamados"])
+    return _em_arquivo_temporario(lambda f: escrever_excel({"Chamados": blocos_dataframe(ch)}, f), ".xlsx"), len(ch)
+
+
+def bench_export_csv(dados):
+    from exportacao import escrever_csv, blocos_dataframe
+    ch = dados["chamados"]
+    return _em_arquivo_temporario(lambda f: escrever_csv(blocos_dataframe(ch), f), ".csv"), len(ch)
+
+
+BENCHMARKS = {
+    nome[len("bench_"):]: func
+    for nome, func in sorted(globals().items())
+    if nome.startswith("bench_") and callable(func)
+}
+
+# =====================================================
+# Medição
+# =====================================================
+def medir(executar, repeticoes, memoria=True):
+    """
+    Melhor tempo entre 'repeticoes' execuções sem rastreamento e, à parte,
+    uma execução sob tracemalloc para o pico de memória alocada pelo Python.
+    Quando o benchmark devolve um DataFrame, registra também o tamanho dele (resultado_mb).
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        retorno = executar()
+        tempos.append(time.perf_counter() - inicio)
+    resultado = {
+        "segundos": round(min(tempos), 6),
+        "segundos_mediana": round(float(np.median(tempos)), 6),
+        "repeticoes": repeticoes,
+    }
+    if isinstance(retorno, pd.DataFrame):
+        resultado["resultado_mb"] = round(retorno.memory_usage(deep=True).sum() / 2**20, 2)
+    del retorno
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        executar()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultado["pico_mb"] = round(pico / 2**20, 2)
+    return resultado
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(tamanhos, nomes, repeticoes, memoria, seed=0):
+    meta = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "seed": seed,
+    }
+    resultados = []
+    for n in tamanhos:
+        print(f"Gerando dados: {n} linhas...", file=sys.stderr, flush=True)
+        dados = gerar_dados(n, seed)
+        for nome in nomes:
+            try:
+                func, linhas = BENCHMARKS[nome](dados)
+                # repetições caem para 1 nos tamanhos grandes
+                medicao = medir(func, repeticoes if n <= 100_000 else 1, memoria)
+            except Exception as e:
+                print(f"  {nome} ({n}): erro: {e}", file=sys.stderr, flush=True)
+                resultados.append({"bench": nome, "tamanho": n, "erro": str(e)})
+                continue
+            registro = {"bench": nome, "tamanho": n, "linhas": linhas, **medicao}
+            resultados.append(registro)
+            print(f"  {nome} ({linhas} linhas): {registro['segundos']:.4f} s"
+                  + (f", pico {registro['pico_mb']} MB" if "pico_mb" in registro else "")
+                  + (f", resultado {registro['resultado_mb']} MB" if "resultado_mb" in registro else ""),
+                  file=sys.stderr, flush=True)
+        del dados
+    return {"meta": meta, "resultados": resultados}
+
+
+def comparar(caminho_antes, caminho_depois):
+    """
+    Imprime, por benchmark x tamanho, o tempo e o pico de memória das duas execuções.
+    """
+    with open(caminho_antes, encoding="utf-8") as f:
+        antes = {(r["bench"], r["tamanho"]): r for r in json.load(f)["resultados"]}
+    with open(caminho_depois, encoding="utf-8") as f:
+        depois = {(r["bench"], r["tamanho"]): r for r in json.load(f)["resultados"]}
+    print(f"{'benchmark':28} {'tamanho':>9} {'antes (s)':>11} {'depois (s)':>11} {'x':>7} {'MB antes':>9} {'MB depois':>10}")
+    for chave in sorted(set(antes) & set(depois)):
+        a, d = antes[chave], depois[chave]
+        if "segundos" not in a or "segundos" not in d:
+            continue
+        fator = a["segundos"] / d["segundos"] if d["segundos"] else float("inf")
+        print(f"{chave[0]:28} {chave[1]:>9} {a['segundos']:>11.4f} {d['segundos']:>11.4f} {fator:>7.2f}"
+              f" {a.get('pico_mb', '-'):>9} {d.get('pico_mb', '-'):>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do OS800.")
+    parser.add_argument("--tamanhos", default=",".join(map(str, TAMANHOS_PADRAO)),
+                        help="linhas por conjunto de dados, separadas por vírgula (ex.: 1000,100000,1000000)")
+    parser.add_argument("--bench", action="append", choices=sorted(BENCHMARKS), help="roda só os benchmarks indicados")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (mais rápido)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo JSON de saída")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"))
+    args = parser.parse_args(argv)
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",") if t.strip()]
+    relatorio = executar(tamanhos, args.bench or list(BENCHMARKS), args.repeticoes, not args.sem_memoria, args.seed)
+
+    saida = args.saida
+    if not saida:
+        os.makedirs(PASTA_RESULTADOS, exist_ok=True)
+        carimbo = datetime.now().strftime("%Y%m%d-%H%M%S")
+        saida = os.path.join(PASTA_RESULTADOS, f"{carimbo}-{relatorio['meta']['commit'] or 'local'}.json")
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# benchmarks/verificacoes.py — verificações de regras de negócio contra o cliente em memória
+#
+# Uso: python benchmarks/verificacoes.py [--verificacao nome]
+# Como benchmarks/orcamentos.py, roda sobre supabase_fake.py (dados de gerador.py) e
+# termina com código 1 se alguma verificação falhar.
+import argparse
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["SUPABASE_FAKE"] = "1"
+
+import streamlit.logger  # noqa: E402
+
+streamlit.logger.set_log_level("error")
+
+from gerador import gerar_dados  # noqa: E402
+from supabase_client import supabase  # noqa: E402
+
+
+def _contar(tabela, **filtros):
+    return sum(all(l.get(c) == v for c, v in filtros.items()) for l in supabase._tabelas[tabela])
+
+
+def _somar_rollup(metrica):
+    return sum(l.get(metrica) or 0 for l in supabase._tabelas["chamados_rollup"])
+
+
+# =====================================================
+# Verificações: cada função recebe os dados gerados e levanta AssertionError se falhar
+# =====================================================
+def verificar_finalizar_duas_vezes(dados):
+    # Clique duplo em "Finalizar": a segunda chamada não grava nada de novo
+    from chamados import finalizar_chamado
+    chamados = dados["chamados"]
+    aberto = chamados[chamados["hora_fechamento"].isna() & chamados["patrimonio"].notna()].iloc[0]
+    id_chamado = int(aberto["id"])
+    peca = dados["estoque"]["nome"].iloc[0]
+
+    finalizar_chamado(id_chamado, "Troca de peça", [peca])
+    antes = {
+        "pecas_usadas": _contar("pecas_usadas", chamado_id=id_chamado),
+        "estoque_movimentos": _contar("estoque_movimentos", chamado_id=id_chamado),
+        "historico_manutencao": len(supabase._tabelas["historico_manutencao"]),
+        "fechamentos": _somar_rollup("fechamentos"),
+    }
+    finalizar_chamado(id_chamado, "Troca de peça", [peca])
+    depois = {
+        "pecas_usadas": _contar("pecas_usadas", chamado_id=id_chamado),
+        "estoque_movimentos": _contar("estoque_movimentos", chamado_id=id_chamado),
+        "historico_manutencao": len(supabase._tabelas["historico_manutencao"]),
+        "fechamentos": _somar_rollup("fechamentos"),
+    }
+    assert antes["pecas_usadas"] == 1 and antes["estoque_movimentos"] == 1 and antes["historico_manutencao"] > 0, antes
+    assert antes == depois, f"segundo fechamento gravou de novo: {antes} -> {depois}"
+
+
+def verificar_parquet_coluna_nula_no_primeiro_bloco(dados):
+    # Coluna só com nulos no primeiro bloco (vira texto no esquema) e com números depois
+    import io
+
+    import pandas as pd
+    import pyarrow.parquet as pq
+    from exportacao import escrever_parquet
+
+    blocos = [pd.DataFrame({"a": [1, 2], "b": [None, None]}), pd.DataFrame({"a": [3, 4], "b": [5, 6]})]
+    destino = io.BytesIO()
+    total = escrever_parquet(blocos, destino)
+    destino.seek(0)
+    lido = pq.read_table(destino).to_pandas()
+    assert total == 4 and len(lido) == 4, (total, len(lido))
+    assert lido["b"].tolist()[2:] == ["5", "6"], lido["b"].tolist()
+
+
+VERIFICACOES = {
+    "finalizar_duas_vezes": verificar_finalizar_duas_vezes,
+    "parquet_coluna_nula_no_primeiro_bloco": verificar_parquet_coluna_nula_no_primeiro_bloco,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica regras de negócio do OS800 no cliente em memória.")
+    parser.add_argument("--linhas", type=int, default=500)
+    parser.add_argument("--verificacao", action="append", choices=sorted(VERIFICACOES))
+    args = parser.parse_args(argv)
+
+    falhas = 0
+    for nome in args.verificacao or list(VERIFICACOES):
+        # Dados novos a cada verificação: uma não interfere na outra
+        dados = gerar_dados(args.linhas, 0)
+        for tabela, df in dados.items():
+            supabase.carregar(tabela, df)
+        try:
+            VERIFICACOES[nome](dados)
+            print(f"ok     {nome}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"FALHOU {nome}: {e}")
+        except Exception as e:
+            falhas += 1
+            print(f"FALHOU {nome}: {type(e).__name__}: {e}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
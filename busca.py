@@ -0,0 +1,93 @@
+# busca.py — índice de busca do inventário (sem acento, sem caixa, por prefixo)
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Campos de alta cardinalidade: índice invertido de tokens com busca por prefixo
+CAMPOS_PREFIXO = ("numero_patrimonio", "numero_serie", "marca", "modelo")
+# Campos de baixa cardinalidade: a busca roda sobre os valores distintos
+CAMPOS_CATEGORIA = ("tipo", "status", "localizacao", "setor", "propria_locada")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto):
+    """
+    Remove acentos e caixa: 'Manutenção' -> 'manutencao'.
+    """
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(ch for ch in texto if not unicodedata.combining(ch)).casefold()
+
+
+def _normalizar_serie(serie):
+    return (
+        serie.astype(object).fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.lower()
+    )
+
+
+class IndiceBusca:
+    """
+    Índice construído uma vez por snapshot do inventário e reutilizado a cada consulta.
+    - CAMPOS_PREFIXO: tokens ordenados + posições das linhas; um termo casa com
+      qualquer token que comece por ele (ex.: 'opti' -> 'optiplex').
+    - CAMPOS_CATEGORIA: o termo é procurado como substring nos valores distintos
+      e o resultado é expandido pelas categorias de cada linha.
+    Vários termos na consulta são combinados com E.
+    """
+    def __init__(self, df, campos_prefixo=CAMPOS_PREFIXO, campos_categoria=CAMPOS_CATEGORIA):
+        self.n = len(df)
+        campos_prefixo = [c for c in campos_prefixo if c in df.columns]
+        campos_categoria = [c for c in campos_categoria if c in df.columns]
+
+        base = df.reset_index(drop=True)
+        if campos_prefixo and self.n:
+            tokens = pd.concat([
+                _normalizar_serie(base[c]).str.findall(_TOKEN_RE.pattern).explode()
+                for c in campos_prefixo
+            ]).dropna()
+            pares = (
+                pd.DataFrame({"token": tokens.to_numpy(), "linha": tokens.index.to_numpy()})
+                .drop_duplicates()
+                .sort_values(["token", "linha"])
+            )
+            # Tokens únicos ordenados; as linhas de cada token ficam contíguas em _linhas
+            unicos, inicios = np.unique(pares["token"].to_numpy(), return_index=True)
+            self._tokens = unicos.tolist()
+            self._inicios = np.append(inicios, len(pares))
+            self._linhas = pares["linha"].to_numpy()
+        else:
+            self._tokens, self._inicios, self._linhas = [], np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        self._categorias = []
+        for c in campos_categoria:
+            cat = pd.Categorical(base[c])
+            valores = [normalizar(v) for v in cat.categories]
+            self._categorias.append((np.asarray(cat.codes), valores))
+
+    def _linhas_por_prefixo(self, termo):
+        ini = bisect.bisect_left(self._tokens, termo)
+        fim = bisect.bisect_left(self._tokens, termo + "\uffff")
+        return self._linhas[self._inicios[ini]:self._inicios[fim]]
+
+    def buscar(self, consulta):
+        """
+        Retorna uma máscara booleana (np.ndarray) com as linhas que casam com 'consulta'.
+        """
+        termos = _TOKEN_RE.findall(normalizar(consulta))
+        mascara = np.ones(self.n, dtype=bool)
+        for termo in termos:
+            casou = np.zeros(self.n, dtype=bool)
+            casou[self._linhas_por_prefixo(termo)] = True
+            for codigos, valores in self._categorias:
+                aceitos = [i for i, v in enumerate(valores) if termo in v]
+                if aceitos:
+                    casou |= np.isin(codigos, aceitos)
+            mascara &= casou
+        return mascara
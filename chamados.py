@@ -1,48 +1,79 @@
 import os
+import threading
+from collections import Counter
+import pandas as pd
 import streamlit as st
 from supabase_client import supabase
+from metricas import cronometrar
 from datetime import datetime, timedelta
 import pytz
-from twilio.rest import Client
+
+from datas import campos_data_hora, para_iso, agora, coluna_data, parse_datas, formatar_datas
+from notificacoes import get_dispatcher
+from rollup import registrar_abertura, registrar_fechamento, registrar_reabertura
+from sla import campos_sla
+from snapshot import marcar_alteracao
+from ubs import invalidate_chamados_ubs_cache
+from horas_uteis import calculate_working_hours, calculate_working_hours_array
 
 # Define o fuso de Fortaleza
 FORTALEZA_TZ = pytz.timezone("America/Fortaleza")
 
+# Quantidade de protocolos reservados por chamada ao banco (modo hi-lo).
+# 1 desativa a reserva: cada chamado faz sua própria alocação.
+PROTOCOLO_BLOCO = int(os.getenv("PROTOCOLO_BLOCO", "1"))
+
+# Bloco de protocolos reservado por este processo: [proximo, limite)
+_protocolo_lock = threading.Lock()
+_protocolo_bloco = {"proximo": 0, "limite": 0}
+
 def send_whatsapp_message(message_body):
     """
-    Envia a mensagem de WhatsApp para cada técnico listado na variável de ambiente
+    Enfileira a mensagem de WhatsApp para cada técnico listado na variável de ambiente
     TECHNICIAN_WHATSAPP_NUMBER (números separados por vírgula).
+    O envio acontece em segundo plano (ver notificacoes.py); falhas e retentativas
+    ficam no log e nas métricas do dispatcher.
     """
-    account_sid = os.getenv("TWILIO_ACCOUNT_SID")
-    auth_token = os.getenv("TWILIO_AUTH_TOKEN")
-    from_whatsapp_number = os.getenv("TWILIO_WHATSAPP_NUMBER")
     technician_numbers = os.getenv("TECHNICIAN_WHATSAPP_NUMBER", "")
-    
-    if not all([account_sid, auth_token, from_whatsapp_number, technician_numbers]):
+    dispatcher = get_dispatcher()
+
+    if dispatcher is None or not technician_numbers:
         st.error("Variáveis de ambiente do Twilio não configuradas corretamente.")
         return
-    
+
     # Separa os números (supondo que estejam separados por vírgula)
     numbers_list = [num.strip() for num in technician_numbers.split(",") if num.strip()]
-    
-    for number in numbers_list:
-        # Garante que o número esteja no formato "whatsapp:+..."
-        to_whatsapp_number = number if number.startswith("whatsapp:") else f"whatsapp:{number}"
-        try:
-            client = Client(account_sid, auth_token)
-            client.messages.create(
-                body=message_body,
-                from_=from_whatsapp_number,
-                to=to_whatsapp_number
-            )
-        except Exception as e:
-            st.error(f"Erro ao enviar mensagem para {to_whatsapp_number}: {e}")
-
-def gerar_protocolo_sequencial():
+
+    # Garante que cada número esteja no formato "whatsapp:+..."
+    destinos = [n if n.startswith("whatsapp:") else f"whatsapp:{n}" for n in numbers_list]
+    dispatcher.enviar(destinos, message_body)
+
+def _alocar_protocolos(quantidade):
+    """
+    Reserva 'quantidade' protocolos consecutivos no contador do banco
+    (RPC alocar_protocolos, ver sql/001_protocolo_contador.sql) e retorna o primeiro.
+    """
+    resp = supabase.rpc("alocar_protocolos", {"p_quantidade": quantidade}).execute()
+    return int(resp.data)
+
+def gerar_protocolo_sequencial(bloco=None):
+    """
+    Retorna um protocolo único, alocado de forma atômica no servidor.
+    Com bloco > 1 (ou PROTOCOLO_BLOCO > 1), reserva vários números de uma vez e
+    os distribui localmente; números não usados de um bloco viram lacunas.
+    """
+    bloco = bloco or PROTOCOLO_BLOCO
     try:
-        resp = supabase.table("chamados").select("protocolo", count="exact").execute()
-        protocolos = [item["protocolo"] for item in resp.data if item.get("protocolo") is not None]
-        return max(protocolos, default=0) + 1
+        if bloco <= 1:
+            return _alocar_protocolos(1)
+        with _protocolo_lock:
+            if _protocolo_bloco["proximo"] >= _protocolo_bloco["limite"]:
+                inicio = _alocar_protocolos(bloco)
+                _protocolo_bloco["proximo"] = inicio
+                _protocolo_bloco["limite"] = inicio + bloco
+            protocolo = _protocolo_bloco["proximo"]
+            _protocolo_bloco["proximo"] += 1
+            return protocolo
     except Exception as e:
         st.error(f"Erro ao gerar protocolo: {e}")
         return None
@@ -55,6 +86,17 @@ def get_chamado_by_protocolo(protocolo):
         st.error(f"Erro ao buscar chamado: {e}")
         return None
 
+def get_chamado_by_id(id_chamado):
+    """
+    Linha completa de um chamado (detalhe da fila, carregado só ao selecionar a linha).
+    """
+    try:
+        resp = supabase.table("chamados").select("*").eq("id", id_chamado).execute()
+        return resp.data[0] if resp.data else None
+    except Exception as e:
+        st.error(f"Erro ao buscar chamado: {e}")
+        return None
+
 def buscar_no_inventario_por_patrimonio(patrimonio):
     try:
         resp = supabase.table("inventario").select("*").eq("numero_patrimonio", patrimonio).execute()
@@ -83,22 +125,26 @@ def add_chamado(username, ubs, setor, tipo_defeito, problema, machine=None, patr
         if protocolo is None:
             return None
 
-        # Gera horário local de Fortaleza
-        hora_local = datetime.now(FORTALEZA_TZ).strftime('%d/%m/%Y %H:%M:%S')
-
         data = {
             "username": username,
             "ubs": ubs,
             "setor": setor,
             "tipo_defeito": tipo_defeito,
             "problema": problema,
-            "hora_abertura": hora_local,
             "protocolo": protocolo,
             "machine": machine,
             "patrimonio": patrimonio
         }
+        # Hora de abertura em Fortaleza: texto legado + hora_abertura_ts (timestamptz),
+        # e o prazo de SLA do tipo de defeito contado a partir dela
+        abertura = agora()
+        data.update(campos_data_hora("hora_abertura", abertura))
+        data.update(campos_sla(tipo_defeito, abertura))
         supabase.table("chamados").insert(data).execute()
-        
+        marcar_alteracao()
+        invalidate_chamados_ubs_cache()
+        registrar_abertura(data)
+
         # Envio de mensagem via WhatsApp para os técnicos
         message_body = f"Novo chamado aberto: Protocolo {protocolo}. UBS: {ubs}. Problema: {tipo_defeito}"
         send_whatsapp_message(message_body)
@@ -112,46 +158,44 @@ def add_chamado(username, ubs, setor, tipo_defeito, problema, machine=None, patr
 def finalizar_chamado(id_chamado, solucao, pecas_usadas=None):
     """
     Finaliza um chamado, definindo a hora de fechamento com o fuso horário de Fortaleza (UTC−3).
-    Também insere as peças usadas e registra histórico de manutenção.
+    Também insere as peças usadas, dá baixa no estoque e registra histórico de manutenção,
+    tudo em uma única transação no servidor (RPC finalizar_chamado_tx,
+    ver sql/003_finalizar_chamado.sql e sql/005_colunas_timestamptz.sql).
     """
     try:
-        hora_fechamento_local = datetime.now(FORTALEZA_TZ).strftime('%d/%m/%Y %H:%M:%S')
+        fechamento = agora()
+        hora_fechamento_local = fechamento.strftime('%d/%m/%Y %H:%M:%S')
 
-        supabase.table("chamados").update({
-            "solucao": solucao,
-            "hora_fechamento": hora_fechamento_local
-        }).eq("id", id_chamado).execute()
-        
         # Se nenhuma entrada de peças for fornecida, pergunta ao usuário
         if pecas_usadas is None:
             pecas_input = st.text_area("Informe as peças utilizadas (separadas por vírgula)")
             pecas_usadas = [p.strip() for p in pecas_input.split(",") if p.strip()] if pecas_input else []
-        
-        # Se houver peças usadas, insere na tabela pecas_usadas e dá baixa no estoque
-        if pecas_usadas:
-            for peca in pecas_usadas:
-                supabase.table("pecas_usadas").insert({
-                    "chamado_id": id_chamado,
-                    "peca_nome": peca,
-                    "data_uso": hora_fechamento_local
-                }).execute()
-                from estoque import dar_baixa_estoque
-                dar_baixa_estoque(peca, quantidade_usada=1)
-        
-        resp = supabase.table("chamados").select("patrimonio").eq("id", id_chamado).execute()
-        if resp.data and len(resp.data) > 0:
-            patrimonio = resp.data[0].get("patrimonio")
-        else:
-            patrimonio = None
-
-        if patrimonio:
-            descricao = f"Manutenção: {solucao}. Peças utilizadas: {', '.join(pecas_usadas) if pecas_usadas else 'Nenhuma'}."
-            supabase.table("historico_manutencao").insert({
-                "numero_patrimonio": patrimonio,
-                "descricao": descricao,
-                "data_manutencao": hora_fechamento_local
-            }).execute()
-        
+
+        # Quantidades agregadas por peça: uma baixa por nome, não por unidade
+        pecas = [{"nome": nome, "quantidade": qtd} for nome, qtd in Counter(pecas_usadas).items()]
+        descricao = f"Manutenção: {solucao}. Peças utilizadas: {', '.join(pecas_usadas) if pecas_usadas else 'Nenhuma'}."
+
+        resp = supabase.rpc("finalizar_chamado_tx", {
+            "p_chamado_id": id_chamado,
+            "p_solucao": solucao,
+            "p_hora_fechamento": hora_fechamento_local,
+            "p_fechamento_ts": para_iso(fechamento),
+            "p_pecas": pecas,
+            "p_descricao": descricao
+        }).execute()
+
+        resultado = resp.data or {}
+        marcar_alteracao()
+        invalidate_chamados_ubs_cache()
+        for nome in resultado.get("pecas_nao_encontradas") or []:
+            st.warning(f"Peça '{nome}' não encontrada no estoque.")
+        # A RPC devolve a chave do chamado (ubs, setor, tipo, abertura) para o rollup
+        registrar_fechamento({
+            **resultado,
+            "hora_fechamento": hora_fechamento_local,
+            "hora_fechamento_ts": resultado.get("hora_fechamento_ts") or para_iso(fechamento),
+        })
+
         st.success(f"Chamado {id_chamado} finalizado.")
     except Exception as e:
         st.error(f"Erro ao finalizar chamado: {e}")
@@ -178,6 +222,134 @@ def list_chamados_em_aberto():
         st.error(f"Erro ao listar chamados abertos: {e}")
         return []
 
+# Colunas da fila da página "Chamados Técnicos": as exibidas na grade e as usadas
+# nos cálculos de preparar_fila_tecnicos; o restante vem com get_chamado_by_id
+COLUNAS_FILA_TECNICOS = (
+    "id,protocolo,ubs,setor,tipo_defeito,problema,hora_abertura,hora_fechamento,"
+    "hora_abertura_ts,hora_fechamento_ts,sla_deadline"
+)
+# Ordenações da fila (list_chamados_paginado): prazo de SLA mais próximo primeiro
+# (só chamados em aberto; sem prazo gravado por último), mais recentes e mais antigos
+ORDENS_FILA = ("prazo", "recentes", "antigos")
+
+def _filtrar_chamados(query, status=None, ubs=None, setor=None):
+    """
+    Aplica à consulta os filtros de servidor usados na fila de chamados.
+    - status: None (todos), "abertos", "fechados" ou "atrasados" (abertos com o
+      sla_deadline vencido; usa o índice parcial de sql/008_sla_deadline.sql).
+    - ubs / setor: valor único ou lista de valores.
+    """
+    if status == "abertos":
+        query = query.is_("hora_fechamento", None)
+    elif status == "fechados":
+        query = query.not_.is_("hora_fechamento", None)
+    elif status == "atrasados":
+        query = query.is_("hora_fechamento", None).lt("sla_deadline", para_iso(agora()))
+    if ubs:
+        query = query.in_("ubs", [ubs] if isinstance(ubs, str) else list(ubs))
+    if setor:
+        query = query.in_("setor", [setor] if isinstance(setor, str) else list(setor))
+    return query
+
+def _apos_cursor(query, ordem, cursor):
+    """
+    Linhas depois do 'cursor' (última linha da página anterior) na 'ordem' da fila.
+    """
+    if ordem == "antigos":
+        return query.gt("id", cursor)
+    if ordem == "prazo":
+        prazo, ultimo_id = cursor
+        if prazo is None:
+            return query.is_("sla_deadline", None).gt("id", ultimo_id)
+        return query.or_(
+            f'sla_deadline.gt."{prazo}",and(sla_deadline.eq."{prazo}",id.gt.{ultimo_id}),sla_deadline.is.null'
+        )
+    return query.lt("id", cursor)
+
+@cronometrar("fetch")
+def list_chamados_paginado(colunas="*", status=None, ubs=None, setor=None, cursor=None, limite=50, ordem="recentes"):
+    """
+    Retorna uma página de chamados usando paginação por chave (keyset) em vez de
+    OFFSET: o custo não cresce com o histórico.
+    - colunas: projeção enviada ao PostgREST (ex.: "id,protocolo,ubs").
+    - cursor: valor de 'proximo_cursor' da página anterior (None para a primeira).
+    - ordem: uma de ORDENS_FILA; a ordenação é feita no servidor, sobre todo o resultado.
+    Retorna {"dados": [...], "proximo_cursor": cursor ou None}.
+
+    A chave de ordenação é o id, atribuído na abertura: segue a mesma ordem de
+    hora_abertura_ts e usa o índice da chave primária, inclusive em linhas
+    ainda não migradas (hora_abertura_ts nulo). Em "prazo" a chave é (sla_deadline, id)
+    e a fila se limita aos chamados em aberto: prazo de chamado fechado não é urgência.
+    """
+    if ordem == "prazo" and status not in ("abertos", "atrasados"):
+        status = "abertos"
+    chaves = ["id", "sla_deadline"] if ordem == "prazo" else ["id"]
+    if colunas != "*":
+        projetadas = [c.strip() for c in colunas.split(",")]
+        colunas = ",".join(projetadas + [c for c in chaves if c not in projetadas])
+    try:
+        query = _filtrar_chamados(supabase.table("chamados").select(colunas), status, ubs, setor)
+        if cursor is not None:
+            query = _apos_cursor(query, ordem, cursor)
+        if ordem == "prazo":
+            query = query.order("sla_deadline").order("id")
+        else:
+            query = query.order("id", desc=ordem != "antigos")
+        resp = query.limit(limite + 1).execute()
+        dados = resp.data or []
+        proximo_cursor = None
+        if len(dados) > limite:
+            ultima = dados[limite - 1]
+            proximo_cursor = (ultima["sla_deadline"], ultima["id"]) if ordem == "prazo" else ultima["id"]
+        return {"dados": dados[:limite], "proximo_cursor": proximo_cursor}
+    except Exception as e:
+        st.error(f"Erro ao listar chamados: {e}")
+        return {"dados": [], "proximo_cursor": None}
+
+@cronometrar("transform")
+def preparar_fila_tecnicos(df, agora_local=None):
+    """
+    Colunas derivadas da fila de "Chamados Técnicos", calculadas de uma vez para todas as linhas:
+      - idade_uteis_h: horas úteis desde a abertura (até o fechamento ou até agora)
+      - >48h_uteis: chamado em aberto há mais de 48h úteis
+      - sla_vencido: chamado em aberto com o sla_deadline no passado (sem prazo gravado, vale o >48h_uteis)
+      - Prazo SLA: sla_deadline no horário local, como texto
+      - Tempo Útil: tempo útil do chamado fechado ("Em aberto" / "Erro" nos demais casos)
+    As colunas *_ts e sla_deadline só alimentam o cálculo e são removidas do resultado.
+    """
+    if agora_local is None:
+        agora_local = datetime.now(FORTALEZA_TZ).replace(tzinfo=None)
+    fechado = df["hora_fechamento"].notna() & ~df["hora_fechamento"].astype(str).str.strip().str.lower().isin(["none", ""])
+    abertura_dt = coluna_data(df, "hora_abertura")
+    fechamento_dt = coluna_data(df, "hora_fechamento").where(fechado)
+    fim_dt = fechamento_dt.where(fechado, pd.Timestamp(agora_local))
+    segundos_uteis = pd.Series(calculate_working_hours_array(abertura_dt, fim_dt), index=df.index)
+
+    prazo = parse_datas(df["sla_deadline"]) if "sla_deadline" in df.columns else pd.Series(pd.NaT, index=df.index)
+
+    df = df.drop(columns=[c for c in ("hora_abertura_ts", "hora_fechamento_ts", "sla_deadline") if c in df.columns])
+    df["idade_uteis_h"] = (segundos_uteis / 3600.0).round(2)
+    df[">48h_uteis"] = (~fechado) & (df["idade_uteis_h"] > 48)
+    df["sla_vencido"] = (~fechado) & (prazo < pd.Timestamp(agora_local)).where(prazo.notna(), df[">48h_uteis"])
+    df["Prazo SLA"] = formatar_datas(prazo)
+
+    tempo_txt = segundos_uteis.map(lambda s: "Erro" if pd.isna(s) else str(timedelta(seconds=s)))
+    df["Tempo Útil"] = tempo_txt.where(fechado | abertura_dt.isna(), "Em aberto")
+    return df
+
+@cronometrar("fetch")
+def contar_chamados(status=None, ubs=None, setor=None):
+    """
+    Conta os chamados que atendem aos filtros sem transferir as linhas.
+    """
+    try:
+        query = supabase.table("chamados").select("id", count="exact", head=True)
+        resp = _filtrar_chamados(query, status, ubs, setor).execute()
+        return resp.count or 0
+    except Exception as e:
+        st.error(f"Erro ao contar chamados: {e}")
+        return 0
+
 def get_chamados_por_patrimonio(patrimonio):
     """
     Retorna todos os chamados vinculados a um patrimônio específico.
@@ -189,47 +361,6 @@ def get_chamados_por_patrimonio(patrimonio):
         st.error(f"Erro ao buscar chamados para o patrimônio {patrimonio}: {e}")
         return []
 
-def calculate_working_hours(start, end):
-    """
-    Calcula o tempo útil entre 'start' e 'end', considerando o expediente:
-      - Manhã: 08:00 a 12:00
-      - Tarde: 13:00 a 17:00
-    Ignora sábados e domingos.
-    Retorna um objeto timedelta com o tempo útil.
-    """
-    if start >= end:
-        return timedelta(0)
-    
-    total_seconds = 0
-    current = start
-
-    while current < end:
-        # Se for sábado (5) ou domingo (6), pula para o próximo dia
-        if current.weekday() >= 5:
-            current = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
-            continue
-
-        morning_start = current.replace(hour=8, minute=0, second=0, microsecond=0)
-        morning_end = current.replace(hour=12, minute=0, second=0, microsecond=0)
-        afternoon_start = current.replace(hour=13, minute=0, second=0, microsecond=0)
-        afternoon_end = current.replace(hour=17, minute=0, second=0, microsecond=0)
-
-        if end > morning_start:
-            interval_start = max(current, morning_start)
-            interval_end = min(end, morning_end)
-            if interval_end > interval_start:
-                total_seconds += (interval_end - interval_start).total_seconds()
-        
-        if end > afternoon_start:
-            interval_start = max(current, afternoon_start)
-            interval_end = min(end, afternoon_end)
-            if interval_end > interval_start:
-                total_seconds += (interval_end - interval_start).total_seconds()
-        
-        current = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
-    
-    return timedelta(seconds=total_seconds)
-
 def reabrir_chamado(id_chamado, remover_historico=False):
     """
     Reabre um chamado que foi finalizado, removendo hora_fechamento e solucao.
@@ -252,11 +383,16 @@ def reabrir_chamado(id_chamado, remover_historico=False):
         old_hora_fechamento = chamado["hora_fechamento"]
         patrimonio = chamado.get("patrimonio")
 
-        # 2) Atualiza hora_fechamento e solucao para None
+        # 2) Atualiza hora_fechamento e solucao para None; a contagem do SLA recomeça agora
         supabase.table("chamados").update({
             "hora_fechamento": None,
-            "solucao": None
+            "hora_fechamento_ts": None,
+            "solucao": None,
+            **campos_sla(chamado.get("tipo_defeito")),
         }).eq("id", id_chamado).execute()
+        marcar_alteracao()
+        invalidate_chamados_ubs_cache()
+        registrar_reabertura(chamado)
 
         # 3) Se remover_historico=True, remove o registro no historico_manutencao
         # que tenha data_manutencao == old_hora_fechamento (caso tenha sido criado ao finalizar)
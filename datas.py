@@ -0,0 +1,118 @@
+# datas.py — leitura e escrita de datas/horas (texto legado e timestamptz)
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+FORTALEZA_TZ = pytz.timezone("America/Fortaleza")
+# Formato legado das colunas de texto (hora_abertura, data_uso, ...)
+FORMATO_DATA_HORA = "%d/%m/%Y %H:%M:%S"
+FORMATO_DATA = "%d/%m/%Y"
+
+# Sufixo das colunas timestamptz criadas em sql/005_colunas_timestamptz.sql
+SUFIXO_TS = "_ts"
+
+_RE_LEGADO = r"^\d{1,2}/\d{1,2}/\d{4}"
+# ISO com fuso explícito no fim (Z, +00:00, -0300, -03)
+_RE_FUSO = r"\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}(?::?\d{2})?)$"
+_FORMATO_ISO = "ISO8601" if int(pd.__version__.split(".")[0]) >= 2 else None
+
+
+def agora():
+    """
+    Data/hora atual em Fortaleza (com fuso).
+    """
+    return datetime.now(FORTALEZA_TZ)
+
+
+def para_iso(valor):
+    """
+    Converte um datetime para ISO 8601 com fuso, pronto para uma coluna timestamptz.
+    Datetimes ingênuos são considerados horário de Fortaleza.
+    """
+    if valor is None or valor is pd.NaT:
+        return None
+    if isinstance(valor, pd.Timestamp):
+        valor = valor.to_pydatetime()
+    if valor.tzinfo is None:
+        valor = FORTALEZA_TZ.localize(valor)
+    return valor.isoformat(timespec="seconds")
+
+
+def campos_data_hora(coluna, valor=None):
+    """
+    Valores de escrita para 'coluna' durante a transição: o texto legado
+    'dd/mm/YYYY HH:MM:SS' e o timestamptz em '<coluna>_ts'.
+    Sem 'valor', usa o instante atual.
+    """
+    valor = agora() if valor is None else valor
+    local = valor.astimezone(FORTALEZA_TZ) if valor.tzinfo is not None else valor
+    return {coluna: local.strftime(FORMATO_DATA_HORA), coluna + SUFIXO_TS: para_iso(valor)}
+
+
+def parse_datas(valores):
+    """
+    Converte, de forma vetorizada, uma coluna de datas em qualquer dos formatos
+    em uso para datetime64 no horário local de Fortaleza (sem fuso):
+      - texto legado 'dd/mm/YYYY HH:MM:SS' ou 'dd/mm/YYYY';
+      - ISO 8601 com fuso (colunas timestamptz) -> convertido para Fortaleza;
+      - ISO 8601 sem fuso (estoque antigo) -> considerado horário local.
+    Valores vazios ou inválidos viram NaT. Retorna uma Series com o mesmo índice.
+    """
+    s = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    if isinstance(s.dtype, pd.DatetimeTZDtype):
+        return s.dt.tz_convert(FORTALEZA_TZ).dt.tz_localize(None)
+    if pd.api.types.is_datetime64_dtype(s.dtype):
+        return s
+
+    texto = s.astype("string").str.strip()
+    resultado = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    preenchido = texto.notna() & (texto != "")
+
+    legado = preenchido & texto.str.match(_RE_LEGADO).fillna(False)
+    if legado.any():
+        t = texto[legado]
+        convertido = pd.to_datetime(t, format=FORMATO_DATA_HORA, errors="coerce")
+        so_data = convertido.isna()
+        if so_data.any():
+            convertido[so_data] = pd.to_datetime(t[so_data], format=FORMATO_DATA, errors="coerce")
+        resultado[legado] = convertido
+
+    iso = preenchido & ~legado
+    if iso.any():
+        t = texto[iso]
+        com_fuso = t.str.contains(_RE_FUSO, regex=True).fillna(False)
+        if com_fuso.any():
+            resultado[com_fuso[com_fuso].index] = (
+                pd.to_datetime(t[com_fuso], format=_FORMATO_ISO, utc=True, errors="coerce")
+                .dt.tz_convert(FORTALEZA_TZ).dt.tz_localize(None)
+            )
+        if (~com_fuso).any():
+            resultado[com_fuso[~com_fuso].index] = pd.to_datetime(t[~com_fuso], format=_FORMATO_ISO, errors="coerce")
+    return resultado
+
+
+def coluna_data(df, coluna):
+    """
+    Lê 'coluna' de um DataFrame como datetime64 local, preferindo '<coluna>_ts'
+    (timestamptz) e caindo para o texto legado onde ela ainda estiver vazia.
+    """
+    coluna_ts = coluna + SUFIXO_TS
+    if coluna_ts not in df.columns:
+        if coluna not in df.columns:
+            return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+        return parse_datas(df[coluna])
+    resultado = parse_datas(df[coluna_ts])
+    # O texto legado só é lido nas linhas ainda sem o timestamptz
+    faltando = resultado.isna()
+    if coluna in df.columns and faltando.any():
+        resultado = resultado.copy()
+        resultado[faltando] = parse_datas(df.loc[faltando, coluna])
+    return resultado
+
+
+def formatar_datas(datas, formato=FORMATO_DATA_HORA):
+    """
+    Formata uma Series datetime64 para exibição; NaT vira texto vazio.
+    """
+    return datas.dt.strftime(formato).fillna("")
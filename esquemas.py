@@ -0,0 +1,81 @@
+# esquemas.py — DataFrames tipados de chamados e inventário
+#
+# As linhas do Supabase (listas de dicts) ou do snapshot viram DataFrames com
+# esquema explícito: textos de baixa cardinalidade como category, ids como
+# inteiros anuláveis e datas como datetime64 no horário local (datas.parse_datas).
+# Colunas fora do esquema ficam como vieram.
+import pandas as pd
+
+from datas import coluna_data, parse_datas
+
+CATEGORIA = "category"
+INTEIRO = "Int64"
+DATA = "datetime"
+
+ESQUEMA_CHAMADOS = {
+    "id": INTEIRO,
+    "protocolo": INTEIRO,
+    "ubs": CATEGORIA,
+    "setor": CATEGORIA,
+    "tipo_defeito": CATEGORIA,
+    "hora_abertura_ts": DATA,
+    "hora_fechamento_ts": DATA,
+    "sla_inicio_ts": DATA,
+    "sla_deadline": DATA,
+    "updated_at": DATA,
+}
+
+ESQUEMA_INVENTARIO = {
+    "id": INTEIRO,
+    "tipo": CATEGORIA,
+    "status": CATEGORIA,
+    "localizacao": CATEGORIA,
+    "setor": CATEGORIA,
+    "propria_locada": CATEGORIA,
+    "data_aquisicao": DATA,
+    "data_garantia_fim": DATA,
+}
+
+
+def aplicar_esquema(df, esquema):
+    """
+    Converte as colunas de 'df' presentes em 'esquema' ({coluna: CATEGORIA | INTEIRO | DATA}).
+    Valores que não convertem viram nulos. Retorna um novo DataFrame.
+    """
+    convertidas = {}
+    for coluna, tipo in esquema.items():
+        if coluna not in df.columns:
+            continue
+        serie = df[coluna]
+        if tipo == DATA:
+            convertidas[coluna] = parse_datas(serie)
+        elif tipo == INTEIRO:
+            convertidas[coluna] = pd.to_numeric(serie, errors="coerce").astype(INTEIRO)
+        elif not isinstance(serie.dtype, pd.CategoricalDtype):
+            convertidas[coluna] = serie.astype(CATEGORIA)
+    return df.assign(**convertidas)
+
+
+def _como_dataframe(linhas):
+    return linhas if isinstance(linhas, pd.DataFrame) else pd.DataFrame(linhas)
+
+
+def tabela_chamados(linhas):
+    """
+    DataFrame tipado de chamados (ESQUEMA_CHAMADOS) a partir de uma lista de dicts
+    ou de um DataFrame. Acrescenta abertura_dt/fechamento_dt (datetime64 local,
+    como no snapshot) quando ainda não existem; o texto legado é mantido para exibição.
+    """
+    df = aplicar_esquema(_como_dataframe(linhas), ESQUEMA_CHAMADOS)
+    for coluna, derivada in (("hora_abertura", "abertura_dt"), ("hora_fechamento", "fechamento_dt")):
+        if derivada not in df.columns and (coluna in df.columns or coluna + "_ts" in df.columns):
+            df[derivada] = coluna_data(df, coluna)
+    return df
+
+
+def tabela_inventario(linhas):
+    """
+    DataFrame tipado do inventário (ESQUEMA_INVENTARIO) a partir de uma lista de dicts
+    ou de um DataFrame.
+    """
+    return aplicar_esquema(_como_dataframe(linhas), ESQUEMA_INVENTARIO)
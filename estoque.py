@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
 from supabase_client import supabase
+from datas import campos_data_hora, parse_datas, coluna_data, formatar_datas
 
 def get_estoque():
     """
@@ -18,30 +18,43 @@ def get_estoque():
 def add_peca(nome, quantidade, descricao="", nota_fiscal=None, data_adicao=None):
     """
     Adiciona uma peça ao estoque.
-    - data_adicao: se não fornecida, usa a data/hora atual.
+    - data_adicao: datetime ou texto ('dd/mm/YYYY HH:MM:SS' ou ISO); se não fornecida,
+      usa a data/hora atual. É gravada no texto legado e em data_adicao_ts.
     - nota_fiscal: opcional.
+    A peça e a quantidade inicial (movimento de entrada) são gravadas juntas,
+    em uma única requisição (RPC adicionar_peca).
     """
     try:
-        if data_adicao is None:
-            data_adicao = datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        if isinstance(data_adicao, str):
+            data_adicao = parse_datas([data_adicao]).iloc[0]
+            data_adicao = None if pd.isna(data_adicao) else data_adicao.to_pydatetime()
         data = {
             "nome": nome,
-            "quantidade": quantidade,
             "descricao": descricao,
             "nota_fiscal": nota_fiscal,
-            "data_adicao": data_adicao
         }
-        supabase.table("estoque").insert(data).execute()
+        data.update(campos_data_hora("data_adicao", data_adicao))
+        supabase.rpc("adicionar_peca", {
+            "p_peca": data,
+            "p_quantidade": int(quantidade or 0),
+            "p_username": st.session_state.get("username") or None,
+        }).execute()
         st.success("Peça adicionada ao estoque com sucesso!")
     except Exception as e:
         st.error(f"Erro ao adicionar peça: {e}")
 
 def update_peca(id_peca, new_values):
     """
-    Atualiza os dados da peça identificada pelo id.
+    Atualiza os dados da peça identificada pelo id. Uma nova 'quantidade' não é
+    gravada diretamente: vira um movimento de ajuste para o saldo informado.
     """
+    new_values = dict(new_values)
+    saldo = new_values.pop("quantidade", None)
     try:
-        supabase.table("estoque").update(new_values).eq("id", id_peca).execute()
+        if new_values:
+            supabase.table("estoque").update(new_values).eq("id", id_peca).execute()
+        if saldo is not None and registrar_movimento(id_peca, "ajuste", saldo=saldo, observacao="Edição da peça") is None:
+            return
         st.success("Peça atualizada com sucesso!")
     except Exception as e:
         st.error(f"Erro ao atualizar peça: {e}")
@@ -56,42 +69,137 @@ def delete_peca(id_peca):
     except Exception as e:
         st.error(f"Erro ao excluir peça: {e}")
 
-def dar_baixa_estoque(peca_nome, quantidade_usada=1):
+# =====================================================
+# Movimentações (livro estoque_movimentos, ver sql/009_estoque_movimentos.sql)
+# =====================================================
+TIPOS_MOVIMENTO = {"entrada": "Entrada", "saida": "Saída", "ajuste": "Ajuste"}
+COLUNAS_MOVIMENTOS = "id,estoque_id,peca_nome,tipo,quantidade,saldo_apos,chamado_id,nota_fiscal,observacao,username,criado_em"
+
+def aplicar_movimentos(movimentos):
     """
-    Dá baixa no estoque: reduz a quantidade da peça 'peca_nome' pelo valor 'quantidade_usada'.
-    Se a quantidade resultar negativa, ela é ajustada para zero.
+    Aplica um lote de movimentos em uma única requisição (RPC aplicar_movimentos):
+    cada um vira uma linha em estoque_movimentos e atualiza o saldo da peça no
+    servidor, com a linha travada, então baixas simultâneas não se perdem.
+    Cada movimento: estoque_id ou nome, tipo (TIPOS_MOVIMENTO), quantidade
+    (ou saldo, no ajuste) e, opcionalmente, chamado_id, nota_fiscal, observacao, username.
+    Retorna {"movimentos": [...], "nao_encontradas": [...]}, ou None em caso de erro.
     """
+    if not movimentos:
+        return {"movimentos": [], "nao_encontradas": []}
     try:
-        resp = supabase.table("estoque").select("*").eq("nome", peca_nome).execute()
-        if not resp.data:
-            st.warning(f"Peça '{peca_nome}' não encontrada no estoque.")
-            return
-        item = resp.data[0]
-        nova_quantidade = item.get("quantidade", 0) - quantidade_usada
-        if nova_quantidade < 0:
-            nova_quantidade = 0
-        supabase.table("estoque").update({"quantidade": nova_quantidade}).eq("id", item["id"]).execute()
-        st.success(f"Baixa efetuada: {peca_nome} agora possui {nova_quantidade} unidades.")
+        resp = supabase.rpc("aplicar_movimentos", {"p_movimentos": movimentos}).execute()
+        return resp.data or {"movimentos": [], "nao_encontradas": []}
     except Exception as e:
-        st.error(f"Erro ao dar baixa no estoque: {e}")
+        st.error(f"Erro ao registrar movimentação de estoque: {e}")
+        return None
+
+def registrar_movimento(estoque_id, tipo, quantidade=0, saldo=None, chamado_id=None, nota_fiscal=None, observacao=None):
+    """
+    Registra um movimento de uma peça. Retorna o movimento aplicado
+    (com quantidade efetiva e saldo_apos) ou None.
+    """
+    resultado = aplicar_movimentos([{
+        "estoque_id": estoque_id,
+        "tipo": tipo,
+        "quantidade": quantidade,
+        "saldo": saldo,
+        "chamado_id": chamado_id,
+        "nota_fiscal": nota_fiscal,
+        "observacao": observacao,
+        "username": st.session_state.get("username") or None,
+    }])
+    if resultado is None:
+        return None
+    for nome in resultado.get("nao_encontradas") or []:
+        st.warning(f"Peça '{nome}' não encontrada no estoque.")
+    return resultado["movimentos"][0] if resultado.get("movimentos") else None
+
+def dar_baixa_estoque(peca_nome, quantidade_usada=1, chamado_id=None):
+    """
+    Dá baixa no estoque: saída de 'quantidade_usada' unidades da peça 'peca_nome'
+    (primeiro item com esse nome), em uma única requisição. O saldo nunca fica negativo.
+    """
+    resultado = aplicar_movimentos([{
+        "nome": peca_nome, "tipo": "saida", "quantidade": quantidade_usada, "chamado_id": chamado_id,
+        "username": st.session_state.get("username") or None,
+    }])
+    if resultado is None:
+        return
+    if not resultado.get("movimentos"):
+        st.warning(f"Peça '{peca_nome}' não encontrada no estoque.")
+        return
+    st.success(f"Baixa efetuada: {peca_nome} agora possui {resultado['movimentos'][0]['saldo_apos']} unidades.")
+
+def get_movimentos(estoque_id=None, limite=200):
+    """
+    Últimos 'limite' movimentos (de uma peça ou de todas), do mais recente para o mais antigo.
+    """
+    try:
+        query = supabase.table("estoque_movimentos").select(COLUNAS_MOVIMENTOS)
+        if estoque_id is not None:
+            query = query.eq("estoque_id", estoque_id)
+        resp = query.order("id", desc=True).limit(limite).execute()
+        return resp.data if resp.data else []
+    except Exception as e:
+        st.error(f"Erro ao recuperar movimentações do estoque: {e}")
+        return []
 
 def manage_estoque():
     st.subheader("Gerenciar Estoque de Peças de Informática")
-    action = st.selectbox("Ação", ["Listar", "Adicionar", "Editar", "Remover"])
+    action = st.selectbox("Ação", ["Listar", "Movimentar", "Histórico", "Adicionar", "Editar", "Remover"])
     
     if action == "Listar":
         estoque_data = get_estoque()
         if estoque_data:
-            for item in estoque_data:
-                if item.get("data_adicao"):
-                    try:
-                        item["data_adicao"] = datetime.fromisoformat(item["data_adicao"]).strftime('%d/%m/%Y %H:%M:%S')
-                    except:
-                        pass
-            st.dataframe(pd.DataFrame(estoque_data))
+            df = pd.DataFrame(estoque_data)
+            # data_adicao mistura 'dd/mm/YYYY HH:MM:SS' e ISO; exibe tudo no formato local
+            if "data_adicao" in df.columns or "data_adicao_ts" in df.columns:
+                df["data_adicao"] = formatar_datas(coluna_data(df, "data_adicao"))
+                df = df.drop(columns=["data_adicao_ts"], errors="ignore")
+            st.dataframe(df)
         else:
             st.write("Estoque vazio.")
 
+    elif action == "Movimentar":
+        estoque_data = get_estoque()
+        if estoque_data:
+            pecas = {item["id"]: item for item in estoque_data}
+            id_peca = st.selectbox(
+                "Peça", list(pecas),
+                format_func=lambda i: f"{pecas[i]['nome']} (saldo: {pecas[i].get('quantidade') or 0})"
+            )
+            tipo = st.radio("Tipo", list(TIPOS_MOVIMENTO), format_func=TIPOS_MOVIMENTO.get, horizontal=True)
+            if tipo == "ajuste":
+                saldo = st.number_input("Saldo contado", min_value=0, step=1, value=int(pecas[id_peca].get("quantidade") or 0))
+                quantidade = 0
+            else:
+                saldo = None
+                quantidade = st.number_input("Quantidade", min_value=1, step=1)
+            nota_fiscal = st.text_input("Número da Nota Fiscal (opcional)") if tipo == "entrada" else ""
+            observacao = st.text_input("Observação (opcional)")
+            if st.button("Registrar Movimento", type="primary"):
+                movimento = registrar_movimento(
+                    id_peca, tipo, quantidade, saldo=saldo,
+                    nota_fiscal=nota_fiscal or None, observacao=observacao or None
+                )
+                if movimento:
+                    st.success(f"Movimento registrado: {movimento['peca_nome']} agora possui {movimento['saldo_apos']} unidades.")
+        else:
+            st.write("Estoque vazio.")
+
+    elif action == "Histórico":
+        estoque_data = get_estoque()
+        pecas = {item["id"]: item["nome"] for item in estoque_data}
+        filtro = st.selectbox("Peça", [None] + list(pecas), format_func=lambda i: "Todas" if i is None else pecas[i])
+        movimentos = get_movimentos(filtro)
+        if movimentos:
+            df = pd.DataFrame(movimentos)
+            df["tipo"] = df["tipo"].map(TIPOS_MOVIMENTO).fillna(df["tipo"])
+            df["criado_em"] = formatar_datas(parse_datas(df["criado_em"]))
+            st.dataframe(df.drop(columns=["id", "estoque_id"]), use_container_width=True, hide_index=True)
+        else:
+            st.write("Nenhuma movimentação registrada.")
+
     elif action == "Adicionar":
         nome = st.text_input("Nome da Peça")
         quantidade = st.number_input("Quantidade", min_value=0, step=1)
@@ -110,17 +218,22 @@ def manage_estoque():
             st.dataframe(df)
             id_peca = st.selectbox("Selecione o ID da peça para editar", df["id"].tolist())
             if id_peca:
-                nome = st.text_input("Nome da Peça")
-                quantidade = st.number_input("Quantidade", min_value=0, step=1)
-                descricao = st.text_area("Descrição (opcional)")
-                nota_fiscal = st.text_input("Número da Nota Fiscal (opcional)")
+                atual = next(item for item in estoque_data if item["id"] == id_peca)
+                nome = st.text_input("Nome da Peça", value=atual.get("nome") or "")
+                quantidade = st.number_input(
+                    "Quantidade (alterar gera um ajuste no histórico)", min_value=0, step=1,
+                    value=int(atual.get("quantidade") or 0)
+                )
+                descricao = st.text_area("Descrição (opcional)", value=atual.get("descricao") or "")
+                nota_fiscal = st.text_input("Número da Nota Fiscal (opcional)", value=atual.get("nota_fiscal") or "")
                 if st.button("Atualizar Peça"):
                     new_values = {
                         "nome": nome,
-                        "quantidade": quantidade,
                         "descricao": descricao,
                         "nota_fiscal": nota_fiscal
                     }
+                    if quantidade != int(atual.get("quantidade") or 0):
+                        new_values["quantidade"] = quantidade
                     update_peca(id_peca, new_values)
         else:
             st.write("Estoque vazio para edição.")
@@ -0,0 +1,200 @@
+# exportacao.py — exportações em lotes (CSV, CSV gzip, Parquet, Excel) com memória constante
+import gzip
+import io
+import os
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+from supabase_client import supabase
+from metricas import cronometrar
+
+# Linhas por requisição/bloco (abaixo do limite de linhas do PostgREST)
+EXPORT_LOTE = int(os.getenv("EXPORT_LOTE", "1000"))
+
+# =====================================================
+# Fontes de dados (iteradores de blocos)
+# =====================================================
+def paginar_tabela(tabela, colunas="*", lote=EXPORT_LOTE):
+    """
+    Lê 'tabela' do Supabase em blocos de 'lote' linhas (keyset por id) e gera
+    um DataFrame por bloco. Só um bloco fica em memória por vez.
+    """
+    ultimo_id = None
+    while True:
+        query = supabase.table(tabela).select(colunas)
+        if ultimo_id is not None:
+            query = query.gt("id", ultimo_id)
+        resp = query.order("id").limit(lote).execute()
+        linhas = resp.data or []
+        if linhas:
+            yield pd.DataFrame(linhas)
+        if len(linhas) < lote:
+            break
+        ultimo_id = linhas[-1]["id"]
+
+def blocos_dataframe(df, lote=EXPORT_LOTE):
+    """
+    Gera fatias de 'df' com até 'lote' linhas (views, sem copiar o DataFrame).
+    """
+    for inicio in range(0, len(df), lote):
+        yield df.iloc[inicio:inicio + lote]
+
+# =====================================================
+# Escritores (destino: arquivo binário aberto)
+# =====================================================
+def escrever_csv(blocos, destino, comprimir=False):
+    """
+    Escreve os blocos como CSV UTF-8, com cabeçalho só no primeiro bloco.
+    Com 'comprimir', a saída é gzip. Retorna o número de linhas escritas.
+    """
+    saida = gzip.GzipFile(fileobj=destino, mode="wb") if comprimir else destino
+    texto = io.TextIOWrapper(saida, encoding="utf-8", newline="")
+    total, colunas = 0, None
+    try:
+        for bloco in blocos:
+            if colunas is None:
+                colunas = list(bloco.columns)
+            bloco.reindex(columns=colunas).to_csv(texto, index=False, header=(total == 0))
+            total += len(bloco)
+    finally:
+        texto.flush()
+        texto.detach()
+        if comprimir:
+            saida.close()
+    return total
+
+def escrever_parquet(blocos, destino):
+    """
+    Escreve os blocos como um único arquivo Parquet (um row group por bloco).
+    O esquema vem do primeiro bloco; colunas só com nulos nele viram texto, e nos
+    blocos seguintes os valores dessas colunas são gravados como texto.
+    Retorna o número de linhas escritas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, esquema, texto, total = None, None, [], 0
+    try:
+        for bloco in blocos:
+            if esquema is None:
+                inicial = pa.Table.from_pandas(bloco, preserve_index=False).schema
+                esquema = pa.schema([
+                    pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f.remove_metadata()
+                    for f in inicial
+                ])
+                texto = [f.name for f in esquema if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)]
+                writer = pq.ParquetWriter(destino, esquema, compression="zstd")
+            bloco = bloco.reindex(columns=esquema.names)
+            # Um número/data em coluna que o esquema congelou como texto viraria ArrowTypeError
+            bloco = bloco.assign(**{c: bloco[c].astype("string") for c in texto})
+            tabela = pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False, safe=False)
+            writer.write_table(tabela)
+            total += len(bloco)
+        if writer is None:
+            pq.write_table(pa.table({}), destino)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total
+
+def _bloco_excel(bloco):
+    """
+    Prepara o bloco para o XlsxWriter de uma vez: datas/objetos viram texto e
+    nulos/NaN viram None (célula vazia).
+    """
+    bloco = bloco.copy()
+    for c in bloco.columns:
+        serie = bloco[c]
+        if not (pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_bool_dtype(serie)):
+            bloco[c] = serie.astype("string")
+    bloco = bloco.astype(object)
+    return bloco.where(bloco.notna(), None)
+
+def escrever_excel(abas, destino):
+    """
+    Escreve uma planilha com uma aba por item de 'abas' ({nome: blocos}) usando o modo
+    constant_memory do XlsxWriter: cada linha vai para disco assim que é escrita.
+    Retorna o número total de linhas escritas.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(destino, {"constant_memory": True, "in_memory": False})
+    negrito = workbook.add_format({"bold": True})
+    total = 0
+    try:
+        for nome, blocos in abas.items():
+            planilha = workbook.add_worksheet(nome[:31])
+            linha, colunas = 0, None
+            for bloco in blocos:
+                if colunas is None:
+                    colunas = [str(c) for c in bloco.columns]
+                    planilha.write_row(0, 0, colunas, negrito)
+                    linha = 1
+                for registro in _bloco_excel(bloco).itertuples(index=False, name=None):
+                    planilha.write_row(linha, 0, registro)
+                    linha += 1
+            total += max(linha - 1, 0)
+    finally:
+        workbook.close()
+    return total
+
+# =====================================================
+# Formatos oferecidos na interface
+# =====================================================
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+FORMATOS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Excel": (".xlsx", MIME_XLSX),
+}
+
+def escrever_formato(formato, abas, destino):
+    """
+    Escreve 'abas' ({nome: blocos}) em 'destino' no formato escolhido.
+    CSV e Parquet levam só a primeira aba (formatos de tabela única).
+    """
+    if formato == "Excel":
+        return escrever_excel(abas, destino)
+    blocos = next(iter(abas.values()))
+    if formato == "Parquet":
+        return escrever_parquet(blocos, destino)
+    return escrever_csv(blocos, destino, comprimir=(formato == "CSV (gzip)"))
+
+@cronometrar("export")
+def exportacao_sob_demanda(chave, nome_base, gerar_abas, formatos=tuple(FORMATOS)):
+    """
+    Seletor de formato + botão "Gerar arquivo". O arquivo só é produzido quando o
+    botão é clicado: 'gerar_abas()' devolve {nome: blocos}, a saída vai para um
+    arquivo temporário e o download lê desse arquivo.
+    """
+    col_fmt, col_btn = st.columns([2, 1])
+    formato = col_fmt.selectbox("Formato", list(formatos), key=f"{chave}_formato")
+    col_btn.write("")
+    if not col_btn.button("Gerar arquivo", key=f"{chave}_gerar"):
+        return
+    extensao, mime = FORMATOS[formato]
+    tmp = tempfile.NamedTemporaryFile(suffix=extensao, delete=False)
+    try:
+        with st.spinner("Gerando arquivo..."):
+            with tmp:
+                total = escrever_formato(formato, gerar_abas(), tmp)
+    except Exception as e:
+        st.error("Erro ao gerar o arquivo de exportação.")
+        print(f"Erro na exportação ({chave}): {e}")
+        os.remove(tmp.name)
+        return
+    try:
+        st.caption(f"{total} linha(s) exportada(s).")
+        with open(tmp.name, "rb") as arquivo:
+            st.download_button(
+                f"Baixar {formato}",
+                data=arquivo,
+                file_name=f"{nome_base}{extensao}",
+                mime=mime,
+                key=f"{chave}_baixar",
+            )
+    finally:
+        os.remove(tmp.name)
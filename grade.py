@@ -0,0 +1,64 @@
+# grade.py — tabelas AgGrid leves: uma página de linhas e só as colunas exibidas
+#
+# A ordenação, os filtros e a paginação ficam na camada de dados (servidor ou
+# snapshot); a grade só mostra a página recebida, com texto longo truncado, e
+# devolve a linha selecionada para a página carregar o detalhe completo.
+import os
+
+import pandas as pd
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+
+from metricas import fase
+
+# Caracteres exibidos nas colunas de texto longo (o texto completo fica no detalhe)
+GRADE_TEXTO_MAX = int(os.getenv("GRADE_TEXTO_MAX", "80"))
+
+
+def truncar_texto(serie, limite=GRADE_TEXTO_MAX):
+    texto = serie.astype(object).fillna("").astype(str)
+    return texto.where(texto.str.len() <= limite, texto.str.slice(0, limite - 1) + "…")
+
+
+def exibir_grade(df, colunas, chave, truncadas=(), ocultas=(), fixada=None, estilo_linha=None, altura=460, key=None):
+    """
+    Mostra as 'colunas' de 'df' (uma página já ordenada e filtrada) em uma grade de
+    seleção única. 'chave' e 'ocultas' vão ocultas (identificação da linha e
+    estilo); as colunas em 'truncadas' são cortadas em GRADE_TEXTO_MAX caracteres.
+    Retorna o valor de 'chave' na linha selecionada, ou None.
+    """
+    visiveis = [c for c in colunas if c in df.columns]
+    extras = [c for c in dict.fromkeys((chave, *ocultas)) if c in df.columns and c not in visiveis]
+    dfg = df[visiveis + extras].copy()
+    for coluna in truncadas:
+        if coluna in dfg.columns:
+            dfg[coluna] = truncar_texto(dfg[coluna])
+
+    gb = GridOptionsBuilder.from_dataframe(dfg)
+    gb.configure_default_column(filter=False, sortable=False, resizable=True, minColumnWidth=120, flex=1)
+    for coluna in extras:
+        gb.configure_column(coluna, hide=True)
+    if fixada in visiveis:
+        gb.configure_column(fixada, pinned="left")
+    gb.configure_selection("single")
+    if estilo_linha is not None:
+        gb.configure_grid_options(getRowStyle=estilo_linha)
+    grid_options = gb.build()
+    grid_options["domLayout"] = "normal"
+
+    with fase("grid"):
+        resposta = AgGrid(
+            dfg,
+            gridOptions=grid_options,
+            height=altura,
+            theme="streamlit",
+            update_mode=GridUpdateMode.SELECTION_CHANGED,
+            enable_enterprise_modules=False,
+            allow_unsafe_jscode=True,
+            key=key,
+        )
+    selecionadas = resposta.selected_rows
+    if selecionadas is None or len(selecionadas) == 0:
+        return None
+    if isinstance(selecionadas, pd.DataFrame):
+        return selecionadas.iloc[0][chave]
+    return selecionadas[0].get(chave)
@@ -0,0 +1,171 @@
+# horas_uteis.py
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from datas import FORTALEZA_TZ, parse_datas
+
+# Expediente: 08:00–12:00 e 13:00–17:00, de segunda a sexta
+JANELAS_EXPEDIENTE = ((8 * 3600, 12 * 3600), (13 * 3600, 17 * 3600))
+SEGUNDOS_UTEIS_DIA = sum(fim - ini for ini, fim in JANELAS_EXPEDIENTE)
+
+_ANCORA = np.datetime64("1970-01-01", "D")
+
+
+def to_local_naive(value):
+    """
+    Converte um datetime com fuso para o horário local de Fortaleza sem tzinfo.
+    Datetimes ingênuos já são considerados horário local e voltam inalterados.
+    """
+    if value is None or value is pd.NaT:
+        return value
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if value.tzinfo is not None:
+        value = value.astimezone(FORTALEZA_TZ).replace(tzinfo=None)
+    return value
+
+
+def calculate_working_hours(start, end):
+    """
+    Calcula o tempo útil entre 'start' e 'end', considerando o expediente:
+      - Manhã: 08:00 a 12:00
+      - Tarde: 13:00 a 17:00
+    Ignora sábados e domingos.
+    Aceita datetimes ingênuos (horário de Fortaleza) ou com fuso, inclusive misturados.
+    Retorna um objeto timedelta com o tempo útil.
+    """
+    start = to_local_naive(start)
+    end = to_local_naive(end)
+    if start >= end:
+        return timedelta(0)
+
+    total_seconds = 0
+    current = start
+
+    while current < end:
+        # Se for sábado (5) ou domingo (6), pula para o próximo dia
+        if current.weekday() >= 5:
+            current = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+            continue
+
+        morning_start = current.replace(hour=8, minute=0, second=0, microsecond=0)
+        morning_end = current.replace(hour=12, minute=0, second=0, microsecond=0)
+        afternoon_start = current.replace(hour=13, minute=0, second=0, microsecond=0)
+        afternoon_end = current.replace(hour=17, minute=0, second=0, microsecond=0)
+
+        if end > morning_start:
+            interval_start = max(current, morning_start)
+            interval_end = min(end, morning_end)
+            if interval_end > interval_start:
+                total_seconds += (interval_end - interval_start).total_seconds()
+
+        if end > afternoon_start:
+            interval_start = max(current, afternoon_start)
+            interval_end = min(end, afternoon_end)
+            if interval_end > interval_start:
+                total_seconds += (interval_end - interval_start).total_seconds()
+
+        current = datetime.combine(current.date() + timedelta(days=1), datetime.min.time())
+
+    return timedelta(seconds=total_seconds)
+
+
+def _as_datetime64(values):
+    """
+    Normaliza escalares, listas, arrays ou Series para datetime64[us] no horário
+    local de Fortaleza (sem fuso). Strings podem estar no formato legado
+    'dd/mm/YYYY HH:MM:SS' ou em ISO 8601 (ver datas.parse_datas);
+    valores inválidos viram NaT.
+    """
+    if values is None or isinstance(values, (datetime, pd.Timestamp, str)) or values is pd.NaT:
+        values = [values]
+    if not isinstance(values, (pd.Series, pd.Index, np.ndarray)):
+        values = list(values)
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+
+    if isinstance(s.dtype, pd.DatetimeTZDtype):
+        s = s.dt.tz_convert(FORTALEZA_TZ).dt.tz_localize(None)
+    elif not pd.api.types.is_datetime64_dtype(s.dtype):
+        non_null = s.dropna()
+        if not non_null.empty and isinstance(non_null.iloc[0], str):
+            s = parse_datas(s)
+        else:
+            s = pd.to_datetime(s.map(to_local_naive), errors="coerce")
+    return s.to_numpy(dtype="datetime64[us]")
+
+
+def _segundos_acumulados(ts):
+    """
+    Segundos úteis decorridos entre a âncora (1970-01-01) e cada instante de 'ts'.
+    A diferença entre dois acumulados é o tempo útil do intervalo.
+    """
+    dias = ts.astype("datetime64[D]")
+    seg_no_dia = (ts - dias).astype("timedelta64[us]").astype(np.float64) / 1e6
+    completos = np.busday_count(_ANCORA, dias).astype(np.float64) * SEGUNDOS_UTEIS_DIA
+    parcial = np.zeros_like(seg_no_dia)
+    for ini, fim in JANELAS_EXPEDIENTE:
+        parcial += np.clip(seg_no_dia - ini, 0, fim - ini)
+    return completos + np.where(np.is_busday(dias), parcial, 0.0)
+
+
+def calculate_working_hours_array(starts, ends):
+    """
+    Versão vetorizada de calculate_working_hours para colunas inteiras.
+    - starts/ends: Series, arrays, listas, strings 'dd/mm/YYYY HH:MM:SS' ou um
+      único datetime (ex.: agora), que é replicado para todas as linhas.
+    Retorna um np.ndarray float64 com os segundos úteis de cada par;
+    NaN onde a abertura ou o fechamento estiverem ausentes ou inválidos.
+    """
+    ini, fim = np.broadcast_arrays(_as_datetime64(starts), _as_datetime64(ends))
+    invalido = np.isnat(ini) | np.isnat(fim)
+    ini = np.where(invalido, _ANCORA, ini)
+    fim = np.where(invalido, _ANCORA, fim)
+
+    segundos = _segundos_acumulados(fim) - _segundos_acumulados(ini)
+    # arredonda ao microssegundo, como timedelta.total_seconds() no cálculo escalar
+    segundos = np.where(fim > ini, np.round(segundos, 6), 0.0)
+    return np.where(invalido, np.nan, segundos)
+
+
+def add_working_hours_array(starts, horas):
+    """
+    Inverso de calculate_working_hours_array: para cada início, o primeiro instante
+    em que o tempo útil decorrido chega a 'horas' (escalar ou um valor por linha).
+    - starts: mesmos formatos aceitos por calculate_working_hours_array.
+    Retorna um np.ndarray datetime64[us] no horário local de Fortaleza (sem fuso);
+    NaT onde o início ou as horas forem inválidos. Com horas <= 0, devolve o próprio início.
+    """
+    ini = _as_datetime64(starts)
+    ini, horas = np.broadcast_arrays(ini, np.asarray(horas, dtype=np.float64))
+    invalido = np.isnat(ini) | np.isnan(horas)
+    base = np.where(invalido, _ANCORA, ini).astype("datetime64[us]")
+    segundos = np.where(invalido | (horas < 0), 0.0, horas) * 3600.0
+
+    # Dia útil (contado a partir da âncora) em que o acumulado atinge o alvo e o resto nesse dia
+    alvo = _segundos_acumulados(base) + segundos
+    dia_util = np.ceil(alvo / SEGUNDOS_UTEIS_DIA) - 1
+    resto = alvo - dia_util * SEGUNDOS_UTEIS_DIA
+    dia = np.busday_offset(_ANCORA, dia_util.astype(np.int64), roll="forward")
+
+    # Resto -> horário: percorre as janelas do expediente até a que comporta o resto
+    seg_no_dia = np.full_like(resto, np.nan)
+    for ini_janela, fim_janela in JANELAS_EXPEDIENTE:
+        cabe = np.isnan(seg_no_dia) & (resto <= fim_janela - ini_janela)
+        seg_no_dia = np.where(cabe, ini_janela + resto, seg_no_dia)
+        resto = resto - (fim_janela - ini_janela)
+    seg_no_dia = np.nan_to_num(seg_no_dia)
+
+    prazo = dia.astype("datetime64[us]") + np.round(seg_no_dia * 1e6).astype("timedelta64[us]")
+    prazo = np.where(segundos > 0, prazo, base)
+    return np.where(invalido, np.datetime64("NaT", "us"), prazo)
+
+
+def add_working_hours(start, horas):
+    """
+    Soma 'horas' úteis a 'start' (mesmo expediente de calculate_working_hours).
+    Retorna um datetime ingênuo no horário de Fortaleza, ou None se 'start' for inválido.
+    """
+    prazo = add_working_hours_array(start, horas)[0]
+    return None if np.isnat(prazo) else pd.Timestamp(prazo).to_pydatetime()
@@ -0,0 +1,250 @@
+# instrumentacao.py — registro das requisições ao Supabase e orçamento de consultas por página/fluxo
+#
+# supabase_client.py embrulha o cliente com instrumentar(); fora de um registro
+# ativo o custo é só o de repassar as chamadas. Uso:
+#
+#   with registrar_requisicoes("Inventário") as registro:
+#       show_inventory_list()
+#   print(registro.resumo())
+#
+#   with orcamento_consultas(max_consultas=3, max_bytes=200_000, descricao="histórico da máquina"):
+#       ...   # levanta OrcamentoExcedido se o trecho passar do orçamento
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Se > 0, o roteador do app avisa no log quando uma página passa deste número de requisições
+ORCAMENTO_CONSULTAS_PAGINA = int(os.getenv("ORCAMENTO_CONSULTAS_PAGINA", "0"))
+
+# Métodos do query builder que definem a operação e os que entram na "forma" da consulta
+_OPERACOES = {"select", "insert", "upsert", "update", "delete"}
+_FILTROS = {
+    "eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "is_", "in_",
+    "contains", "match", "or_", "order", "limit", "range", "single",
+}
+
+_registros_ativos = ContextVar("registros_requisicoes", default=())
+
+
+class OrcamentoExcedido(AssertionError):
+    """
+    Um trecho fez mais requisições (ou transferiu mais bytes) do que o orçamento declarado.
+    """
+
+
+class RegistroRequisicoes:
+    """
+    Requisições feitas dentro de um registrar_requisicoes(). Cada item é um dict com:
+    tipo ("tabela"/"rpc"), alvo, operacao, filtros, forma, linhas, bytes, ms e erro.
+    """
+    def __init__(self, rotulo=None):
+        self.rotulo = rotulo
+        self.requisicoes = []
+
+    @property
+    def total_consultas(self):
+        return len(self.requisicoes)
+
+    @property
+    def total_linhas(self):
+        return sum(r["linhas"] for r in self.requisicoes)
+
+    @property
+    def total_bytes(self):
+        return sum(r["bytes"] for r in self.requisicoes)
+
+    @property
+    def total_ms(self):
+        return sum(r["ms"] for r in self.requisicoes)
+
+    def repetidas(self, minimo=2):
+        """
+        Formas de consulta (alvo + operação + colunas filtradas) que se repetem
+        'minimo' vezes ou mais: o sinal típico de um N+1.
+        """
+        contagem = Counter(r["forma"] for r in self.requisicoes)
+        return [(forma, qtd) for forma, qtd in contagem.most_common() if qtd >= minimo]
+
+    def resumo(self):
+        linhas = [
+            f"{self.rotulo or 'requisições'}: {self.total_consultas} requisição(ões), "
+            f"{self.total_linhas} linha(s), {self.total_bytes} bytes, {self.total_ms:.1f} ms"
+        ]
+        for r in self.requisicoes:
+            linhas.append(
+                f"  {r['operacao']} {r['alvo']} {' '.join(r['filtros'])} -> "
+                f"{r['linhas']} linha(s), {r['bytes']} bytes, {r['ms']:.1f} ms"
+                + (f" [erro: {r['erro']}]" if r["erro"] else "")
+            )
+        for forma, qtd in self.repetidas():
+            linhas.append(f"  repetida {qtd}x: {forma}")
+        return "\n".join(linhas)
+
+
+def _tamanho(dados):
+    try:
+        return len(json.dumps(dados, default=str, ensure_ascii=False).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _descrever(nome, args, kwargs):
+    """
+    ('eq', ('ubs', 'UBS 001')) -> ("eq(ubs='UBS 001')", "eq(ubs)").
+    """
+    nome = nome.rstrip("_")
+    if not args:
+        return f"{nome}()", f"{nome}()"
+    if nome in ("or", "limit", "range"):
+        return f"{nome}({', '.join(map(repr, args))})", nome
+    if nome == "match":
+        return f"match({args[0]!r})", f"match({','.join(sorted(args[0]))})"
+    valor = ", ".join(repr(a) for a in args[1:])
+    extras = "".join(f", {k}={v!r}" for k, v in kwargs.items())
+    return f"{nome}({args[0]}{'=' + valor if valor else ''}{extras})", f"{nome}({args[0]})"
+
+
+def _registrar(tipo, alvo, operacao, filtros, formas, inicio, dados=None, erro=None):
+    registros = _registros_ativos.get()
+    if not registros:
+        return
+    linhas = len(dados) if isinstance(dados, list) else (0 if dados is None else 1)
+    requisicao = {
+        "tipo": tipo,
+        "alvo": alvo,
+        "operacao": operacao,
+        "filtros": list(filtros),
+        "forma": " ".join([operacao, alvo] + list(formas)),
+        "linhas": linhas,
+        "bytes": _tamanho(dados) if dados is not None else 0,
+        "ms": (time.perf_counter() - inicio) * 1000.0,
+        "erro": None if erro is None else str(erro),
+    }
+    for registro in registros:
+        registro.requisicoes.append(requisicao)
+
+
+class _ConsultaInstrumentada:
+    """
+    Repassa o query builder do postgrest-py (ou do cliente fake), acumulando
+    operação e filtros; o execute() é cronometrado e registrado.
+    """
+    def __init__(self, alvo, tipo, nome, operacao="select", filtros=(), formas=()):
+        self._alvo = alvo
+        self._tipo = tipo
+        self._nome = nome
+        self._operacao = operacao
+        self._filtros = tuple(filtros)
+        self._formas = tuple(formas)
+
+    def _derivar(self, alvo, operacao=None, filtro=None, forma=None):
+        return _ConsultaInstrumentada(
+            alvo, self._tipo, self._nome, operacao or self._operacao,
+            self._filtros + ((filtro,) if filtro else ()), self._formas + ((forma,) if forma else ()),
+        )
+
+    @property
+    def not_(self):
+        return self._derivar(self._alvo.not_, filtro="not", forma="not")
+
+    def execute(self):
+        inicio = time.perf_counter()
+        try:
+            resp = self._alvo.execute()
+        except Exception as e:
+            _registrar(self._tipo, self._nome, self._operacao, self._filtros, self._formas, inicio, erro=e)
+            raise
+        _registrar(self._tipo, self._nome, self._operacao, self._filtros, self._formas, inicio, getattr(resp, "data", None))
+        return resp
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if not callable(valor):
+            return valor
+
+        def chamada(*args, **kwargs):
+            resultado = valor(*args, **kwargs)
+            if not hasattr(resultado, "execute"):
+                return resultado
+            if nome in _OPERACOES:
+                return self._derivar(resultado, operacao=nome)
+            if nome in _FILTROS:
+                filtro, forma = _descrever(nome, args, kwargs)
+                # limit/range mudam o volume, não a forma do N+1
+                return self._derivar(resultado, filtro=filtro, forma=None if nome in ("limit", "range") else forma)
+            return self._derivar(resultado)
+        return chamada
+
+
+class ClienteInstrumentado:
+    """
+    Embrulha um cliente Supabase: table()/from_()/rpc() passam a ser registradas;
+    os demais atributos (auth, storage, estatisticas() do fake...) são repassados.
+    """
+    def __init__(self, cliente):
+        self._cliente = cliente
+
+    def table(self, nome):
+        return _ConsultaInstrumentada(self._cliente.table(nome), "tabela", nome)
+
+    from_ = table
+
+    def rpc(self, nome, params=None, **kwargs):
+        return _ConsultaInstrumentada(self._cliente.rpc(nome, params or {}, **kwargs), "rpc", nome, operacao="rpc")
+
+    def __getattr__(self, nome):
+        return getattr(self._cliente, nome)
+
+
+def instrumentar(cliente):
+    return cliente if isinstance(cliente, ClienteInstrumentado) else ClienteInstrumentado(cliente)
+
+
+@contextmanager
+def registrar_requisicoes(rotulo=None):
+    """
+    Registra as requisições feitas no bloco (na mesma thread/contexto).
+    Registros podem ser aninhados: cada um recebe as requisições do seu trecho.
+    """
+    registro = RegistroRequisicoes(rotulo)
+    token = _registros_ativos.set(_registros_ativos.get() + (registro,))
+    try:
+        yield registro
+    finally:
+        _registros_ativos.reset(token)
+
+
+def verificar_orcamento(registro, max_consultas=None, max_bytes=None, descricao=None):
+    """
+    Levanta OrcamentoExcedido se o registro passou de 'max_consultas' requisições
+    ou de 'max_bytes' bytes de resposta.
+    """
+    excessos = []
+    if max_consultas is not None and registro.total_consultas > max_consultas:
+        excessos.append(f"{registro.total_consultas} requisições (orçamento: {max_consultas})")
+    if max_bytes is not None and registro.total_bytes > max_bytes:
+        excessos.append(f"{registro.total_bytes} bytes (orçamento: {max_bytes})")
+    if excessos:
+        titulo = descricao or registro.rotulo or "trecho"
+        raise OrcamentoExcedido(f"{titulo} excedeu o orçamento: {'; '.join(excessos)}\n{registro.resumo()}")
+
+
+@contextmanager
+def orcamento_consultas(max_consultas=None, max_bytes=None, descricao=None):
+    """
+    Garante que o bloco fique dentro do orçamento de requisições/bytes declarado.
+    """
+    with registrar_requisicoes(descricao) as registro:
+        yield registro
+    verificar_orcamento(registro, max_consultas, max_bytes, descricao)
+
+
+def avisar_orcamento_pagina(registro):
+    """
+    Usado pelo roteador: registra no log as páginas acima de ORCAMENTO_CONSULTAS_PAGINA.
+    """
+    if ORCAMENTO_CONSULTAS_PAGINA and registro.total_consultas > ORCAMENTO_CONSULTAS_PAGINA:
+        print(f"Aviso: página acima do orçamento de {ORCAMENTO_CONSULTAS_PAGINA} requisições.\n{registro.resumo()}")
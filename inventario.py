@@ -1,20 +1,31 @@
 # inventario.py — organizado, sem fotos, com PDF/Excel/CSV
-import io
 import os
-from datetime import datetime
+import tempfile
 import pandas as pd
 import numpy as np
 import pytz
 import streamlit as st
 import matplotlib.pyplot as plt
-from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
-from fpdf import FPDF
+from st_aggrid import JsCode
 
 from supabase_client import supabase
 from setores import get_setores_list
-from ubs import get_ubs_list
+from ubs import get_ubs_list, invalidate_inventario_ubs_cache
+from busca import IndiceBusca
+from esquemas import tabela_chamados, tabela_inventario
+from metricas import cronometrar
+from grade import exibir_grade
+from exportacao import exportacao_sob_demanda, blocos_dataframe, paginar_tabela
+from inventario_pdf import escrever_relatorio_inventario_pdf
 
 FORTALEZA_TZ = pytz.timezone("America/Fortaleza")
+# Tempo (segundos) que o snapshot indexado do inventário fica em cache no processo
+INVENTARIO_CACHE_TTL = int(os.getenv("INVENTARIO_CACHE_TTL", "300"))
+# Campos do inventário carregados no snapshot da lista e da busca
+COLUNAS_INVENTARIO = (
+    "id,numero_patrimonio,tipo,marca,modelo,numero_serie,status,localizacao,propria_locada,setor,"
+    "data_aquisicao,data_garantia_fim"
+)
 
 # =====================================================
 # 1) Acesso ao banco
@@ -24,18 +35,50 @@ def get_machines_from_inventory():
     Lê a tabela public.inventario com os campos usados no app.
     """
     try:
-        resp = supabase.table("inventario").select(
-            "id,numero_patrimonio,tipo,marca,modelo,numero_serie,status,localizacao,propria_locada,setor,data_aquisicao,data_garantia_fim"
-        ).execute()
-        return resp.data if resp.data else []
+        df = _fetch_inventario()
+        return df.astype(object).where(df.notna(), None).to_dict("records")
     except Exception as e:
         st.error("Erro ao recuperar inventário.")
         print(f"Erro: {e}")
         return []
 
+def _fetch_inventario():
+    """
+    Inventário inteiro em páginas por id (exportacao.paginar_tabela): uma consulta
+    única seria cortada no limite de linhas do PostgREST.
+    """
+    blocos = list(paginar_tabela("inventario", COLUNAS_INVENTARIO))
+    return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=COLUNAS_INVENTARIO.split(","))
+
+@st.cache_resource(ttl=INVENTARIO_CACHE_TTL, show_spinner=False)
+def _inventario_indexado():
+    """
+    Snapshot do inventário + índice de busca, construídos uma vez e compartilhados
+    entre as sessões. O DataFrame é o mesmo objeto para todos: não alterar no lugar.
+    """
+    df = tabela_inventario(_fetch_inventario())
+    return df, IndiceBusca(df)
+
+@cronometrar("fetch")
+def get_inventario_indexado():
+    """
+    Retorna (DataFrame do inventário, IndiceBusca) do snapshot em cache.
+    """
+    try:
+        return _inventario_indexado()
+    except Exception as e:
+        st.error("Erro ao recuperar inventário.")
+        print(f"Erro: {e}")
+        return pd.DataFrame(), None
+
+def invalidate_inventario_cache():
+    _inventario_indexado.clear()
+    invalidate_inventario_ubs_cache()
+
 def edit_inventory_item(patrimonio, new_values):
     try:
         supabase.table("inventario").update(new_values).eq("numero_patrimonio", patrimonio).execute()
+        invalidate_inventario_cache()
         st.success("Item atualizado com sucesso!")
     except Exception as e:
         st.error("Erro ao atualizar o item do inventário.")
@@ -66,6 +109,7 @@ def add_machine_to_inventory(
             "data_garantia_fim": data_garantia_fim,
         }
         supabase.table("inventario").insert(data).execute()
+        invalidate_inventario_cache()
         st.success("Máquina adicionada ao inventário com sucesso!")
     except Exception as e:
         st.error("Erro ao adicionar máquina ao inventário.")
@@ -74,6 +118,7 @@ def add_machine_to_inventory(
 def delete_inventory_item(patrimonio):
     try:
         supabase.table("inventario").delete().eq("numero_patrimonio", patrimonio).execute()
+        invalidate_inventario_cache()
         st.success("Item excluído com sucesso!")
     except Exception as e:
         st.error("Erro ao excluir item do inventário.")
@@ -82,15 +127,20 @@ def delete_inventory_item(patrimonio):
 # =====================================================
 # 2) Integrações com chamados / peças / manutenção
 # =====================================================
-def get_pecas_usadas_por_patrimonio(patrimonio):
-    try:
-        mod = __import__("chamados", fromlist=["get_chamados_por_patrimonio"])
-        get_chamados_por_patrimonio = mod.get_chamados_por_patrimonio
-    except Exception as e:
-        st.error("Erro ao importar função de chamados.")
-        print(f"Erro: {e}")
-        return []
-    chamados = get_chamados_por_patrimonio(patrimonio)
+def get_pecas_usadas_por_patrimonio(patrimonio, chamados=None):
+    """
+    Peças usadas nos chamados do patrimônio. Quem já tem os chamados em mãos
+    passa 'chamados' e evita consultá-los de novo.
+    """
+    if chamados is None:
+        try:
+            mod = __import__("chamados", fromlist=["get_chamados_por_patrimonio"])
+            get_chamados_por_patrimonio = mod.get_chamados_por_patrimonio
+        except Exception as e:
+            st.error("Erro ao importar função de chamados.")
+            print(f"Erro: {e}")
+            return []
+        chamados = get_chamados_por_patrimonio(patrimonio)
     if not chamados:
         return []
     chamado_ids = [ch["id"] for ch in chamados if "id" in ch]
@@ -208,6 +258,50 @@ def cadastro_maquina():
 # =====================================================
 # 4) Lista com filtros + exportações + PDF
 # =====================================================
+# Colunas exibidas na grade da lista (as demais ficam no detalhe e nas exportações)
+COLUNAS_GRADE_INVENTARIO = [
+    "numero_patrimonio", "tipo", "marca", "modelo", "status", "localizacao", "setor",
+    "propria_locada", "data_aquisicao", "data_garantia_fim"
+]
+
+@cronometrar("transform")
+def filtrar_inventario(df_base, indice, texto="", status=None, localizacao=None, setor=None):
+    """
+    Aplica a busca global e os filtros da lista do inventário sobre o snapshot.
+    Retorna um novo DataFrame (o snapshot compartilhado não é alterado) com as
+    datas formatadas para exibição.
+    """
+    # Busca global (sem acento/caixa, por prefixo em patrimônio, série, marca e modelo)
+    mascara = indice.buscar(texto) if texto else np.ones(len(df_base), dtype=bool)
+
+    # Filtros específicos
+    if status:
+        mascara &= (df_base["status"] == status).to_numpy()
+    if localizacao:
+        mascara &= (df_base["localizacao"] == localizacao).to_numpy()
+    if setor:
+        mascara &= (df_base["setor"] == setor).to_numpy()
+
+    df = df_base[mascara]
+
+    # Formatação datas (assign devolve um novo DataFrame, sem gravar na fatia)
+    datas = {
+        coluna: pd.to_datetime(df[coluna], errors="coerce").dt.date.astype("string")
+        for coluna in ("data_aquisicao", "data_garantia_fim") if coluna in df
+    }
+    return df.assign(**datas)
+
+@cronometrar("transform")
+def paginar_inventario(df, ordenar_por=None, decrescente=False, pagina=1, por_pagina=50):
+    """
+    Ordena o resultado filtrado (todas as linhas, não só a página) e devolve a
+    'pagina' (começando em 1) com 'por_pagina' linhas. Vazios ficam por último.
+    """
+    if ordenar_por in df.columns:
+        df = df.sort_values(ordenar_por, ascending=not decrescente, kind="stable", na_position="last")
+    inicio = (pagina - 1) * por_pagina
+    return df.iloc[inicio:inicio + por_pagina]
+
 def show_inventory_list():
     st.subheader("Inventário — Lista e Filtros")
 
@@ -221,32 +315,18 @@ def show_inventory_list():
     with colf3:
         setor_filtro = st.selectbox("Setor", ["Todos"] + sorted(get_setores_list()))
 
-    # Carrega
-    machines = get_machines_from_inventory()
-    if not machines:
+    # Carrega (snapshot em cache com índice de busca já construído)
+    df_base, indice = get_inventario_indexado()
+    if df_base.empty:
         st.info("Nenhum item encontrado no inventário.")
         return
 
-    df = pd.DataFrame(machines).copy()
-
-    # Busca global
-    if filtro_texto:
-        q = filtro_texto.lower()
-        df = df[df.apply(lambda r: q in str(r).lower(), axis=1)]
-
-    # Filtros específicos
-    if status_filtro != "Todos":
-        df = df[df["status"] == status_filtro]
-    if localizacao_filtro != "Todas":
-        df = df[df["localizacao"] == localizacao_filtro]
-    if setor_filtro != "Todos":
-        df = df[df["setor"] == setor_filtro]
-
-    # Formatação datas
-    if "data_aquisicao" in df:
-        df["data_aquisicao"] = pd.to_datetime(df["data_aquisicao"], errors="coerce").dt.date.astype("string")
-    if "data_garantia_fim" in df:
-        df["data_garantia_fim"] = pd.to_datetime(df["data_garantia_fim"], errors="coerce").dt.date.astype("string")
+    df = filtrar_inventario(
+        df_base, indice, filtro_texto,
+        status=None if status_filtro == "Todos" else status_filtro,
+        localizacao=None if localizacao_filtro == "Todas" else localizacao_filtro,
+        setor=None if setor_filtro == "Todos" else setor_filtro,
+    )
 
     st.markdown("### Resultado (filtrado)")
 
@@ -265,20 +345,27 @@ def show_inventory_list():
         k2.metric("Ativos", "-")
         k3.metric("Em Manutenção", "-")
 
-    # Ordem de colunas
-    prefer = [c for c in [
-        "numero_patrimonio","tipo","marca","modelo","status","localizacao","setor",
-        "propria_locada","data_aquisicao","data_garantia_fim"
-    ] if c in df.columns]
-    others = [c for c in df.columns if c not in prefer]
-    dfv = df[prefer + others].copy()
-
-    # Tabela com destaque por status
-    gb = GridOptionsBuilder.from_dataframe(dfv)
-    gb.configure_default_column(filter=True, sortable=True, resizable=True, wrapText=True, autoHeight=True, minColumnWidth=140, flex=1)
-    gb.configure_column("numero_patrimonio", pinned="left", minColumnWidth=170)
-    gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=20)
-
+    # Ordenação e paginação sobre o resultado filtrado; a grade recebe só a página
+    colo1, colo2, colo3 = st.columns([1.2, 1, 1])
+    with colo1:
+        ordenar_por = st.selectbox(
+            "Ordenar por", [c for c in COLUNAS_GRADE_INVENTARIO if c in df.columns],
+            format_func=lambda c: c.replace("_", " ").capitalize()
+        )
+    with colo2:
+        decrescente = st.toggle("Decrescente", value=False)
+    with colo3:
+        por_pagina = st.selectbox("Itens por página", [25, 50, 100], index=1)
+
+    filtros = (filtro_texto, status_filtro, localizacao_filtro, setor_filtro, ordenar_por, decrescente, por_pagina)
+    if st.session_state.get("inv_filtros") != filtros:
+        st.session_state["inv_filtros"] = filtros
+        st.session_state["inv_pagina"] = 1
+    paginas = max(1, -(-total // por_pagina))
+    pagina = min(st.session_state["inv_pagina"], paginas)
+    df_pagina = paginar_inventario(df, ordenar_por, decrescente, pagina, por_pagina)
+
+    # Tabela com destaque por status; o item completo é lido do resultado ao selecionar a linha
     row_style = JsCode("""
         function(params) {
             const s = (params.data && params.data.status) ? (''+params.data.status).toLowerCase() : '';
@@ -287,62 +374,51 @@ def show_inventory_list():
             return null;
         }
     """)
-    gb.configure_grid_options(getRowStyle=row_style)
-    grid_options = gb.build()
-    grid_options["domLayout"] = "normal"
-
-    AgGrid(
-        dfv,
-        gridOptions=grid_options,
-        height=460,
-        theme="streamlit",
-        enable_enterprise_modules=False,
-        allow_unsafe_jscode=True
+    st.caption("Selecione um item na tabela para ver detalhes, editar ou excluir.")
+    selected_patrimonio = exibir_grade(
+        df_pagina, COLUNAS_GRADE_INVENTARIO, "numero_patrimonio", fixada="numero_patrimonio",
+        estilo_linha=row_style, key=f"inv_grade_{pagina}"
     )
 
-    # Exportações
+    def _mudar_pagina(delta):
+        st.session_state["inv_pagina"] = min(max(pagina + delta, 1), paginas)
+
+    n1, n2, n3 = st.columns([1, 1, 4])
+    n1.button("◀ Anterior", key="inv_anterior", on_click=_mudar_pagina, args=(-1,), disabled=pagina <= 1)
+    n2.button("Próxima ▶", key="inv_proxima", on_click=_mudar_pagina, args=(1,), disabled=pagina >= paginas)
+    n3.caption(f"Página {pagina} de {paginas}")
+
+    # Ordem de colunas das exportações
+    prefer = [c for c in COLUNAS_GRADE_INVENTARIO if c in df.columns]
+    others = [c for c in df.columns if c not in prefer]
+    dfv = df[prefer + others]
+
+    # Exportações (geradas só quando solicitadas)
     st.markdown("### Exportar")
-    csv_bytes = dfv.to_csv(index=False).encode("utf-8")
-    st.download_button("Baixar CSV", data=csv_bytes, file_name="inventario_filtrado.csv", mime="text/csv")
-
-    # Excel (fallback engine)
-    import importlib
-    engine = None
-    for cand in ("openpyxl", "xlsxwriter"):
-        if importlib.util.find_spec(cand):
-            engine = "openpyxl" if cand == "openpyxl" else "xlsxwriter"
-            break
-    if engine:
-        with io.BytesIO() as buffer:
-            with pd.ExcelWriter(buffer, engine=engine) as writer:
-                dfv.to_excel(writer, index=False, sheet_name="Inventario")
-            st.download_button(
-                "Baixar Excel",
-                data=buffer.getvalue(),
-                file_name="inventario_filtrado.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
-    else:
-        st.caption("Instale openpyxl ou xlsxwriter para exportar Excel.")
+    exportacao_sob_demanda("inv_export", "inventario_filtrado", lambda: {"Inventario": blocos_dataframe(dfv)})
 
     # PDF
     if st.button("Gerar PDF do Inventário"):
-        pdf_bytes = gerar_relatorio_inventario_pdf(dfv)
-        st.download_button(
-            label="Baixar Relatório de Inventário",
-            data=pdf_bytes,
-            file_name="inventario.pdf",
-            mime="application/pdf"
-        )
+        # O PDF é gravado em arquivo temporário e enviado ao download a partir dele
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            escrever_relatorio_inventario_pdf(dfv, tmp)
+        try:
+            with open(tmp.name, "rb") as arquivo_pdf:
+                st.download_button(
+                    label="Baixar Relatório de Inventário",
+                    data=arquivo_pdf,
+                    file_name="inventario.pdf",
+                    mime="application/pdf"
+                )
+        finally:
+            os.remove(tmp.name)
 
     # Edição / Exclusão
     st.markdown("---")
     st.subheader("Detalhes / Edição de Item")
 
-    patrimonio_options = dfv["numero_patrimonio"].dropna().unique().tolist()
-    selected_patrimonio = st.selectbox("Selecione o patrimônio", ["—"] + patrimonio_options)
-    if selected_patrimonio and selected_patrimonio != "—":
-        item = dfv[dfv["numero_patrimonio"] == selected_patrimonio].fillna("").iloc[0]
+    if selected_patrimonio is not None:
+        item = dfv[dfv["numero_patrimonio"] == selected_patrimonio].astype(object).fillna("").iloc[0]
 
         with st.expander("Editar Máquina"):
             with st.form("editar_maquina"):
@@ -399,12 +475,12 @@ def show_inventory_list():
                 get_chamados_por_patrimonio = lambda x: []
             chamados_ = get_chamados_por_patrimonio(selected_patrimonio)
             if chamados_:
-                st.dataframe(pd.DataFrame(chamados_))
+                st.dataframe(tabela_chamados(chamados_))
             else:
                 st.write("Nenhum chamado técnico para este item.")
 
             st.markdown("**Peças Utilizadas:**")
-            pecas = get_pecas_usadas_por_patrimonio(selected_patrimonio)
+            pecas = get_pecas_usadas_por_patrimonio(selected_patrimonio, chamados_ or [])
             if pecas:
                 st.dataframe(pd.DataFrame(pecas))
             else:
@@ -423,11 +499,11 @@ def show_inventory_list():
 def dashboard_inventario():
     st.subheader("Dashboard do Inventário")
 
-    data = get_machines_from_inventory()
-    if not data:
+    # Mesmo snapshot tipado da lista (em cache), sem nova leitura do banco
+    df, _ = get_inventario_indexado()
+    if df.empty:
         st.info("Nenhum item no inventário.")
         return
-    df = pd.DataFrame(data)
 
     # KPIs
     total = len(df)
@@ -442,99 +518,20 @@ def dashboard_inventario():
 
     # Gráficos simples
     if "localizacao" in df.columns:
-        by_ubs = df.groupby("localizacao").size().reset_index(name="qtd").sort_values("qtd", ascending=False).head(15)
+        by_ubs = df.groupby("localizacao", observed=True).size().reset_index(name="qtd").sort_values("qtd", ascending=False).head(15)
         st.plotly_chart(
             __import__("plotly.express").express.bar(by_ubs, x="localizacao", y="qtd", title="Itens por UBS"),
             use_container_width=True
         )
     if "setor" in df.columns:
-        by_setor = df.groupby("setor").size().reset_index(name="qtd").sort_values("qtd", ascending=False).head(15)
+        by_setor = df.groupby("setor", observed=True).size().reset_index(name="qtd").sort_values("qtd", ascending=False).head(15)
         st.plotly_chart(
             __import__("plotly.express").express.bar(by_setor, x="setor", y="qtd", title="Itens por Setor"),
             use_container_width=True
         )
     if "tipo" in df.columns:
-        by_tipo = df.groupby("tipo").size().reset_index(name="qtd").sort_values("qtd", ascending=False)
+        by_tipo = df.groupby("tipo", observed=True).size().reset_index(name="qtd").sort_values("qtd", ascending=False)
         st.plotly_chart(
             __import__("plotly.express").express.pie(by_tipo, names="tipo", values="qtd", title="Distribuição por Tipo"),
             use_container_width=True
         )
-
-# =====================================================
-# 6) PDF
-# =====================================================
-class PDF(FPDF):
-    def __init__(self, orientation="L", unit="mm", format="A4", logo_path="infocustec.png"):
-        super().__init__(orientation, unit, format)
-        self.logo_path = logo_path
-
-    def header(self):
-        if os.path.exists(self.logo_path):
-            self.image(self.logo_path, x=10, y=8, w=30)
-            self.set_xy(45, 10)
-        else:
-            self.set_xy(10, 10)
-        self.set_font("Arial", "B", 14)
-        self.cell(0, 10, "Relatório de Inventário", ln=True, align="L")
-        self.set_font("Arial", "", 10)
-        agora = datetime.now(FORTALEZA_TZ).strftime("%d/%m/%Y %H:%M")
-        self.cell(0, 8, f"Gerado em: {agora}", ln=True)
-        self.ln(2)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("Arial", "I", 10)
-        self.cell(0, 10, f"Página {self.page_no()}", 0, 0, "C")
-
-def gerar_relatorio_inventario_pdf(df_inventario: pd.DataFrame) -> bytes:
-    """
-    Gera PDF com:
-      - Cabeçalho (logo opcional + data)
-      - Resumo (contagens por status)
-      - Tabela com colunas chave
-    """
-    pdf = PDF(orientation="L", format="A4", logo_path="infocustec.png")
-    pdf.add_page()
-    pdf.set_font("Arial", "", 10)
-
-    # Resumo
-    total = len(df_inventario)
-    ativos = int((df_inventario["status"] == "Ativo").sum()) if "status" in df_inventario.columns else 0
-    manut = int((df_inventario["status"] == "Em Manutencao").sum()) if "status" in df_inventario.columns else 0
-    inat = int((df_inventario["status"] == "Inativo").sum()) if "status" in df_inventario.columns else 0
-
-    pdf.set_font("Arial", "", 11)
-    pdf.cell(0, 8, f"Total de itens: {total} | Ativos: {ativos} | Em Manutenção: {manut} | Inativos: {inat}", ln=True)
-    pdf.ln(3)
-
-    # Tabela
-    cols = [c for c in ["numero_patrimonio","tipo","marca","modelo","status","localizacao","setor","data_aquisicao","data_garantia_fim"] if c in df_inventario.columns]
-    headers = {
-        "numero_patrimonio":"Patrimônio","tipo":"Tipo","marca":"Marca","modelo":"Modelo",
-        "status":"Status","localizacao":"Localização","setor":"Setor","data_aquisicao":"Aquisição","data_garantia_fim":"Garantia"
-    }
-    # larguras equilibradas (A4 landscape ~ 277mm úteis)
-    base_widths = [36, 28, 28, 36, 28, 36, 32, 26, 27]
-    widths = base_widths[:len(cols)]
-
-    pdf.set_font("Arial", "B", 9)
-    for i, c in enumerate(cols):
-        pdf.cell(widths[i], 8, headers.get(c, c)[:18], border=1, align="C")
-    pdf.ln(8)
-
-    pdf.set_font("Arial", "", 8)
-    for _, row in df_inventario.iterrows():
-        for i, c in enumerate(cols):
-            val = "" if pd.isna(row.get(c)) else str(row.get(c))
-            pdf.cell(widths[i], 6, val[:25], border=1)
-        pdf.ln(6)
-
-    out = pdf.output(dest="S")
-    # normaliza para bytes
-    if hasattr(out, "getvalue"):
-        out = out.getvalue()
-    if isinstance(out, str):
-        out = out.encode("latin-1", errors="ignore")
-    elif isinstance(out, bytearray):
-        out = bytes(out)
-    return out
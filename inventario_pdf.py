@@ -0,0 +1,165 @@
+# inventario_pdf.py — relatório PDF do inventário
+import io
+import os
+from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+import pytz
+from fpdf import FPDF
+
+FORTALEZA_TZ = pytz.timezone("America/Fortaleza")
+
+COLUNAS_PDF = ["numero_patrimonio", "tipo", "marca", "modelo", "status", "localizacao", "setor", "data_aquisicao", "data_garantia_fim"]
+CABECALHOS_PDF = {
+    "numero_patrimonio": "Patrimônio", "tipo": "Tipo", "marca": "Marca", "modelo": "Modelo",
+    "status": "Status", "localizacao": "Localização", "setor": "Setor", "data_aquisicao": "Aquisição", "data_garantia_fim": "Garantia"
+}
+# larguras equilibradas (A4 landscape ~ 277mm úteis)
+LARGURAS_PDF = [36, 28, 28, 36, 28, 36, 32, 26, 27]
+MAX_CARACTERES_CELULA = 25
+ALTURA_LINHA = 6
+# Deslocamentos do texto dentro da célula (mm)
+_TEXTO_DX = 1.0
+_TEXTO_DY = 4.2
+# Linhas formatadas por vez (conversão vetorizada para texto). Só a formatação é por
+# bloco: o FPDF mantém o documento inteiro em memória até a saída
+LINHAS_POR_BLOCO = 2000
+
+
+@lru_cache(maxsize=4)
+def _carregar_logo(logo_path):
+    """
+    Lê o logotipo do disco uma única vez por processo.
+    Retorna os bytes da imagem ou None se o arquivo não existir.
+    """
+    if not os.path.exists(logo_path):
+        return None
+    with open(logo_path, "rb") as f:
+        return f.read()
+
+
+class PDF(FPDF):
+    def __init__(self, orientation="L", unit="mm", format="A4", logo_path="infocustec.png"):
+        super().__init__(orientation, unit, format)
+        self.logo_path = logo_path
+        self._logo = _carregar_logo(logo_path)
+        self._gerado_em = datetime.now(FORTALEZA_TZ).strftime("%d/%m/%Y %H:%M")
+        # Quando definido, o cabeçalho da tabela é repetido no topo de cada página
+        self.colunas_tabela = None
+
+    def header(self):
+        if self._logo is not None:
+            # mesmo conteúdo em todas as páginas: o FPDF reaproveita a imagem já decodificada
+            self.image(io.BytesIO(self._logo), x=10, y=8, w=30)
+            self.set_xy(45, 10)
+        else:
+            self.set_xy(10, 10)
+        self.set_font("Arial", "B", 14)
+        self.cell(0, 10, "Relatório de Inventário", ln=True, align="L")
+        self.set_font("Arial", "", 10)
+        self.cell(0, 8, f"Gerado em: {self._gerado_em}", ln=True)
+        self.ln(2)
+        if self.colunas_tabela:
+            self._cabecalho_tabela()
+
+    def _cabecalho_tabela(self):
+        self.set_font("Arial", "B", 9)
+        for texto, largura in self.colunas_tabela:
+            self.cell(largura, 8, texto, border=1, align="C")
+        self.ln(8)
+        self.set_font("Arial", "", 8)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Arial", "I", 10)
+        self.cell(0, 10, f"Página {self.page_no()}", 0, 0, "C")
+
+
+def _formatar_bloco(bloco, cols):
+    """
+    Converte e trunca as colunas do bloco de uma vez (sem laço por célula).
+    Retorna uma lista de tuplas de strings prontas para desenhar.
+    """
+    formatado = bloco[cols].astype("string").fillna("")
+    for c in cols:
+        formatado[c] = formatado[c].str.slice(0, MAX_CARACTERES_CELULA)
+    return list(formatado.itertuples(index=False, name=None))
+
+
+def _desenhar_grade(pdf, xs, y_topo, y_fim):
+    """
+    Bordas das linhas desenhadas entre y_topo e y_fim na página atual.
+    """
+    if y_fim <= y_topo:
+        return
+    y = y_topo
+    while y <= y_fim + 0.01:
+        pdf.line(xs[0], y, xs[-1], y)
+        y += ALTURA_LINHA
+    for x in xs:
+        pdf.line(x, y_topo, x, y_fim)
+
+
+def escrever_relatorio_inventario_pdf(df_inventario: pd.DataFrame, destino, logo_path="infocustec.png"):
+    """
+    Gera o PDF do inventário e escreve em 'destino' (caminho ou arquivo binário aberto):
+      - Cabeçalho (logo opcional + data) e cabeçalho da tabela repetido por página
+      - Resumo (contagens por status)
+      - Tabela com colunas chave, formatada em blocos de LINHAS_POR_BLOCO linhas
+    O FPDF monta o documento todo em memória e o grava em 'destino' no final; o
+    pico de memória cresce com o número de linhas, como antes.
+    """
+    pdf = PDF(orientation="L", format="A4", logo_path=logo_path)
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.set_draw_color(0, 0, 0)
+    pdf.add_page()
+
+    # Resumo
+    total = len(df_inventario)
+    if "status" in df_inventario.columns:
+        por_status = df_inventario["status"].value_counts()
+        ativos, manut, inat = (int(por_status.get(s, 0)) for s in ("Ativo", "Em Manutencao", "Inativo"))
+    else:
+        ativos = manut = inat = 0
+
+    pdf.set_font("Arial", "", 11)
+    pdf.cell(0, 8, f"Total de itens: {total} | Ativos: {ativos} | Em Manutenção: {manut} | Inativos: {inat}", ln=True)
+    pdf.ln(3)
+
+    # Tabela
+    cols = [c for c in COLUNAS_PDF if c in df_inventario.columns]
+    widths = LARGURAS_PDF[:len(cols)]
+    pdf.colunas_tabela = [(CABECALHOS_PDF.get(c, c)[:18], w) for c, w in zip(cols, widths)]
+    pdf._cabecalho_tabela()
+
+    # Desenho direto: texto por célula e a grade da página em poucas linhas,
+    # em vez de um cell() com borda por célula (bem mais caro no FPDF)
+    xs = [pdf.l_margin]
+    for w in widths:
+        xs.append(xs[-1] + w)
+    limite_y = pdf.page_break_trigger
+    y_topo = y = pdf.get_y()
+
+    for inicio in range(0, total, LINHAS_POR_BLOCO):
+        for linha in _formatar_bloco(df_inventario.iloc[inicio:inicio + LINHAS_POR_BLOCO], cols):
+            if y + ALTURA_LINHA > limite_y:
+                _desenhar_grade(pdf, xs, y_topo, y)
+                pdf.add_page()
+                y_topo = y = pdf.get_y()
+            for x, val in zip(xs, linha):
+                if val:
+                    pdf.text(x + _TEXTO_DX, y + _TEXTO_DY, val)
+            y += ALTURA_LINHA
+    _desenhar_grade(pdf, xs, y_topo, y)
+
+    pdf.output(destino)
+
+
+def gerar_relatorio_inventario_pdf(df_inventario: pd.DataFrame) -> bytes:
+    """
+    Gera o PDF do inventário e retorna os bytes (ver escrever_relatorio_inventario_pdf).
+    """
+    buffer = io.BytesIO()
+    escrever_relatorio_inventario_pdf(df_inventario, buffer)
+    return buffer.getvalue()
@@ -0,0 +1,198 @@
+# metricas.py — tempos de renderização por página/função (p50/p95/p99) e log de páginas lentas
+#
+# O roteador do OS800 mede cada página com medir_pagina(); funções de dados usam
+# @cronometrar(fase=...) e trechos de tela usam "with fase('grid'):". As amostras
+# ficam em memória no processo do Streamlit (janela móvel por nome); páginas acima
+# de METRICAS_PAGINA_LENTA_MS vão para METRICAS_LOG (JSON Lines) com o tempo por fase.
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from instrumentacao import registrar_requisicoes
+
+# Amostras mantidas por página/função para os percentis
+METRICAS_JANELA = int(os.getenv("METRICAS_JANELA", "500"))
+# Páginas acima deste tempo (ms) são gravadas no log de páginas lentas
+METRICAS_PAGINA_LENTA_MS = float(os.getenv("METRICAS_PAGINA_LENTA_MS", "2000"))
+METRICAS_LOG = os.getenv("METRICAS_LOG", os.path.join(".metricas", "paginas_lentas.jsonl"))
+
+FASES = ("fetch", "transform", "grid", "charts", "export")
+
+_amostras = defaultdict(lambda: deque(maxlen=METRICAS_JANELA))
+_lock = threading.Lock()
+# Tempo por fase da página em execução e a fase ativa (fases aninhadas não somam duas vezes)
+_fases_pagina = ContextVar("metricas_fases_pagina", default=None)
+_fase_ativa = ContextVar("metricas_fase_ativa", default=None)
+
+# =====================================================
+# Coleta
+# =====================================================
+def registrar_tempo(tipo, nome, ms):
+    with _lock:
+        _amostras[(tipo, nome)].append(ms)
+
+
+def zerar_metricas():
+    with _lock:
+        _amostras.clear()
+
+
+@contextmanager
+def fase(nome):
+    """
+    Soma o tempo do bloco à fase 'nome' da página atual. Dentro de outra fase,
+    o tempo já é contado pela fase externa.
+    """
+    fases = _fases_pagina.get()
+    if fases is None or _fase_ativa.get() is not None:
+        yield
+        return
+    token = _fase_ativa.set(nome)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fases[nome] += (time.perf_counter() - inicio) * 1000.0
+        _fase_ativa.reset(token)
+
+
+def cronometrar(fase_padrao=None, nome=None):
+    """
+    Decorador: registra o tempo de cada chamada como 'modulo.funcao' e, com
+    'fase_padrao', soma-o à fase correspondente da página.
+    """
+    def decorador(func):
+        rotulo = nome or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                if fase_padrao is None:
+                    return func(*args, **kwargs)
+                with fase(fase_padrao):
+                    return func(*args, **kwargs)
+            finally:
+                registrar_tempo("funcao", rotulo, (time.perf_counter() - inicio) * 1000.0)
+        return envolvida
+    return decorador
+
+
+def _gravar_pagina_lenta(registro):
+    try:
+        os.makedirs(os.path.dirname(METRICAS_LOG) or ".", exist_ok=True)
+        with open(METRICAS_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"Erro ao gravar log de páginas lentas: {e}")
+
+
+@contextmanager
+def medir_pagina(pagina):
+    """
+    Mede uma execução da página: tempo total, tempo por fase e requisições ao
+    Supabase. Reruns/interrupções do Streamlit (st.stop, st.rerun) não entram nos percentis.
+    Retorna (via 'as') o registro de requisições da página.
+    """
+    fases = defaultdict(float)
+    token = _fases_pagina.set(fases)
+    inicio = time.perf_counter()
+    try:
+        with registrar_requisicoes(pagina) as registro:
+            yield registro
+    finally:
+        _fases_pagina.reset(token)
+    total_ms = (time.perf_counter() - inicio) * 1000.0
+    registrar_tempo("pagina", pagina, total_ms)
+    if total_ms >= METRICAS_PAGINA_LENTA_MS:
+        _gravar_pagina_lenta({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "pagina": pagina,
+            "usuario": st.session_state.get("username"),
+            "ms": round(total_ms, 1),
+            "fases": {f: round(fases.get(f, 0.0), 1) for f in FASES},
+            "outros_ms": round(max(total_ms - sum(fases.values()), 0.0), 1),
+            "requisicoes": registro.total_consultas,
+            "bytes": registro.total_bytes,
+            "requisicoes_ms": round(registro.total_ms, 1),
+        })
+
+# =====================================================
+# Consulta / painel
+# =====================================================
+def percentis():
+    """
+    DataFrame com tipo, nome, amostras, p50, p95, p99 e máximo (ms) por página/função.
+    """
+    with _lock:
+        copia = {chave: np.fromiter(valores, dtype=float) for chave, valores in _amostras.items() if valores}
+    linhas = []
+    for (tipo, nome), valores in sorted(copia.items()):
+        p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+        linhas.append({
+            "tipo": tipo, "nome": nome, "amostras": len(valores),
+            "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1),
+            "max_ms": round(valores.max(), 1),
+        })
+    return pd.DataFrame(linhas, columns=["tipo", "nome", "amostras", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+def ler_paginas_lentas(limite=100):
+    """
+    Últimos 'limite' registros do log de páginas lentas (mais recentes primeiro).
+    """
+    if not os.path.exists(METRICAS_LOG):
+        return []
+    with open(METRICAS_LOG, "r", encoding="utf-8") as f:
+        linhas = deque(f, maxlen=limite)
+    registros = []
+    for linha in reversed(linhas):
+        try:
+            registros.append(json.loads(linha))
+        except ValueError:
+            continue
+    return registros
+
+
+def painel_diagnostico():
+    """
+    Painel da Administração: percentis por página e por função e as páginas lentas recentes.
+    """
+    st.markdown("### Tempo de renderização")
+    st.caption(
+        f"Últimas {METRICAS_JANELA} execuções de cada página/função neste servidor. "
+        f"Páginas acima de {METRICAS_PAGINA_LENTA_MS:.0f} ms são gravadas em {METRICAS_LOG}."
+    )
+    df = percentis()
+    if df.empty:
+        st.info("Nenhuma medição registrada ainda.")
+    else:
+        st.markdown("**Páginas**")
+        st.dataframe(df[df["tipo"] == "pagina"].drop(columns="tipo"), use_container_width=True, hide_index=True)
+        st.markdown("**Funções**")
+        st.dataframe(
+            df[df["tipo"] == "funcao"].drop(columns="tipo").sort_values("p95_ms", ascending=False),
+            use_container_width=True, hide_index=True
+        )
+    if st.button("Zerar métricas"):
+        zerar_metricas()
+        st.success("Métricas zeradas.")
+
+    st.markdown("### Páginas lentas recentes")
+    lentas = ler_paginas_lentas()
+    if not lentas:
+        st.write("Nenhuma página lenta registrada.")
+        return
+    df_lentas = pd.json_normalize(lentas)
+    df_lentas.columns = [c.replace("fases.", "") for c in df_lentas.columns]
+    st.dataframe(df_lentas, use_container_width=True, hide_index=True)
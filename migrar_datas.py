@@ -0,0 +1,72 @@
+# migrar_datas.py — preenche as colunas *_ts a partir dos textos de data, em lotes
+#
+# Pré-requisito: sql/005_colunas_timestamptz.sql aplicado no banco.
+# Uso: python migrar_datas.py [--lote 1000] [--tabela chamados ...]
+# Pode ser interrompido e executado de novo: só linhas com *_ts nulo são alteradas.
+import argparse
+import sys
+
+from supabase_client import supabase
+
+# (tabela, coluna de texto); a coluna de destino é <coluna>_ts
+COLUNAS_MIGRACAO = [
+    ("chamados", "hora_abertura"),
+    ("chamados", "hora_fechamento"),
+    ("pecas_usadas", "data_uso"),
+    ("historico_manutencao", "data_manutencao"),
+    ("estoque", "data_adicao"),
+]
+
+
+def migrar_coluna(tabela, coluna, lote=1000):
+    """
+    Chama backfill_datas até percorrer a tabela inteira. Cada lote é uma
+    transação curta no servidor. Retorna o total de linhas atualizadas.
+    """
+    apos_id, total = 0, 0
+    while True:
+        resp = supabase.rpc("backfill_datas", {
+            "p_tabela": tabela, "p_coluna": coluna, "p_apos_id": apos_id, "p_lote": lote
+        }).execute()
+        resultado = resp.data or {}
+        total += resultado.get("atualizadas", 0)
+        if resultado.get("ultimo_id") is None:
+            return total
+        apos_id = resultado["ultimo_id"]
+        print(f"  {tabela}.{coluna}: até id {apos_id}, {total} linha(s) atualizada(s)", flush=True)
+
+
+def contar_pendentes(tabela, coluna):
+    """
+    Linhas com texto preenchido e *_ts ainda nulo (texto inválido após o backfill).
+    """
+    resp = (
+        supabase.table(tabela).select("id", count="exact", head=True)
+        .is_(f"{coluna}_ts", None)
+        .not_.is_(coluna, None)
+        .neq(coluna, "")
+        .execute()
+    )
+    return resp.count or 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill das colunas timestamptz (*_ts).")
+    parser.add_argument("--lote", type=int, default=1000, help="linhas por requisição")
+    parser.add_argument("--tabela", action="append", help="restringe a uma ou mais tabelas")
+    args = parser.parse_args(argv)
+
+    pendencias = 0
+    for tabela, coluna in COLUNAS_MIGRACAO:
+        if args.tabela and tabela not in args.tabela:
+            continue
+        print(f"Migrando {tabela}.{coluna} -> {coluna}_ts")
+        total = migrar_coluna(tabela, coluna, args.lote)
+        pendentes = contar_pendentes(tabela, coluna)
+        pendencias += pendentes
+        print(f"  concluído: {total} atualizada(s), {pendentes} com texto inválido")
+    return 1 if pendencias else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# notificacoes.py — envio de mensagens de WhatsApp em segundo plano
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Capacidade da fila; mensagens além disso são descartadas (e contadas nas métricas)
+NOTIF_FILA_MAX = int(os.getenv("NOTIF_FILA_MAX", "500"))
+NOTIF_WORKERS = int(os.getenv("NOTIF_WORKERS", "4"))
+NOTIF_TENTATIVAS = int(os.getenv("NOTIF_TENTATIVAS", "3"))
+# Espera (segundos) antes da 2ª tentativa; dobra a cada nova falha
+NOTIF_BACKOFF_BASE = float(os.getenv("NOTIF_BACKOFF_BASE", "1.0"))
+
+
+class TwilioTransport:
+    """
+    Envia mensagens pelo Twilio reaproveitando um único Client (e sua conexão HTTP).
+    """
+    def __init__(self, account_sid, auth_token, from_number):
+        from twilio.rest import Client
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+
+    def enviar(self, destino, corpo):
+        self.client.messages.create(body=corpo, from_=self.from_number, to=destino)
+
+
+class FakeTransport:
+    """
+    Transporte local que só registra as mensagens em memória.
+    'falhas' faz as N primeiras tentativas de cada destino falharem, para exercitar as retentativas.
+    """
+    def __init__(self, falhas=0):
+        self.falhas = falhas
+        self.enviadas = []
+        self._tentativas = {}
+        self._lock = threading.Lock()
+
+    def enviar(self, destino, corpo):
+        with self._lock:
+            self._tentativas[destino] = self._tentativas.get(destino, 0) + 1
+            if self._tentativas[destino] <= self.falhas:
+                raise RuntimeError(f"falha simulada para {destino}")
+            self.enviadas.append((destino, corpo))
+
+
+class WhatsAppDispatcher:
+    """
+    Fila limitada + pool de threads que entregam as mensagens pelo 'transport'.
+    Quem enfileira não espera nenhuma requisição HTTP.
+    """
+    def __init__(self, transport, workers=NOTIF_WORKERS, fila_max=NOTIF_FILA_MAX,
+                 tentativas=NOTIF_TENTATIVAS, backoff_base=NOTIF_BACKOFF_BASE):
+        self.transport = transport
+        self.tentativas = max(1, tentativas)
+        self.backoff_base = backoff_base
+        self._fila = queue.Queue(maxsize=fila_max)
+        self._lock = threading.Lock()
+        self._metricas = {
+            "enfileiradas": 0,
+            "enviadas": 0,
+            "falhas": 0,
+            "retentativas": 0,
+            "descartadas": 0,
+            "tempo_envio_total_s": 0.0,
+        }
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"whatsapp-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _contar(self, chave, valor=1):
+        with self._lock:
+            self._metricas[chave] += valor
+
+    def enviar(self, destinos, corpo):
+        """
+        Enfileira 'corpo' para cada destino e retorna quantas mensagens entraram na fila.
+        """
+        aceitas = 0
+        for destino in destinos:
+            try:
+                self._fila.put_nowait((destino, corpo))
+                aceitas += 1
+            except queue.Full:
+                self._contar("descartadas")
+                logger.warning("Fila de WhatsApp cheia; mensagem para %s descartada.", destino)
+        self._contar("enfileiradas", aceitas)
+        return aceitas
+
+    def _worker(self):
+        while True:
+            destino, corpo = self._fila.get()
+            try:
+                self._entregar(destino, corpo)
+            finally:
+                self._fila.task_done()
+
+    def _entregar(self, destino, corpo):
+        for tentativa in range(1, self.tentativas + 1):
+            inicio = time.perf_counter()
+            try:
+                self.transport.enviar(destino, corpo)
+                self._contar("enviadas")
+                self._contar("tempo_envio_total_s", time.perf_counter() - inicio)
+                return
+            except Exception as e:
+                if tentativa == self.tentativas:
+                    self._contar("falhas")
+                    logger.error("Erro ao enviar mensagem para %s após %d tentativas: %s", destino, tentativa, e)
+                    return
+                self._contar("retentativas")
+                espera = self.backoff_base * (2 ** (tentativa - 1))
+                time.sleep(espera * (1 + random.random() * 0.1))
+
+    def aguardar(self):
+        """
+        Bloqueia até a fila esvaziar (útil em scripts e testes).
+        """
+        self._fila.join()
+
+    def metricas(self):
+        with self._lock:
+            m = dict(self._metricas)
+        m["pendentes"] = self._fila.qsize()
+        return m
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """
+    Retorna o dispatcher do processo, criado na primeira chamada.
+    WHATSAPP_TRANSPORT=fake usa o FakeTransport; o padrão é o Twilio, que exige
+    TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN e TWILIO_WHATSAPP_NUMBER.
+    Retorna None se o Twilio não estiver configurado.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            if os.getenv("WHATSAPP_TRANSPORT", "twilio").lower() == "fake":
+                transport = FakeTransport()
+            else:
+                account_sid = os.getenv("TWILIO_ACCOUNT_SID")
+                auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+                from_number = os.getenv("TWILIO_WHATSAPP_NUMBER")
+                if not all([account_sid, auth_token, from_number]):
+                    return None
+                transport = TwilioTransport(account_sid, auth_token, from_number)
+            _dispatcher = WhatsAppDispatcher(transport)
+        return _dispatcher
@@ -0,0 +1,153 @@
+# relatorio.py — montagem da página de Relatórios em uma passada, sem dependência do Streamlit
+#
+# construir_relatorio() recebe os chamados filtrados (com abertura_dt/fechamento_dt,
+# como vêm do snapshot) e as linhas do rollup e devolve um Relatorio com os KPIs,
+# as séries dos gráficos e as abas do Excel. A página e a exportação só consomem o resultado.
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from horas_uteis import calculate_working_hours_array
+
+DIAS_SEMANA_PT = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"]
+
+
+@dataclass(frozen=True)
+class Relatorio:
+    """
+    KPIs e agregados da página de Relatórios.
+    - chamados: chamados filtrados + tempo_uteis_seg, idade_uteis_h, em_aberto, dentro_sla
+    - aberturas_semana / fechamentos_semana: semana (segunda-feira, 'YYYY-MM-DD'), qtd
+    - heatmap: dia da semana x hora (aberturas)
+    - top_ubs / top_setor: ubs|setor, qtd
+    - pivot_ubs_mes: UBS x mês 'YYYY-MM' (aberturas)
+    """
+    sla_horas: float
+    total: int
+    abertos: int
+    fechados: int
+    tma_h: Optional[float]
+    mediana_h: Optional[float]
+    pct_sla: float
+    backlog_sla: int
+    chamados: pd.DataFrame
+    aberturas_semana: pd.DataFrame
+    fechamentos_semana: pd.DataFrame
+    heatmap: pd.DataFrame
+    top_ubs: pd.DataFrame
+    top_setor: pd.DataFrame
+    pivot_ubs_mes: pd.DataFrame
+
+    def abas_excel(self, lote=1000):
+        """
+        {aba: iterável de DataFrames} no formato de exportacao.escrever_excel:
+        os chamados em fatias de 'lote' linhas e os agregados não vazios como abas extras.
+        """
+        chamados = self.chamados
+        abas = {"Chamados": (chamados.iloc[i:i + lote] for i in range(0, len(chamados), lote))}
+        extras = {
+            "Top_UBS": self.top_ubs,
+            "Top_Setores": self.top_setor,
+            "Aberturas_Semana": self.aberturas_semana,
+            "Fechamentos_Semana": self.fechamentos_semana,
+            "Pivot_UBS_Mes": self.pivot_ubs_mes.reset_index(),
+        }
+        abas.update({nome: [aba] for nome, aba in extras.items() if not aba.empty})
+        return abas
+
+
+def _kpis(chamados, sla_horas, agora_local):
+    """
+    Tempo útil de cada chamado (uma chamada vetorizada: até o fechamento ou até agora)
+    e os KPIs derivados dele.
+    """
+    abertura, fechamento = chamados["abertura_dt"], chamados["fechamento_dt"]
+    fechado = fechamento.notna().to_numpy()
+    uteis = calculate_working_hours_array(abertura, fechamento.where(fechado, pd.Timestamp(agora_local)))
+    tempo = np.where(fechado, uteis, np.nan)
+    idade_h = np.round(uteis / 3600.0, 2)
+    dentro_sla = fechado & (tempo <= sla_horas * 3600)
+
+    total = len(chamados)
+    fechados = int(fechado.sum())
+    tempos_fechados = pd.Series(tempo[fechado])
+    kpis = {
+        "total": total,
+        "abertos": total - fechados,
+        "fechados": fechados,
+        "tma_h": (tempos_fechados.mean() or 0) / 3600 if fechados else None,
+        "mediana_h": (tempos_fechados.median() or 0) / 3600 if fechados else None,
+        "pct_sla": float(dentro_sla[fechado].mean() * 100) if fechados else 0.0,
+        "backlog_sla": int((~fechado & (idade_h > sla_horas)).sum()),
+    }
+    colunas = {"tempo_uteis_seg": tempo, "idade_uteis_h": idade_h, "em_aberto": ~fechado, "dentro_sla": dentro_sla}
+    return kpis, chamados.assign(**colunas)
+
+
+def _agregados(rollup, top):
+    """
+    Agrupa o rollup uma única vez por (semana, mês, dia da semana, hora, ubs, setor);
+    todas as séries saem desse resultado reduzido. Datas ficam em datetime64 e
+    ubs/setor em categorias até o fim; só os rótulos finais viram texto.
+    """
+    dia = pd.to_datetime(rollup["dia"]).to_numpy(dtype="datetime64[D]")
+    dia_semana = (dia.view("int64") - 4) % 7  # 1970-01-01 foi uma quinta-feira
+    chaves = {
+        "semana": dia - dia_semana.astype("timedelta64[D]"),
+        "mes": dia.astype("datetime64[M]"),
+        "dia_semana": dia_semana.astype("int8"),
+        "hora": rollup["hora"].to_numpy(dtype="int16"),
+        "ubs": pd.Categorical(rollup["ubs"]),
+        "setor": pd.Categorical(rollup["setor"]),
+    }
+    base = pd.DataFrame({
+        **chaves,
+        "aberturas": rollup["aberturas"].to_numpy(dtype="int64"),
+        "fechamentos": rollup["fechamentos"].to_numpy(dtype="int64"),
+    })
+    g = base.groupby(list(chaves), observed=True, sort=False)[["aberturas", "fechamentos"]].sum().reset_index()
+    com_abertura = g[g["aberturas"] > 0]
+
+    def _por_semana(coluna):
+        serie = g.groupby("semana")[coluna].sum()
+        serie = serie[serie > 0]
+        return pd.DataFrame({"semana": serie.index.strftime("%Y-%m-%d"), "qtd": serie.to_numpy()})
+
+    def _ranking(coluna):
+        serie = com_abertura.groupby(coluna, observed=True)["aberturas"].sum()
+        serie = serie[(serie.index != "") & (serie > 0)].sort_values(ascending=False, kind="stable").head(top)
+        return pd.DataFrame({coluna: serie.index.astype(str), "qtd": serie.to_numpy()})
+
+    heat = com_abertura.groupby(["dia_semana", "hora"])["aberturas"].sum().unstack(fill_value=0)
+    heat.index = [DIAS_SEMANA_PT[d] for d in heat.index]
+    heat.columns.name = "hora"
+
+    pvt = com_abertura[com_abertura["ubs"] != ""].groupby(["ubs", "mes"], observed=True)["aberturas"].sum().unstack(fill_value=0)
+    pvt.index = pvt.index.astype(str)
+    pvt.index.name = "ubs"
+    pvt.columns = pd.DatetimeIndex(pvt.columns).strftime("%Y-%m")
+    pvt.columns.name = "mes"
+
+    return {
+        "aberturas_semana": _por_semana("aberturas"),
+        "fechamentos_semana": _por_semana("fechamentos"),
+        "heatmap": heat,
+        "top_ubs": _ranking("ubs"),
+        "top_setor": _ranking("setor"),
+        "pivot_ubs_mes": pvt,
+    }
+
+
+def construir_relatorio(chamados, rollup, sla_horas=48, agora_local=None, top=15):
+    """
+    Monta o Relatorio a partir dos chamados filtrados ('abertura_dt'/'fechamento_dt'
+    datetime64 locais) e das linhas do rollup do mesmo período (rollup.CHAVES_ROLLUP +
+    METRICAS_ROLLUP). 'agora_local' (datetime ingênuo, Fortaleza) é o fim da idade dos abertos.
+    """
+    if agora_local is None:
+        from datas import agora
+        agora_local = agora().replace(tzinfo=None)
+    kpis, chamados = _kpis(chamados, sla_horas, agora_local)
+    return Relatorio(sla_horas=sla_horas, chamados=chamados, **kpis, **_agregados(rollup, top))
@@ -0,0 +1,209 @@
+# rollup.py — agregados dos relatórios mantidos de forma incremental (tabela chamados_rollup)
+#
+# Reconstrução completa: python rollup.py --rebuild
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from datas import coluna_data, agora
+from horas_uteis import calculate_working_hours_array
+from metricas import cronometrar
+from relatorio import construir_relatorio
+from snapshot import carregar_chamados
+from supabase_client import supabase
+
+CHAVES_ROLLUP = ["dia", "hora", "ubs", "setor", "tipo_defeito"]
+METRICAS_ROLLUP = ["aberturas", "fechados", "soma_uteis_seg", "fechamentos"]
+COLUNAS_CHAMADO_ROLLUP = "id,ubs,setor,tipo_defeito,hora_abertura,hora_fechamento,hora_abertura_ts,hora_fechamento_ts"
+# Tempo (segundos) que o rollup lido fica em cache para os relatórios
+ROLLUP_CACHE_TTL = int(os.getenv("ROLLUP_CACHE_TTL", "60"))
+# Tempo (segundos) que os KPIs do Dashboard (RPC dashboard_resumo) ficam em cache
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+# Relatórios prontos mantidos em cache (combinações de filtros; a menos usada sai primeiro)
+# e por quanto tempo (segundos): a idade dos chamados abertos é calculada na montagem
+RELATORIO_CACHE_MAX = int(os.getenv("RELATORIO_CACHE_MAX", "32"))
+RELATORIO_CACHE_TTL = int(os.getenv("RELATORIO_CACHE_TTL", "300"))
+_LOTE = 1000
+
+# =====================================================
+# Cálculo (mesma regra para o incremental e a reconstrução)
+# =====================================================
+@cronometrar("transform")
+def calcular_rollup(df):
+    """
+    Agrega um DataFrame de chamados nas linhas do rollup (CHAVES_ROLLUP + METRICAS_ROLLUP).
+    'df' precisa de ubs, setor, tipo_defeito e hora_abertura/hora_fechamento
+    (texto legado e/ou *_ts). Chamados sem data de abertura válida são ignorados.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=CHAVES_ROLLUP + METRICAS_ROLLUP)
+    abertura = coluna_data(df, "hora_abertura")
+    fechamento = coluna_data(df, "hora_fechamento")
+    base = pd.DataFrame({
+        c: df[c].astype(object).fillna("").astype(str) if c in df.columns else ""
+        for c in ("ubs", "setor", "tipo_defeito")
+    }, index=df.index)
+    base["fechado"] = fechamento.notna().astype(int)
+    base["uteis"] = np.nan_to_num(calculate_working_hours_array(abertura, fechamento))
+
+    valido = abertura.notna()
+    ab = base[valido].assign(dia=abertura[valido].dt.date, hora=abertura[valido].dt.hour)
+    por_abertura = ab.groupby(CHAVES_ROLLUP).agg(
+        aberturas=("fechado", "size"), fechados=("fechado", "sum"), soma_uteis_seg=("uteis", "sum")
+    )
+
+    fechou = valido & fechamento.notna()
+    fe = base[fechou].assign(dia=fechamento[fechou].dt.date, hora=fechamento[fechou].dt.hour)
+    por_fechamento = fe.groupby(CHAVES_ROLLUP).size().rename("fechamentos")
+
+    rollup = por_abertura.join(por_fechamento, how="outer").fillna(0).reset_index()
+    for c in ("aberturas", "fechados", "fechamentos"):
+        rollup[c] = rollup[c].astype(int)
+    return rollup[CHAVES_ROLLUP + METRICAS_ROLLUP]
+
+def _deltas(chamado, sinal_abertura=0, sinal_fechamento=0):
+    """
+    Contribuição de um chamado ao rollup, multiplicada pelos sinais:
+    abertura (+1 ao abrir) e fechamento (+1 ao finalizar, -1 ao reabrir).
+    """
+    rollup = calcular_rollup(pd.DataFrame([chamado]))
+    if rollup.empty:
+        return []
+    rollup["aberturas"] *= sinal_abertura
+    for c in ("fechados", "soma_uteis_seg", "fechamentos"):
+        rollup[c] *= sinal_fechamento
+    rollup["dia"] = rollup["dia"].astype(str)
+    return rollup.to_dict("records")
+
+def _aplicar(deltas):
+    """
+    Envia os deltas ao banco (RPC incrementar_rollup, ver sql/006_chamados_rollup.sql).
+    Uma falha não interrompe a operação do chamado: o rollup fica desatualizado
+    até a próxima reconstrução (python rollup.py --rebuild).
+    """
+    deltas = [d for d in deltas if any(d[m] for m in METRICAS_ROLLUP)]
+    if not deltas:
+        return
+    try:
+        supabase.rpc("incrementar_rollup", {"p_deltas": _serializavel(deltas)}).execute()
+        carregar_rollup.clear()
+    except Exception as e:
+        print(f"Erro ao atualizar rollup de chamados: {e}")
+
+def _serializavel(deltas):
+    return [{k: (v.item() if isinstance(v, np.generic) else v) for k, v in d.items()} for d in deltas]
+
+def registrar_abertura(chamado):
+    _aplicar(_deltas(chamado, sinal_abertura=1))
+
+def registrar_fechamento(chamado):
+    """
+    'chamado' deve trazer abertura e fechamento (texto ou *_ts), ubs, setor e tipo_defeito.
+    """
+    _aplicar(_deltas(chamado, sinal_fechamento=1))
+
+def registrar_reabertura(chamado):
+    """
+    Desfaz o fechamento anterior; 'chamado' é a linha como estava antes de reabrir.
+    """
+    _aplicar(_deltas(chamado, sinal_fechamento=-1))
+
+# =====================================================
+# Leitura para os relatórios
+# =====================================================
+@st.cache_data(ttl=ROLLUP_CACHE_TTL, show_spinner=False)
+def carregar_rollup(inicio, fim, ubs=(), setor=()):
+    """
+    Linhas do rollup com dia entre 'inicio' e 'fim' (dates, inclusive), com filtros
+    opcionais de UBS/setor. Retorna um DataFrame com 'dia' como datetime64.
+    """
+    linhas, ultimo_id = [], 0
+    while True:
+        query = (
+            supabase.table("chamados_rollup").select("id," + ",".join(CHAVES_ROLLUP + METRICAS_ROLLUP))
+            .gte("dia", inicio.isoformat()).lte("dia", fim.isoformat()).gt("id", ultimo_id)
+        )
+        if ubs:
+            query = query.in_("ubs", list(ubs))
+        if setor:
+            query = query.in_("setor", list(setor))
+        lote = query.order("id").limit(_LOTE).execute().data or []
+        linhas.extend(lote)
+        if len(lote) < _LOTE:
+            break
+        ultimo_id = lote[-1]["id"]
+    df = pd.DataFrame(linhas, columns=["id"] + CHAVES_ROLLUP + METRICAS_ROLLUP).drop(columns="id")
+    df["dia"] = pd.to_datetime(df["dia"])
+    return df
+
+@cronometrar("fetch")
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def resumo_dashboard(limite_horas=48):
+    """
+    KPIs e tendências do Dashboard calculados no servidor (RPC dashboard_resumo,
+    ver sql/007_dashboard_resumo.sql): total, abertos, fechados, atrasados
+    (> 'limite_horas' horas úteis), mensal [{mes, qtd_mensal}] e semanal [{semana, qtd_semanal}].
+    """
+    resp = supabase.rpc("dashboard_resumo", {"p_limite_horas": limite_horas}).execute()
+    return resp.data or {}
+
+@cronometrar()
+@st.cache_data(ttl=RELATORIO_CACHE_TTL, max_entries=RELATORIO_CACHE_MAX, show_spinner=False)
+def relatorio_filtrado(inicio, fim, ubs=(), setor=(), sla_horas=48, versao=None):
+    """
+    Relatorio (relatorio.py) dos chamados abertos entre 'inicio' e 'fim' (dates), com
+    filtros de UBS/setor (tuplas ordenadas) e SLA. 'versao' (snapshot.versao_dados)
+    só entra na chave do cache: gravações em chamados mudam a versão e o próximo
+    acesso remonta o relatório. Retorna (relatorio, rollup_disponivel) ou None sem dados.
+    """
+    df = carregar_chamados(
+        datetime.combine(inicio, datetime.min.time()), datetime.combine(fim, datetime.max.time()),
+        ubs=list(ubs), setor=list(setor)
+    )
+    if df.empty:
+        return None
+    # Os gráficos somam poucas linhas pré-agregadas por dia/hora/UBS/setor/tipo
+    # em vez de reagrupar o histórico de chamados
+    rollup_disponivel = True
+    try:
+        rl = carregar_rollup(inicio, fim, ubs, setor)
+    except Exception as e:
+        print(f"Erro ao carregar rollup: {e}")
+        rollup_disponivel = False
+        rl = calcular_rollup(df)
+        rl["dia"] = pd.to_datetime(rl["dia"])
+    return construir_relatorio(df, rl, sla_horas, agora().replace(tzinfo=None)), rollup_disponivel
+
+# =====================================================
+# Reconstrução completa
+# =====================================================
+def reconstruir_rollup():
+    """
+    Recalcula o rollup inteiro a partir da tabela chamados, em uma única transação
+    no servidor (RPC reconstruir_rollup, sql/010_reconstruir_rollup.sql), sem perder
+    os deltas registrados durante a reconstrução.
+    Retorna a quantidade de linhas do rollup gravadas.
+    """
+    resp = supabase.rpc("reconstruir_rollup", {}).execute()
+    return resp.data or 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção da tabela chamados_rollup.")
+    parser.add_argument("--rebuild", action="store_true", help="recalcula o rollup a partir dos chamados")
+    args = parser.parse_args(argv)
+    if not args.rebuild:
+        parser.print_help()
+        return 1
+    total = reconstruir_rollup()
+    print(f"Rollup reconstruído: {total} linha(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
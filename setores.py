@@ -1,11 +1,24 @@
 # setores.py
 import streamlit as st
 from supabase_client import supabase
+from metricas import cronometrar
+from ubs import REFERENCE_CACHE_TTL
 
+@st.cache_data(ttl=REFERENCE_CACHE_TTL, show_spinner=False)
+def _fetch_setores_list():
+    """
+    Lê os nomes dos setores no Supabase, com o mesmo cache de processo das UBSs.
+    """
+    resp = supabase.table("setores").select("nome_setor").execute()
+    return [s["nome_setor"] for s in resp.data] if resp.data else []
+
+def invalidate_setores_cache():
+    _fetch_setores_list.clear()
+
+@cronometrar("fetch")
 def get_setores_list():
     try:
-        resp = supabase.table("setores").select("nome_setor").execute()
-        return [s["nome_setor"] for s in resp.data] if resp.data else []
+        return _fetch_setores_list()
     except Exception as e:
         st.error("Erro ao recuperar setores.")
         print(f"Erro: {e}")
@@ -15,6 +28,7 @@ def add_setor(nome_setor):
     try:
         # Tenta inserir; se já existir, ignora
         supabase.table("setores").insert({"nome_setor": nome_setor}).execute()
+        invalidate_setores_cache()
         return True
     except Exception as e:
         print(f"Erro ao adicionar setor: {e}")
@@ -23,6 +37,7 @@ def add_setor(nome_setor):
 def remove_setor(nome_setor):
     try:
         supabase.table("setores").delete().eq("nome_setor", nome_setor).execute()
+        invalidate_setores_cache()
         return True
     except Exception as e:
         print(f"Erro ao remover setor: {e}")
@@ -31,6 +46,7 @@ def remove_setor(nome_setor):
 def update_setor(old_name, new_name):
     try:
         supabase.table("setores").update({"nome_setor": new_name}).eq("nome_setor", old_name).execute()
+        invalidate_setores_cache()
         return True
     except Exception as e:
         print(f"Erro ao atualizar setor: {e}")
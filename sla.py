@@ -0,0 +1,113 @@
+# sla.py — prazo de SLA por tipo de defeito (tabela sla_config, coluna chamados.sla_deadline)
+import os
+
+import pandas as pd
+import streamlit as st
+
+from datas import agora, para_iso, FORTALEZA_TZ
+from horas_uteis import add_working_hours
+from supabase_client import supabase
+from ubs import REFERENCE_CACHE_TTL
+
+# SLA (horas úteis) dos tipos de defeito sem configuração própria
+SLA_HORAS_PADRAO = float(os.getenv("SLA_HORAS_PADRAO", "48"))
+
+@st.cache_data(ttl=REFERENCE_CACHE_TTL, show_spinner=False)
+def _fetch_sla_config():
+    resp = supabase.table("sla_config").select("tipo_defeito,horas_uteis").execute()
+    return {c["tipo_defeito"]: float(c["horas_uteis"]) for c in resp.data} if resp.data else {}
+
+def invalidate_sla_cache():
+    _fetch_sla_config.clear()
+
+def get_sla_config():
+    """
+    {tipo_defeito: horas úteis} dos tipos com SLA próprio.
+    """
+    try:
+        return _fetch_sla_config()
+    except Exception as e:
+        print(f"Erro ao recuperar configuração de SLA: {e}")
+        return {}
+
+def horas_sla(tipo_defeito):
+    return get_sla_config().get(tipo_defeito, SLA_HORAS_PADRAO)
+
+def campos_sla(tipo_defeito, inicio=None):
+    """
+    Valores de escrita do SLA de um chamado: sla_inicio_ts e sla_deadline
+    (início + horas úteis do tipo). Sem 'inicio', a contagem começa agora.
+    """
+    inicio = agora() if inicio is None else inicio
+    local = inicio.astimezone(FORTALEZA_TZ).replace(tzinfo=None) if inicio.tzinfo is not None else inicio
+    prazo = add_working_hours(local, horas_sla(tipo_defeito))
+    return {"sla_inicio_ts": para_iso(inicio), "sla_deadline": para_iso(prazo)}
+
+def recalcular_sla(tipo_defeito=None):
+    """
+    Recalcula no servidor o prazo dos chamados abertos do tipo (ou de todos).
+    Retorna a quantidade de chamados atualizados, ou None em caso de erro.
+    """
+    try:
+        resp = supabase.rpc("recalcular_sla", {
+            "p_tipo_defeito": tipo_defeito, "p_horas_padrao": SLA_HORAS_PADRAO
+        }).execute()
+        return resp.data
+    except Exception as e:
+        print(f"Erro ao recalcular SLA: {e}")
+        return None
+
+def definir_sla(tipo_defeito, horas_uteis):
+    try:
+        supabase.table("sla_config").upsert(
+            {"tipo_defeito": tipo_defeito, "horas_uteis": horas_uteis}, on_conflict="tipo_defeito"
+        ).execute()
+        invalidate_sla_cache()
+    except Exception as e:
+        print(f"Erro ao definir SLA: {e}")
+        return False
+    return recalcular_sla(tipo_defeito) is not None
+
+def remover_sla(tipo_defeito):
+    try:
+        supabase.table("sla_config").delete().eq("tipo_defeito", tipo_defeito).execute()
+        invalidate_sla_cache()
+    except Exception as e:
+        print(f"Erro ao remover SLA: {e}")
+        return False
+    return recalcular_sla(tipo_defeito) is not None
+
+def manage_sla(tipos_defeito=()):
+    st.subheader("SLA por Tipo de Defeito")
+    st.caption(
+        f"Tipos sem configuração usam {SLA_HORAS_PADRAO:g} horas úteis. Alterar um SLA "
+        "recalcula o prazo dos chamados em aberto daquele tipo."
+    )
+    config = get_sla_config()
+    if config:
+        st.dataframe(
+            pd.DataFrame(sorted(config.items()), columns=["Tipo de defeito", "Horas úteis"]),
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.write("Nenhum SLA específico configurado.")
+
+    opcoes = sorted(set(tipos_defeito) | set(config))
+    tipo = st.selectbox("Tipo de defeito", opcoes) if opcoes else st.text_input("Tipo de defeito")
+    horas = st.number_input(
+        "Horas úteis", min_value=1.0, max_value=1000.0, step=1.0,
+        value=float(config.get(tipo, SLA_HORAS_PADRAO)) if tipo else SLA_HORAS_PADRAO
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Salvar SLA", type="primary") and tipo:
+            if definir_sla(tipo, horas):
+                st.success("SLA atualizado e prazos recalculados.")
+            else:
+                st.error("Erro ao salvar SLA.")
+    with col2:
+        if tipo in config and st.button("Voltar ao padrão"):
+            if remover_sla(tipo):
+                st.success("SLA removido; o tipo volta ao padrão.")
+            else:
+                st.error("Erro ao remover SLA.")
@@ -0,0 +1,215 @@
+# snapshot.py — cópia local (Parquet por mês) da tabela chamados para relatórios
+import glob
+import json
+import os
+import threading
+import time
+
+import duckdb
+import pandas as pd
+import streamlit as st
+
+from datas import coluna_data
+from esquemas import tabela_chamados
+from supabase_client import supabase
+from metricas import cronometrar
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(".snapshot", "chamados"))
+# Intervalo mínimo (segundos) entre duas sincronizações com o Supabase
+SNAPSHOT_SYNC_INTERVAL = int(os.getenv("SNAPSHOT_SYNC_INTERVAL", "60"))
+# Linhas por requisição (abaixo do limite de linhas do PostgREST)
+SNAPSHOT_LOTE = 1000
+# Janela (segundos) relida antes da marca d'água a cada sincronização. updated_at vem
+# de now() (início da transação): uma transação longa que confirma depois de uma
+# sincronização grava um updated_at anterior à marca e, sem a janela, nunca seria lida.
+SNAPSHOT_JANELA_SEG = int(os.getenv("SNAPSHOT_JANELA_SEG", "300"))
+
+_ESTADO_PATH = os.path.join(SNAPSHOT_DIR, "_estado.json")
+_lock = threading.Lock()
+_ultima_sync = {"instante": 0.0}
+# Gravações de chamados feitas por este processo (ver marcar_alteracao)
+_geracao = {"valor": 0}
+
+# =====================================================
+# Estado (marca d'água)
+# =====================================================
+def _ler_estado():
+    try:
+        with open(_ESTADO_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"updated_at": None, "id": None}
+
+def _gravar_estado(estado):
+    tmp = _ESTADO_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f)
+    os.replace(tmp, _ESTADO_PATH)
+
+# =====================================================
+# Sincronização incremental
+# =====================================================
+def _buscar_alteracoes(estado):
+    """
+    Lê do Supabase, em lotes, as linhas com (updated_at, id) após a marca d'água,
+    relendo também os últimos SNAPSHOT_JANELA_SEG segundos antes dela.
+    """
+    linhas = []
+    marca_ts, marca_id = estado.get("updated_at"), estado.get("id")
+    inicio = None
+    if marca_ts is not None:
+        inicio = (pd.Timestamp(marca_ts) - pd.Timedelta(seconds=SNAPSHOT_JANELA_SEG)).isoformat()
+    while True:
+        query = supabase.table("chamados").select("*")
+        if linhas:
+            query = query.or_(
+                f'updated_at.gt."{marca_ts}",and(updated_at.eq."{marca_ts}",id.gt.{marca_id})'
+            )
+        elif inicio is not None:
+            query = query.gte("updated_at", inicio)
+        resp = query.order("updated_at").order("id").limit(SNAPSHOT_LOTE).execute()
+        lote = resp.data or []
+        linhas.extend(lote)
+        if len(lote) < SNAPSHOT_LOTE:
+            break
+        marca_ts, marca_id = lote[-1]["updated_at"], lote[-1]["id"]
+    return linhas
+
+def _descartar_conhecidas(df):
+    """
+    Remove as linhas relidas pela janela que o snapshot já tem na mesma versão
+    (mesmo id e updated_at), para não regravar partições sem mudança.
+    """
+    conhecidas = consultar("select id, updated_at from chamados where id in (select unnest(?))", [df["id"].tolist()])
+    if conhecidas.empty:
+        return df
+    versao = pd.to_datetime(conhecidas["updated_at"], utc=True, format="ISO8601")
+    vistas = set(zip(conhecidas["id"].astype("int64"), versao))
+    novas = [
+        (i, v) not in vistas
+        for i, v in zip(df["id"].astype("int64"), pd.to_datetime(df["updated_at"], utc=True, format="ISO8601"))
+    ]
+    return df[novas]
+
+def _preparar(df):
+    df["abertura_dt"] = coluna_data(df, "hora_abertura")
+    df["fechamento_dt"] = coluna_data(df, "hora_fechamento")
+    df["mes"] = df["abertura_dt"].dt.strftime("%Y-%m").fillna("sem_data")
+    return df
+
+def _gravar_particao(mes, novos):
+    """
+    Mescla as linhas novas/alteradas na partição do mês (última versão de cada id vence).
+    """
+    pasta = os.path.join(SNAPSHOT_DIR, f"mes={mes}")
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, "dados.parquet")
+    if os.path.exists(caminho):
+        novos = pd.concat([pd.read_parquet(caminho), novos], ignore_index=True)
+    novos = novos.drop_duplicates(subset="id", keep="last").sort_values("id")
+    tmp = caminho + ".tmp"
+    novos.to_parquet(tmp, index=False)
+    os.replace(tmp, caminho)
+
+def sincronizar_chamados():
+    """
+    Atualiza o snapshot local com as linhas alteradas desde a última marca d'água
+    (e as da janela SNAPSHOT_JANELA_SEG que ainda não estavam no snapshot).
+    Retorna a quantidade de linhas novas ou alteradas gravadas.
+    O mês de abertura de um chamado não muda, então cada linha fica sempre na mesma partição.
+    """
+    with _lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        estado = _ler_estado()
+        linhas = _buscar_alteracoes(estado)
+        recebidas = 0
+        if linhas:
+            df = _descartar_conhecidas(pd.DataFrame(linhas))
+            recebidas = len(df)
+            if recebidas:
+                df = _preparar(df)
+                for mes, grupo in df.groupby("mes"):
+                    _gravar_particao(mes, grupo.drop(columns=["mes"]))
+            # A marca d'água só avança: a última linha lida é a maior (updated_at, id)
+            _gravar_estado({"updated_at": linhas[-1]["updated_at"], "id": linhas[-1]["id"]})
+        _ultima_sync["instante"] = time.time()
+        return recebidas
+
+@cronometrar("fetch")
+def garantir_snapshot():
+    """
+    Sincroniza o snapshot se a última sincronização deste processo for mais antiga
+    que SNAPSHOT_SYNC_INTERVAL. Falhas de rede mantêm o snapshot atual.
+    """
+    if time.time() - _ultima_sync["instante"] < SNAPSHOT_SYNC_INTERVAL:
+        return
+    try:
+        sincronizar_chamados()
+    except Exception as e:
+        st.warning("Não foi possível atualizar o snapshot de chamados; exibindo a última cópia local.")
+        print(f"Erro ao sincronizar snapshot: {e}")
+
+# =====================================================
+# Versão dos dados (chave dos caches de relatório)
+# =====================================================
+def marcar_alteracao():
+    """
+    Chamado após gravar em chamados: muda a versão dos dados e força a próxima
+    garantir_snapshot() a sincronizar, para os relatórios já refletirem a gravação.
+    """
+    with _lock:
+        _geracao["valor"] += 1
+        _ultima_sync["instante"] = 0.0
+
+def versao_dados():
+    """
+    Token barato da versão dos chamados: marca d'água do snapshot (muda com gravações
+    de qualquer servidor, a cada sincronização) + gravações deste processo.
+    """
+    estado = _ler_estado()
+    return f"{estado.get('updated_at')}|{estado.get('id')}|{_geracao['valor']}"
+
+# =====================================================
+# Consultas (DuckDB sobre os Parquet)
+# =====================================================
+@cronometrar("fetch")
+def consultar(sql, params=None):
+    """
+    Executa 'sql' no DuckDB com a view 'chamados' apontando para o snapshot local.
+    Retorna um DataFrame (vazio se ainda não houver snapshot).
+    """
+    padrao = os.path.join(SNAPSHOT_DIR, "mes=*", "*.parquet")
+    if not glob.glob(padrao):
+        return pd.DataFrame()
+    con = duckdb.connect()
+    try:
+        con.execute(
+            "create view chamados as select * from "
+            f"read_parquet('{padrao}', hive_partitioning = true, union_by_name = true)"
+        )
+        return con.execute(sql, params or []).df()
+    finally:
+        con.close()
+
+@cronometrar("fetch")
+def carregar_chamados(inicio=None, fim=None, ubs=None, setor=None):
+    """
+    Lê do snapshot os chamados abertos entre 'inicio' e 'fim' (datetimes, inclusive),
+    com filtros opcionais de UBS/setor. Os filtros rodam no DuckDB, que descarta
+    partições de meses fora do período sem abrir os arquivos.
+    """
+    filtros, params = [], []
+    if inicio is not None:
+        filtros.append("abertura_dt >= ? and mes >= ?")
+        params += [inicio, inicio.strftime("%Y-%m")]
+    if fim is not None:
+        filtros.append("abertura_dt <= ? and mes <= ?")
+        params += [fim, fim.strftime("%Y-%m")]
+    if ubs:
+        filtros.append(f"ubs in ({', '.join('?' for _ in ubs)})")
+        params += list(ubs)
+    if setor:
+        filtros.append(f"setor in ({', '.join('?' for _ in setor)})")
+        params += list(setor)
+    where = f"where {' and '.join(filtros)}" if filtros else ""
+    return tabela_chamados(consultar(f"select * exclude (mes) from chamados {where}", params))
@@ -0,0 +1,87 @@
+-- 001_protocolo_contador.sql
+-- Contador atômico para os protocolos de chamados.
+-- Substitui o "max(protocolo) + 1" feito no cliente: o UPDATE ... RETURNING
+-- trava a linha do contador, então duas aberturas simultâneas nunca recebem
+-- o mesmo número, independentemente do tamanho da tabela chamados.
+
+create table if not exists public.protocolo_contador (
+    id smallint primary key default 1 check (id = 1),
+    ultimo bigint not null
+);
+
+-- Protocolos duplicados emitidos pelo gerador antigo (corrida no max + 1) impediriam
+-- o índice único abaixo. O chamado mais antigo (menor id) mantém o número; os demais
+-- recebem números novos acima do maior protocolo, registrados em protocolo_renumerados
+-- para quem procurar pelo número antigo.
+create table if not exists public.protocolo_renumerados (
+    chamado_id bigint primary key,
+    protocolo_antigo bigint not null,
+    protocolo_novo bigint not null,
+    renumerado_em timestamptz not null default now()
+);
+
+do $$
+declare
+    v_qtd integer;
+begin
+    lock table public.chamados in share row exclusive mode;
+
+    with duplicados as (
+        select id, protocolo,
+               row_number() over (partition by protocolo order by id) as ordem
+          from public.chamados
+         where protocolo is not null
+    ), novos as (
+        select d.id, d.protocolo,
+               -- acima também de blocos já reservados pelo contador (reexecução da migração)
+               greatest((select max(protocolo) from public.chamados),
+                        (select ultimo from public.protocolo_contador where id = 1), 0)
+               + row_number() over (order by d.id) as novo
+          from duplicados d
+         where d.ordem > 1
+    ), renumerados as (
+        update public.chamados c
+           set protocolo = n.novo
+          from novos n
+         where c.id = n.id
+        returning c.id, n.protocolo as antigo, n.novo
+    )
+    insert into public.protocolo_renumerados (chamado_id, protocolo_antigo, protocolo_novo)
+    select id, antigo, novo from renumerados;
+
+    get diagnostics v_qtd = row_count;
+    if v_qtd > 0 then
+        raise notice '% chamado(s) com protocolo duplicado renumerado(s); ver public.protocolo_renumerados', v_qtd;
+    end if;
+end;
+$$;
+
+-- Inicializa o contador a partir dos protocolos já emitidos (depois da renumeração)
+insert into public.protocolo_contador (id, ultimo)
+select 1, coalesce(max(protocolo), 0) from public.chamados
+on conflict (id) do update
+   set ultimo = greatest(public.protocolo_contador.ultimo, excluded.ultimo);
+
+create unique index if not exists chamados_protocolo_key on public.chamados (protocolo);
+
+-- Reserva 'p_quantidade' protocolos consecutivos e retorna o primeiro deles.
+-- Com p_quantidade > 1 o cliente pode distribuir o bloco localmente (hi-lo).
+create or replace function public.alocar_protocolos(p_quantidade integer default 1)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_ultimo bigint;
+begin
+    if p_quantidade is null or p_quantidade < 1 then
+        raise exception 'p_quantidade deve ser maior ou igual a 1';
+    end if;
+
+    update public.protocolo_contador
+       set ultimo = ultimo + p_quantidade
+     where id = 1
+    returning ultimo into v_ultimo;
+
+    return v_ultimo - p_quantidade + 1;
+end;
+$$;
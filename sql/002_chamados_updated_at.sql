@@ -0,0 +1,24 @@
+-- 002_chamados_updated_at.sql
+-- Marca d'água para a sincronização incremental do snapshot local (snapshot.py).
+-- Toda escrita em chamados atualiza updated_at; o cliente busca apenas as linhas
+-- com (updated_at, id) maior que a última marca sincronizada.
+
+alter table public.chamados
+    add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.tocar_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists chamados_updated_at on public.chamados;
+create trigger chamados_updated_at
+    before update on public.chamados
+    for each row execute function public.tocar_updated_at();
+
+create index if not exists chamados_updated_at_id_idx on public.chamados (updated_at, id);
@@ -0,0 +1,64 @@
+-- 003_finalizar_chamado.sql
+-- Fechamento de chamado em uma única transação e uma única requisição:
+-- atualiza o chamado, registra as peças usadas, dá baixa no estoque (agregada por
+-- peça) e grava o histórico de manutenção do patrimônio.
+
+-- p_pecas: [{"nome": "SSD 240GB", "quantidade": 2}, ...]
+create or replace function public.finalizar_chamado_tx(
+    p_chamado_id bigint,
+    p_solucao text,
+    p_hora_fechamento text,
+    p_pecas jsonb default '[]'::jsonb,
+    p_descricao text default null
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_patrimonio text;
+    v_nao_encontradas text[];
+begin
+    update public.chamados
+       set solucao = p_solucao,
+           hora_fechamento = p_hora_fechamento
+     where id = p_chamado_id
+       and hora_fechamento is null
+    returning patrimonio into v_patrimonio;
+
+    -- Chamado já finalizado (clique duplo ou fechamento concorrente): nada é gravado
+    -- de novo (peças, baixa no estoque, histórico) e o cliente não soma o rollup outra vez
+    if not found then
+        if exists (select 1 from public.chamados where id = p_chamado_id) then
+            raise exception 'Chamado % já está finalizado', p_chamado_id;
+        end if;
+        raise exception 'Chamado % não encontrado', p_chamado_id;
+    end if;
+
+    -- Uma linha em pecas_usadas por unidade utilizada
+    insert into public.pecas_usadas (chamado_id, peca_nome, data_uso)
+    select p_chamado_id, p.nome, p_hora_fechamento
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+           cross join lateral generate_series(1, p.quantidade);
+
+    -- Baixa no primeiro item do estoque com o nome da peça; nunca fica negativo
+    update public.estoque e
+       set quantidade = greatest(coalesce(e.quantidade, 0) - p.quantidade, 0)
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+     where e.id = (select min(id) from public.estoque where nome = p.nome);
+
+    select coalesce(array_agg(p.nome), '{}')
+      into v_nao_encontradas
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+     where not exists (select 1 from public.estoque where nome = p.nome);
+
+    if coalesce(v_patrimonio, '') <> '' then
+        insert into public.historico_manutencao (numero_patrimonio, descricao, data_manutencao)
+        values (v_patrimonio, p_descricao, p_hora_fechamento);
+    end if;
+
+    return jsonb_build_object(
+        'patrimonio', v_patrimonio,
+        'pecas_nao_encontradas', to_jsonb(v_nao_encontradas)
+    );
+end;
+$$;
@@ -0,0 +1,22 @@
+-- 004_ubs_resumo.sql
+-- Contagens por UBS para a listagem de "Gerenciar UBSs" em uma única consulta,
+-- em vez de buscar inventário e chamados de cada UBS separadamente.
+
+create or replace view public.ubs_resumo as
+select u.nome_ubs,
+       coalesce(i.qtd, 0) as qtd_inventario,
+       coalesce(c.qtd, 0) as qtd_chamados,
+       coalesce(c.abertos, 0) as chamados_abertos
+  from public.ubs u
+  left join (
+        select localizacao, count(*) as qtd
+          from public.inventario
+         group by localizacao
+       ) i on i.localizacao = u.nome_ubs
+  left join (
+        select ubs,
+               count(*) as qtd,
+               count(*) filter (where hora_fechamento is null) as abertos
+          from public.chamados
+         group by ubs
+       ) c on c.ubs = u.nome_ubs;
@@ -0,0 +1,202 @@
+-- 005_colunas_timestamptz.sql
+-- Colunas timestamptz ao lado dos textos 'dd/mm/YYYY HH:MM:SS' (e ISO no estoque).
+-- Durante a transição o app grava os dois (texto legado + *_ts) e lê *_ts com
+-- fallback para o texto (datas.coluna_data). O preenchimento das linhas antigas
+-- é feito em lotes por migrar_datas.py, via backfill_datas().
+
+alter table public.chamados
+    add column if not exists hora_abertura_ts timestamptz,
+    add column if not exists hora_fechamento_ts timestamptz;
+alter table public.pecas_usadas
+    add column if not exists data_uso_ts timestamptz;
+alter table public.historico_manutencao
+    add column if not exists data_manutencao_ts timestamptz;
+alter table public.estoque
+    add column if not exists data_adicao_ts timestamptz;
+
+create index if not exists chamados_hora_abertura_ts_id_idx on public.chamados (hora_abertura_ts, id);
+create index if not exists chamados_hora_fechamento_ts_idx on public.chamados (hora_fechamento_ts);
+
+-- Texto legado ou ISO -> timestamptz. Sem fuso explícito, vale o horário de Fortaleza.
+-- Valores inválidos retornam null (a linha fica para correção manual).
+create or replace function public.converter_data_texto(p_texto text)
+returns timestamptz
+language plpgsql
+stable
+as $$
+begin
+    p_texto := nullif(btrim(p_texto), '');
+    if p_texto is null then
+        return null;
+    end if;
+    if p_texto ~ '^\d{1,2}/\d{1,2}/\d{4}' then
+        return to_timestamp(
+                   p_texto,
+                   case when length(p_texto) > 10 then 'DD/MM/YYYY HH24:MI:SS' else 'DD/MM/YYYY' end
+               )::timestamp at time zone 'America/Fortaleza';
+    end if;
+    if p_texto ~ '\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}(:?\d{2})?)$' then
+        return p_texto::timestamptz;
+    end if;
+    return p_texto::timestamp at time zone 'America/Fortaleza';
+exception when others then
+    return null;
+end;
+$$;
+
+-- Rede de segurança para escritores antigos que só gravam o texto:
+-- preenche <coluna>_ts quando o texto muda e o timestamptz não foi informado.
+-- tg_argv: pares (coluna_texto, coluna_ts).
+create or replace function public.sincronizar_colunas_ts()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_novo jsonb := to_jsonb(new);
+    v_antigo jsonb := case when tg_op = 'UPDATE' then to_jsonb(old) else '{}'::jsonb end;
+    v_ajustes jsonb := '{}'::jsonb;
+    i integer := 0;
+begin
+    while i < tg_nargs loop
+        if (v_novo -> tg_argv[i]) is distinct from (v_antigo -> tg_argv[i])
+           and (v_novo -> tg_argv[i + 1]) is not distinct from coalesce(v_antigo -> tg_argv[i + 1], 'null'::jsonb) then
+            v_ajustes := v_ajustes || jsonb_build_object(
+                tg_argv[i + 1], public.converter_data_texto(v_novo ->> tg_argv[i])
+            );
+        end if;
+        i := i + 2;
+    end loop;
+    if v_ajustes <> '{}'::jsonb then
+        new := jsonb_populate_record(new, v_ajustes);
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists chamados_colunas_ts on public.chamados;
+create trigger chamados_colunas_ts
+    before insert or update on public.chamados
+    for each row execute function public.sincronizar_colunas_ts(
+        'hora_abertura', 'hora_abertura_ts', 'hora_fechamento', 'hora_fechamento_ts'
+    );
+
+drop trigger if exists pecas_usadas_colunas_ts on public.pecas_usadas;
+create trigger pecas_usadas_colunas_ts
+    before insert or update on public.pecas_usadas
+    for each row execute function public.sincronizar_colunas_ts('data_uso', 'data_uso_ts');
+
+drop trigger if exists historico_manutencao_colunas_ts on public.historico_manutencao;
+create trigger historico_manutencao_colunas_ts
+    before insert or update on public.historico_manutencao
+    for each row execute function public.sincronizar_colunas_ts('data_manutencao', 'data_manutencao_ts');
+
+drop trigger if exists estoque_colunas_ts on public.estoque;
+create trigger estoque_colunas_ts
+    before insert or update on public.estoque
+    for each row execute function public.sincronizar_colunas_ts('data_adicao', 'data_adicao_ts');
+
+-- Preenche até p_lote linhas de <p_coluna>_ts a partir do texto, em ordem de id,
+-- começando após p_apos_id. Retorna {"atualizadas": n, "ultimo_id": id ou null}.
+-- ultimo_id nulo indica que a tabela terminou.
+create or replace function public.backfill_datas(
+    p_tabela text,
+    p_coluna text,
+    p_apos_id bigint default 0,
+    p_lote integer default 1000
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_ultimo bigint;
+    v_atualizadas integer;
+begin
+    if (p_tabela, p_coluna) not in (
+        ('chamados', 'hora_abertura'), ('chamados', 'hora_fechamento'),
+        ('pecas_usadas', 'data_uso'), ('historico_manutencao', 'data_manutencao'),
+        ('estoque', 'data_adicao')
+    ) then
+        raise exception 'Coluna %.% não faz parte da migração', p_tabela, p_coluna;
+    end if;
+
+    execute format(
+        'select max(id) from (select id from public.%I where id > $1 order by id limit $2) lote',
+        p_tabela
+    ) into v_ultimo using p_apos_id, p_lote;
+
+    if v_ultimo is null then
+        return jsonb_build_object('atualizadas', 0, 'ultimo_id', null);
+    end if;
+
+    execute format(
+        'update public.%1$I set %3$I = public.converter_data_texto(%2$I)
+          where id > $1 and id <= $2 and %3$I is null and nullif(btrim(%2$I), '''') is not null',
+        p_tabela, p_coluna, p_coluna || '_ts'
+    ) using p_apos_id, v_ultimo;
+    get diagnostics v_atualizadas = row_count;
+
+    return jsonb_build_object('atualizadas', v_atualizadas, 'ultimo_id', v_ultimo);
+end;
+$$;
+
+-- finalizar_chamado_tx passa a receber o fechamento como timestamptz e grava
+-- os textos legados e as colunas *_ts na mesma transação.
+drop function if exists public.finalizar_chamado_tx(bigint, text, text, jsonb, text);
+create or replace function public.finalizar_chamado_tx(
+    p_chamado_id bigint,
+    p_solucao text,
+    p_hora_fechamento text,
+    p_pecas jsonb default '[]'::jsonb,
+    p_descricao text default null,
+    p_fechamento_ts timestamptz default now()
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_patrimonio text;
+    v_nao_encontradas text[];
+begin
+    update public.chamados
+       set solucao = p_solucao,
+           hora_fechamento = p_hora_fechamento,
+           hora_fechamento_ts = p_fechamento_ts
+     where id = p_chamado_id
+       and hora_fechamento is null
+    returning patrimonio into v_patrimonio;
+
+    -- Chamado já finalizado (clique duplo ou fechamento concorrente): nada é gravado
+    -- de novo (peças, baixa no estoque, histórico) e o cliente não soma o rollup outra vez
+    if not found then
+        if exists (select 1 from public.chamados where id = p_chamado_id) then
+            raise exception 'Chamado % já está finalizado', p_chamado_id;
+        end if;
+        raise exception 'Chamado % não encontrado', p_chamado_id;
+    end if;
+
+    insert into public.pecas_usadas (chamado_id, peca_nome, data_uso, data_uso_ts)
+    select p_chamado_id, p.nome, p_hora_fechamento, p_fechamento_ts
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+           cross join lateral generate_series(1, p.quantidade);
+
+    update public.estoque e
+       set quantidade = greatest(coalesce(e.quantidade, 0) - p.quantidade, 0)
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+     where e.id = (select min(id) from public.estoque where nome = p.nome);
+
+    select coalesce(array_agg(p.nome), '{}')
+      into v_nao_encontradas
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+     where not exists (select 1 from public.estoque where nome = p.nome);
+
+    if coalesce(v_patrimonio, '') <> '' then
+        insert into public.historico_manutencao (numero_patrimonio, descricao, data_manutencao, data_manutencao_ts)
+        values (v_patrimonio, p_descricao, p_hora_fechamento, p_fechamento_ts);
+    end if;
+
+    return jsonb_build_object(
+        'patrimonio', v_patrimonio,
+        'pecas_nao_encontradas', to_jsonb(v_nao_encontradas)
+    );
+end;
+$$;
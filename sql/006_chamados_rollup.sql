@@ -0,0 +1,125 @@
+-- 006_chamados_rollup.sql
+-- Agregados dos relatórios mantidos de forma incremental (rollup.py).
+-- Uma linha por (dia, hora, ubs, setor, tipo_defeito), no horário de Fortaleza:
+--   aberturas       chamados abertos naquele dia/hora
+--   fechados        desses, quantos estão fechados hoje
+--   soma_uteis_seg  soma do tempo útil (segundos) desses fechados
+--   fechamentos     chamados fechados naquele dia/hora (chave = fechamento)
+-- ubs/setor/tipo_defeito ausentes ficam como '' para a chave única funcionar.
+
+create table if not exists public.chamados_rollup (
+    id bigint generated always as identity primary key,
+    dia date not null,
+    hora smallint not null,
+    ubs text not null default '',
+    setor text not null default '',
+    tipo_defeito text not null default '',
+    aberturas integer not null default 0,
+    fechados integer not null default 0,
+    soma_uteis_seg double precision not null default 0,
+    fechamentos integer not null default 0,
+    unique (dia, hora, ubs, setor, tipo_defeito)
+);
+
+create index if not exists chamados_rollup_dia_idx on public.chamados_rollup (dia);
+
+-- p_deltas: [{"dia": "2025-01-31", "hora": 9, "ubs": "...", "setor": "...",
+--             "tipo_defeito": "...", "aberturas": 1, "fechados": 0,
+--             "soma_uteis_seg": 0, "fechamentos": 0}, ...]
+-- Soma os deltas às linhas existentes (ou cria as linhas) em uma única requisição.
+create or replace function public.incrementar_rollup(p_deltas jsonb)
+returns void
+language sql
+as $$
+    insert into public.chamados_rollup as r
+           (dia, hora, ubs, setor, tipo_defeito, aberturas, fechados, soma_uteis_seg, fechamentos)
+    select d.dia, d.hora, coalesce(d.ubs, ''), coalesce(d.setor, ''), coalesce(d.tipo_defeito, ''),
+           sum(coalesce(d.aberturas, 0)), sum(coalesce(d.fechados, 0)),
+           sum(coalesce(d.soma_uteis_seg, 0)), sum(coalesce(d.fechamentos, 0))
+      from jsonb_to_recordset(p_deltas) as d(
+               dia date, hora smallint, ubs text, setor text, tipo_defeito text,
+               aberturas integer, fechados integer, soma_uteis_seg double precision, fechamentos integer
+           )
+     group by 1, 2, 3, 4, 5
+    on conflict (dia, hora, ubs, setor, tipo_defeito) do update
+       set aberturas = r.aberturas + excluded.aberturas,
+           fechados = r.fechados + excluded.fechados,
+           soma_uteis_seg = r.soma_uteis_seg + excluded.soma_uteis_seg,
+           fechamentos = r.fechamentos + excluded.fechamentos;
+$$;
+
+-- Reconstrução: esvazia a tabela (usado por "python rollup.py --rebuild" antes
+-- de regravar os agregados calculados a partir dos chamados).
+create or replace function public.limpar_rollup()
+returns void
+language sql
+as $$
+    truncate public.chamados_rollup;
+$$;
+
+-- finalizar_chamado_tx devolve também os campos da chave do rollup,
+-- para o cliente registrar o fechamento sem uma leitura extra.
+create or replace function public.finalizar_chamado_tx(
+    p_chamado_id bigint,
+    p_solucao text,
+    p_hora_fechamento text,
+    p_pecas jsonb default '[]'::jsonb,
+    p_descricao text default null,
+    p_fechamento_ts timestamptz default now()
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_chamado public.chamados%rowtype;
+    v_nao_encontradas text[];
+begin
+    update public.chamados
+       set solucao = p_solucao,
+           hora_fechamento = p_hora_fechamento,
+           hora_fechamento_ts = p_fechamento_ts
+     where id = p_chamado_id
+       and hora_fechamento is null
+    returning * into v_chamado;
+
+    -- Chamado já finalizado (clique duplo ou fechamento concorrente): nada é gravado
+    -- de novo (peças, baixa no estoque, histórico) e o cliente não soma o rollup outra vez
+    if not found then
+        if exists (select 1 from public.chamados where id = p_chamado_id) then
+            raise exception 'Chamado % já está finalizado', p_chamado_id;
+        end if;
+        raise exception 'Chamado % não encontrado', p_chamado_id;
+    end if;
+
+    insert into public.pecas_usadas (chamado_id, peca_nome, data_uso, data_uso_ts)
+    select p_chamado_id, p.nome, p_hora_fechamento, p_fechamento_ts
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+           cross join lateral generate_series(1, p.quantidade);
+
+    update public.estoque e
+       set quantidade = greatest(coalesce(e.quantidade, 0) - p.quantidade, 0)
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+     where e.id = (select min(id) from public.estoque where nome = p.nome);
+
+    select coalesce(array_agg(p.nome), '{}')
+      into v_nao_encontradas
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+     where not exists (select 1 from public.estoque where nome = p.nome);
+
+    if coalesce(v_chamado.patrimonio, '') <> '' then
+        insert into public.historico_manutencao (numero_patrimonio, descricao, data_manutencao, data_manutencao_ts)
+        values (v_chamado.patrimonio, p_descricao, p_hora_fechamento, p_fechamento_ts);
+    end if;
+
+    return jsonb_build_object(
+        'patrimonio', v_chamado.patrimonio,
+        'pecas_nao_encontradas', to_jsonb(v_nao_encontradas),
+        'ubs', v_chamado.ubs,
+        'setor', v_chamado.setor,
+        'tipo_defeito', v_chamado.tipo_defeito,
+        'hora_abertura', v_chamado.hora_abertura,
+        'hora_abertura_ts', v_chamado.hora_abertura_ts,
+        'hora_fechamento_ts', v_chamado.hora_fechamento_ts
+    );
+end;
+$$;
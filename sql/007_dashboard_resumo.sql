@@ -0,0 +1,78 @@
+-- 007_dashboard_resumo.sql
+-- KPIs e tendências do Dashboard administrativo em uma única chamada (rollup.py: resumo_dashboard).
+-- O cliente recebe alguns KB em vez da tabela chamados inteira:
+--   total / abertos / fechados  contagens em chamados
+--   atrasados                   abertos há mais de p_limite_horas horas úteis (só percorre os abertos)
+--   mensal / semanal            aberturas por mês/semana, somadas do chamados_rollup (006)
+
+create index if not exists chamados_abertos_idx on public.chamados (id) where hora_fechamento is null;
+
+-- Segundos úteis entre uma âncora fixa (segunda, 1969-12-29) e 'p_ts' (horário local, sem fuso).
+-- Expediente 08:00–12:00 e 13:00–17:00, seg–sex, como em horas_uteis.py; a diferença
+-- entre dois acumulados é o tempo útil do intervalo.
+create or replace function public.segundos_uteis_acumulados(p_ts timestamp)
+returns double precision
+language sql
+immutable
+as $$
+    select (dias / 7) * 5 * 28800.0
+         + least(dias % 7, 5) * 28800.0
+         + case when extract(isodow from p_ts) <= 5 then
+               least(greatest(seg - 28800, 0), 14400) + least(greatest(seg - 46800, 0), 14400)
+           else 0 end
+      from (select (p_ts::date - date '1969-12-29') as dias,
+                   extract(epoch from p_ts - p_ts::date) as seg) t;
+$$;
+
+create or replace function public.segundos_uteis(p_inicio timestamptz, p_fim timestamptz)
+returns double precision
+language sql
+immutable
+as $$
+    select case when p_inicio is null or p_fim is null then null
+                when p_fim <= p_inicio then 0
+                else public.segundos_uteis_acumulados(p_fim at time zone 'America/Fortaleza')
+                   - public.segundos_uteis_acumulados(p_inicio at time zone 'America/Fortaleza')
+           end;
+$$;
+
+create or replace function public.dashboard_resumo(p_limite_horas integer default 48)
+returns jsonb
+language sql
+stable
+as $$
+    with contagens as (
+        select count(*) as total,
+               count(*) filter (where hora_fechamento is null) as abertos
+          from public.chamados
+    ),
+    atrasados as (
+        select count(*) as qtd
+          from public.chamados
+         where hora_fechamento is null
+           and public.segundos_uteis(
+                   coalesce(hora_abertura_ts, public.converter_data_texto(hora_abertura)), now()
+               ) > p_limite_horas * 3600
+    ),
+    mensal as (
+        select to_char(dia, 'YYYY-MM') as mes, sum(aberturas) as qtd_mensal
+          from public.chamados_rollup
+         group by 1
+        having sum(aberturas) > 0
+    ),
+    semanal as (
+        select to_char(date_trunc('week', dia), 'YYYY-MM-DD') as semana, sum(aberturas) as qtd_semanal
+          from public.chamados_rollup
+         group by 1
+        having sum(aberturas) > 0
+    )
+    select jsonb_build_object(
+        'total', c.total,
+        'abertos', c.abertos,
+        'fechados', c.total - c.abertos,
+        'atrasados', (select qtd from atrasados),
+        'mensal', coalesce((select jsonb_agg(m order by m.mes) from mensal m), '[]'::jsonb),
+        'semanal', coalesce((select jsonb_agg(s order by s.semana) from semanal s), '[]'::jsonb)
+    )
+      from contagens c;
+$$;
@@ -0,0 +1,110 @@
+-- 008_sla_deadline.sql
+-- Prazo de SLA gravado por chamado (sla.py): em vez de recalcular as horas úteis de
+-- cada chamado aberto a cada rerun, "atrasado" vira o filtro indexado sla_deadline < now().
+--   sla_inicio_ts  início da contagem (abertura; reabrir_chamado reinicia a contagem)
+--   sla_deadline   sla_inicio_ts + horas úteis do SLA do tipo_defeito (sla_config ou padrão)
+
+create table if not exists public.sla_config (
+    tipo_defeito text primary key,
+    horas_uteis numeric not null check (horas_uteis > 0),
+    updated_at timestamptz not null default now()
+);
+
+alter table public.chamados
+    add column if not exists sla_inicio_ts timestamptz,
+    add column if not exists sla_deadline timestamptz;
+
+create index if not exists chamados_sla_deadline_abertos_idx
+    on public.chamados (sla_deadline) where hora_fechamento is null;
+
+-- Inverso de segundos_uteis (007): o primeiro instante em que o tempo útil desde
+-- 'p_inicio' chega a 'p_horas'. Mesmo cálculo de horas_uteis.add_working_hours.
+create or replace function public.somar_horas_uteis(p_inicio timestamptz, p_horas numeric)
+returns timestamptz
+language sql
+immutable
+as $$
+    select case
+        when p_inicio is null or p_horas is null then null
+        when p_horas <= 0 then p_inicio
+        else (
+            select ((date '1969-12-29' + ((dia_util / 5) * 7 + dia_util % 5)::integer)::timestamp
+                    + make_interval(secs => case when resto <= 14400 then 28800 + resto
+                                                 else 46800 + resto - 14400 end))
+                   at time zone 'America/Fortaleza'
+              from (select dia_util, alvo - dia_util * 28800.0 as resto
+                      from (select alvo, (ceil(alvo / 28800.0) - 1)::bigint as dia_util
+                              from (select public.segundos_uteis_acumulados(p_inicio at time zone 'America/Fortaleza')
+                                           + p_horas * 3600 as alvo) a) b) c
+        )
+    end;
+$$;
+
+-- Recalcula o prazo dos chamados abertos (de um tipo, ou de todos com p_tipo_defeito nulo).
+-- Usado ao alterar o SLA de um tipo em sla_config e no backfill abaixo. Retorna as linhas alteradas.
+create or replace function public.recalcular_sla(p_tipo_defeito text default null, p_horas_padrao numeric default 48)
+returns integer
+language plpgsql
+as $$
+declare
+    v_linhas integer;
+begin
+    update public.chamados c
+       set sla_inicio_ts = coalesce(c.sla_inicio_ts, c.hora_abertura_ts, public.converter_data_texto(c.hora_abertura)),
+           sla_deadline = public.somar_horas_uteis(
+               coalesce(c.sla_inicio_ts, c.hora_abertura_ts, public.converter_data_texto(c.hora_abertura)),
+               coalesce((select s.horas_uteis from public.sla_config s where s.tipo_defeito = c.tipo_defeito), p_horas_padrao)
+           )
+     where c.hora_fechamento is null
+       and (p_tipo_defeito is null or c.tipo_defeito = p_tipo_defeito);
+    get diagnostics v_linhas = row_count;
+    return v_linhas;
+end;
+$$;
+
+-- Backfill dos chamados abertos existentes
+select public.recalcular_sla();
+
+-- Dashboard: atrasados passam a ser os abertos com o prazo vencido; linhas ainda sem
+-- sla_deadline caem no cálculo por horas úteis com p_limite_horas.
+create or replace function public.dashboard_resumo(p_limite_horas integer default 48)
+returns jsonb
+language sql
+stable
+as $$
+    with contagens as (
+        select count(*) as total,
+               count(*) filter (where hora_fechamento is null) as abertos
+          from public.chamados
+    ),
+    atrasados as (
+        select (select count(*) from public.chamados
+                 where hora_fechamento is null and sla_deadline < now())
+             + (select count(*) from public.chamados
+                 where hora_fechamento is null and sla_deadline is null
+                   and public.segundos_uteis(
+                           coalesce(hora_abertura_ts, public.converter_data_texto(hora_abertura)), now()
+                       ) > p_limite_horas * 3600) as qtd
+    ),
+    mensal as (
+        select to_char(dia, 'YYYY-MM') as mes, sum(aberturas) as qtd_mensal
+          from public.chamados_rollup
+         group by 1
+        having sum(aberturas) > 0
+    ),
+    semanal as (
+        select to_char(date_trunc('week', dia), 'YYYY-MM-DD') as semana, sum(aberturas) as qtd_semanal
+          from public.chamados_rollup
+         group by 1
+        having sum(aberturas) > 0
+    )
+    select jsonb_build_object(
+        'total', c.total,
+        'abertos', c.abertos,
+        'fechados', c.total - c.abertos,
+        'atrasados', (select qtd from atrasados),
+        'mensal', coalesce((select jsonb_agg(m order by m.mes) from mensal m), '[]'::jsonb),
+        'semanal', coalesce((select jsonb_agg(s order by s.semana) from semanal s), '[]'::jsonb)
+    )
+      from contagens c;
+$$;
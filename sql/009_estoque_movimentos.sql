@@ -0,0 +1,208 @@
+-- 009_estoque_movimentos.sql
+-- Livro de movimentações do estoque (estoque.py). Cada entrada, saída ou ajuste vira
+-- uma linha imutável em estoque_movimentos, e estoque.quantidade (o saldo exibido)
+-- é atualizado na mesma transação, com a linha da peça travada: duas baixas
+-- simultâneas não se sobrescrevem mais. aplicar_movimentos aplica um lote em uma chamada.
+--   quantidade   variação aplicada ao saldo (entrada > 0, saída < 0, ajuste com sinal)
+--   saldo_apos   saldo da peça depois do movimento
+-- Sem chave estrangeira para estoque: o histórico permanece se a peça for excluída.
+
+create table if not exists public.estoque_movimentos (
+    id bigserial primary key,
+    estoque_id bigint not null,
+    peca_nome text not null,
+    tipo text not null check (tipo in ('entrada', 'saida', 'ajuste')),
+    quantidade integer not null,
+    saldo_apos integer not null,
+    chamado_id bigint,
+    nota_fiscal text,
+    observacao text,
+    username text,
+    criado_em timestamptz not null default now()
+);
+
+create index if not exists estoque_movimentos_estoque_idx on public.estoque_movimentos (estoque_id, id desc);
+create index if not exists estoque_movimentos_chamado_idx on public.estoque_movimentos (chamado_id)
+    where chamado_id is not null;
+
+-- Somente inserção: correções são feitas com um novo movimento de ajuste
+create or replace function public.estoque_movimentos_imutavel()
+returns trigger
+language plpgsql
+as $$
+begin
+    raise exception 'estoque_movimentos aceita apenas inserções; registre um ajuste';
+end;
+$$;
+
+drop trigger if exists estoque_movimentos_imutavel on public.estoque_movimentos;
+create trigger estoque_movimentos_imutavel
+    before update or delete on public.estoque_movimentos
+    for each row execute function public.estoque_movimentos_imutavel();
+
+-- p_movimentos: [{"estoque_id": 3 | "nome": "SSD 240GB", "tipo": "entrada"|"saida"|"ajuste",
+--                 "quantidade": 2, "saldo": 10, "chamado_id", "nota_fiscal", "observacao", "username"}, ...]
+--   entrada/saida: 'quantidade' positiva; a saída nunca deixa o saldo negativo
+--   ajuste: 'quantidade' com sinal, ou 'saldo' para definir o saldo contado
+-- Peças por nome usam o primeiro item do estoque com esse nome. As linhas são
+-- travadas em ordem de id (sem deadlock entre lotes concorrentes).
+-- Retorna {"movimentos": [{id, estoque_id, peca_nome, quantidade, saldo_apos}], "nao_encontradas": [...]}.
+create or replace function public.aplicar_movimentos(p_movimentos jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_mov record;
+    v_nome text;
+    v_anterior integer;
+    v_saldo integer;
+    v_id bigint;
+    v_aplicados jsonb := '[]'::jsonb;
+    v_nao_encontradas text[] := '{}';
+begin
+    for v_mov in
+        select coalesce(m.estoque_id, (select min(e.id) from public.estoque e where e.nome = m.nome)) as estoque_id,
+               m.nome, m.tipo, coalesce(m.quantidade, 0) as quantidade, m.saldo,
+               m.chamado_id, m.nota_fiscal, m.observacao, m.username, m.ordem
+          from rows from (jsonb_to_recordset(p_movimentos)
+                   as (estoque_id bigint, nome text, tipo text, quantidade integer, saldo integer,
+                       chamado_id bigint, nota_fiscal text, observacao text, username text))
+               with ordinality as m(estoque_id, nome, tipo, quantidade, saldo,
+                                    chamado_id, nota_fiscal, observacao, username, ordem)
+         order by 1 nulls last, m.ordem
+    loop
+        select coalesce(e.quantidade, 0), e.nome
+          into v_anterior, v_nome
+          from public.estoque e
+         where e.id = v_mov.estoque_id
+           for update;
+
+        if not found then
+            v_nao_encontradas := v_nao_encontradas || coalesce(v_mov.nome, v_mov.estoque_id::text);
+            continue;
+        end if;
+
+        v_saldo := case v_mov.tipo
+            when 'entrada' then v_anterior + abs(v_mov.quantidade)
+            when 'saida' then greatest(v_anterior - abs(v_mov.quantidade), 0)
+            when 'ajuste' then greatest(coalesce(v_mov.saldo, v_anterior + v_mov.quantidade), 0)
+        end;
+        if v_saldo is null then
+            raise exception 'Tipo de movimento inválido: %', v_mov.tipo;
+        end if;
+
+        update public.estoque set quantidade = v_saldo where id = v_mov.estoque_id;
+
+        insert into public.estoque_movimentos
+               (estoque_id, peca_nome, tipo, quantidade, saldo_apos, chamado_id, nota_fiscal, observacao, username)
+        values (v_mov.estoque_id, v_nome, v_mov.tipo, v_saldo - v_anterior, v_saldo,
+                v_mov.chamado_id, v_mov.nota_fiscal, v_mov.observacao, v_mov.username)
+        returning id into v_id;
+
+        v_aplicados := v_aplicados || jsonb_build_object(
+            'id', v_id, 'estoque_id', v_mov.estoque_id, 'peca_nome', v_nome,
+            'quantidade', v_saldo - v_anterior, 'saldo_apos', v_saldo
+        );
+    end loop;
+
+    return jsonb_build_object('movimentos', v_aplicados, 'nao_encontradas', to_jsonb(v_nao_encontradas));
+end;
+$$;
+
+-- Cadastro de uma peça com o saldo inicial como movimento de entrada, na mesma transação.
+-- p_peca: {"nome", "descricao", "nota_fiscal", "data_adicao", "data_adicao_ts"}
+-- Retorna {"id", "saldo"}.
+create or replace function public.adicionar_peca(p_peca jsonb, p_quantidade integer default 0, p_username text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_id bigint;
+    v_saldo integer := 0;
+begin
+    insert into public.estoque (nome, quantidade, descricao, nota_fiscal, data_adicao, data_adicao_ts)
+    values (p_peca ->> 'nome', 0, p_peca ->> 'descricao', p_peca ->> 'nota_fiscal',
+            p_peca ->> 'data_adicao', (p_peca ->> 'data_adicao_ts')::timestamptz)
+    returning id into v_id;
+
+    if coalesce(p_quantidade, 0) > 0 then
+        select (public.aplicar_movimentos(jsonb_build_array(jsonb_build_object(
+                    'estoque_id', v_id, 'tipo', 'entrada', 'quantidade', p_quantidade,
+                    'nota_fiscal', nullif(p_peca ->> 'nota_fiscal', ''),
+                    'observacao', 'Cadastro da peça', 'username', p_username
+                ))) -> 'movimentos' -> 0 ->> 'saldo_apos')::integer
+          into v_saldo;
+    end if;
+
+    return jsonb_build_object('id', v_id, 'saldo', v_saldo);
+end;
+$$;
+
+-- Saldo inicial: um ajuste por peça com o saldo atual, para o livro fechar com estoque.quantidade
+insert into public.estoque_movimentos (estoque_id, peca_nome, tipo, quantidade, saldo_apos, observacao)
+select e.id, e.nome, 'ajuste', coalesce(e.quantidade, 0), coalesce(e.quantidade, 0), 'Saldo inicial'
+  from public.estoque e
+ where not exists (select 1 from public.estoque_movimentos m where m.estoque_id = e.id);
+
+-- finalizar_chamado_tx: a baixa das peças passa a ser uma saída no livro, ligada ao chamado
+create or replace function public.finalizar_chamado_tx(
+    p_chamado_id bigint,
+    p_solucao text,
+    p_hora_fechamento text,
+    p_pecas jsonb default '[]'::jsonb,
+    p_descricao text default null,
+    p_fechamento_ts timestamptz default now()
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_chamado public.chamados%rowtype;
+    v_baixa jsonb;
+begin
+    update public.chamados
+       set solucao = p_solucao,
+           hora_fechamento = p_hora_fechamento,
+           hora_fechamento_ts = p_fechamento_ts
+     where id = p_chamado_id
+       and hora_fechamento is null
+    returning * into v_chamado;
+
+    -- Chamado já finalizado (clique duplo ou fechamento concorrente): nada é gravado
+    -- de novo (peças, baixa no estoque, histórico) e o cliente não soma o rollup outra vez
+    if not found then
+        if exists (select 1 from public.chamados where id = p_chamado_id) then
+            raise exception 'Chamado % já está finalizado', p_chamado_id;
+        end if;
+        raise exception 'Chamado % não encontrado', p_chamado_id;
+    end if;
+
+    insert into public.pecas_usadas (chamado_id, peca_nome, data_uso, data_uso_ts)
+    select p_chamado_id, p.nome, p_hora_fechamento, p_fechamento_ts
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer)
+           cross join lateral generate_series(1, p.quantidade);
+
+    select public.aplicar_movimentos(coalesce(jsonb_agg(jsonb_build_object(
+               'nome', p.nome, 'tipo', 'saida', 'quantidade', p.quantidade,
+               'chamado_id', p_chamado_id, 'observacao', 'Chamado ' || coalesce(v_chamado.protocolo::text, p_chamado_id::text)
+           )), '[]'::jsonb))
+      into v_baixa
+      from jsonb_to_recordset(p_pecas) as p(nome text, quantidade integer);
+
+    if coalesce(v_chamado.patrimonio, '') <> '' then
+        insert into public.historico_manutencao (numero_patrimonio, descricao, data_manutencao, data_manutencao_ts)
+        values (v_chamado.patrimonio, p_descricao, p_hora_fechamento, p_fechamento_ts);
+    end if;
+
+    return jsonb_build_object(
+        'patrimonio', v_chamado.patrimonio,
+        'pecas_nao_encontradas', v_baixa -> 'nao_encontradas',
+        'ubs', v_chamado.ubs,
+        'setor', v_chamado.setor,
+        'tipo_defeito', v_chamado.tipo_defeito,
+        'hora_abertura', v_chamado.hora_abertura,
+        'hora_abertura_ts', v_chamado.hora_abertura_ts,
+        'hora_fechamento_ts', v_chamado.hora_fechamento_ts
+    );
+end;
+$$;
@@ -0,0 +1,61 @@
+-- 010_reconstruir_rollup.sql
+-- Reconstrução do chamados_rollup (006) inteiramente no servidor, em uma transação
+-- ("python rollup.py --rebuild"). Antes o cliente lia os chamados em páginas, chamava
+-- limpar_rollup e regravava em lotes: deltas de incrementar_rollup que chegavam entre
+-- a leitura e o truncate se perdiam, e um upsert concorrente podia derrubar um lote
+-- no meio, deixando a tabela pela metade para o Dashboard e os Relatórios.
+--
+-- O truncate trava a tabela (access exclusive) antes da leitura dos chamados: as
+-- chamadas de incrementar_rollup em andamento terminam antes, e as novas esperam o
+-- commit e são somadas ao resultado reconstruído. Mesma regra de rollup.calcular_rollup:
+-- dia/hora no horário de Fortaleza, texto legado quando *_ts é nulo (converter_data_texto,
+-- 005), tempo útil por segundos_uteis (007) e chamados sem abertura válida ignorados.
+-- Retorna a quantidade de linhas gravadas.
+create or replace function public.reconstruir_rollup()
+returns integer
+language plpgsql
+as $$
+declare
+    v_total integer;
+begin
+    truncate public.chamados_rollup;
+
+    insert into public.chamados_rollup
+           (dia, hora, ubs, setor, tipo_defeito, aberturas, fechados, soma_uteis_seg, fechamentos)
+    with base as (
+        select coalesce(c.ubs, '') as ubs, coalesce(c.setor, '') as setor,
+               coalesce(c.tipo_defeito, '') as tipo_defeito,
+               coalesce(c.hora_abertura_ts, public.converter_data_texto(c.hora_abertura)) as abertura,
+               coalesce(c.hora_fechamento_ts, public.converter_data_texto(c.hora_fechamento)) as fechamento
+          from public.chamados c
+    ), validos as (
+        select * from base where abertura is not null
+    ), eventos as (
+        select (abertura at time zone 'America/Fortaleza')::date as dia,
+               extract(hour from abertura at time zone 'America/Fortaleza')::smallint as hora,
+               ubs, setor, tipo_defeito,
+               1 as aberturas,
+               (fechamento is not null)::integer as fechados,
+               coalesce(public.segundos_uteis(abertura, fechamento), 0) as soma_uteis_seg,
+               0 as fechamentos
+          from validos
+        union all
+        select (fechamento at time zone 'America/Fortaleza')::date,
+               extract(hour from fechamento at time zone 'America/Fortaleza')::smallint,
+               ubs, setor, tipo_defeito, 0, 0, 0, 1
+          from validos
+         where fechamento is not null
+    )
+    select dia, hora, ubs, setor, tipo_defeito,
+           sum(aberturas), sum(fechados), sum(soma_uteis_seg), sum(fechamentos)
+      from eventos
+     group by dia, hora, ubs, setor, tipo_defeito;
+
+    get diagnostics v_total = row_count;
+    return v_total;
+end;
+$$;
+
+-- Preenche o rollup já na implantação: sem isso o Dashboard (mensal/semanal) e os
+-- Relatórios ficam vazios até alguém rodar "python rollup.py --rebuild".
+select public.reconstruir_rollup();
@@ -1,11 +1,21 @@
 # supabase_client.py
 import os
-from supabase import create_client, Client
+from supabase import create_client
+
+from instrumentacao import instrumentar
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception("Configure SUPABASE_URL e SUPABASE_KEY nas variáveis de ambiente.")
+if os.getenv("SUPABASE_FAKE"):
+    # Banco em memória para testes de carga locais (ver supabase_fake.py)
+    from supabase_fake import criar_cliente_fake
+    _cliente = criar_cliente_fake()
+else:
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise Exception("Configure SUPABASE_URL e SUPABASE_KEY nas variáveis de ambiente.")
+
+    _cliente = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Requisições registradas por página/fluxo (ver instrumentacao.py)
+supabase = instrumentar(_cliente)
@@ -0,0 +1,760 @@
+# supabase_fake.py — cliente Supabase em memória para testes de carga e contagem de round trips
+#
+# Ativado por SUPABASE_FAKE=1 (ver supabase_client.py). Variáveis opcionais:
+#   SUPABASE_FAKE_DADOS       JSON {"tabela": [linhas, ...]} carregado na criação
+#   SUPABASE_FAKE_LATENCIA_MS latência simulada por requisição (padrão 0)
+#   SUPABASE_FAKE_JITTER_MS   variação aleatória somada à latência (padrão 0)
+#   SUPABASE_FAKE_MAX_LINHAS  limite de linhas por resposta, como o max-rows do PostgREST (padrão 1000)
+import copy
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Tabelas cujo updated_at é mantido por trigger no banco (sql/002_chamados_updated_at.sql)
+TABELAS_COM_UPDATED_AT = {"chamados"}
+
+
+class APIResponse:
+    """
+    Mesmo formato da resposta do postgrest-py: .data (lista/objeto) e .count.
+    """
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self):
+        return f"APIResponse(data={self.data!r}, count={self.count!r})"
+
+
+# =====================================================
+# Filtros
+# =====================================================
+def _coagir(valor_linha, valor):
+    """
+    Converte o valor do filtro (muitas vezes texto, como na URL do PostgREST)
+    para o tipo do valor da linha antes de comparar.
+    """
+    if valor is None or valor_linha is None or isinstance(valor_linha, str):
+        return valor if not isinstance(valor_linha, str) or valor is None else str(valor)
+    if isinstance(valor, str):
+        try:
+            if isinstance(valor_linha, bool):
+                return valor.lower() == "true"
+            if isinstance(valor_linha, int):
+                return int(valor)
+            if isinstance(valor_linha, float):
+                return float(valor)
+        except ValueError:
+            return valor
+    return valor
+
+
+def _like(padrao, sem_caixa):
+    regex = "^" + re.escape(padrao).replace("%", ".*").replace(r"\*", ".*").replace("_", ".") + "$"
+    return re.compile(regex, re.IGNORECASE if sem_caixa else 0)
+
+
+_ISO_COM_FUSO = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}.*([+-]\d{2}:?\d{2}|Z)$")
+
+
+@functools.lru_cache(maxsize=65536)
+def _instante(texto):
+    return datetime.fromisoformat(texto.replace("Z", "+00:00"))
+
+
+def _como_instantes(atual, alvo):
+    """
+    timestamptz chega como texto ISO com fuso; valores com fusos diferentes
+    ("+00:00" e "-03:00") só se comparam corretamente como instantes.
+    """
+    if isinstance(atual, str) and isinstance(alvo, str) and _ISO_COM_FUSO.match(atual) and _ISO_COM_FUSO.match(alvo):
+        try:
+            return _instante(atual), _instante(alvo)
+        except ValueError:
+            pass
+    return atual, alvo
+
+
+def _avaliar(linha, coluna, operador, valor):
+    atual = linha.get(coluna)
+    if operador == "is":
+        if valor in (None, "null"):
+            return atual is None
+        return atual is (str(valor).lower() == "true")
+    if operador == "in":
+        return atual is not None and atual in [_coagir(atual, v) for v in valor]
+    if atual is None:
+        return False
+    alvo = _coagir(atual, valor)
+    if operador in ("gt", "gte", "lt", "lte"):
+        atual, alvo = _como_instantes(atual, alvo)
+    try:
+        if operador == "eq":
+            return atual == alvo
+        if operador == "neq":
+            return atual != alvo
+        if operador == "gt":
+            return atual > alvo
+        if operador == "gte":
+            return atual >= alvo
+        if operador == "lt":
+            return atual < alvo
+        if operador == "lte":
+            return atual <= alvo
+        if operador in ("like", "ilike"):
+            return bool(_like(str(valor), operador == "ilike").match(str(atual)))
+        if operador == "cs":
+            return all(v in (atual or []) for v in valor)
+    except TypeError:
+        return False
+    raise NotImplementedError(f"Operador '{operador}' não suportado pelo cliente fake")
+
+
+def _dividir(expr):
+    """
+    Divide 'expr' nas vírgulas de nível superior (fora de parênteses e aspas).
+    """
+    partes, atual, nivel, aspas = [], [], 0, False
+    for ch in expr:
+        if ch == '"':
+            aspas = not aspas
+        elif not aspas and ch == "(":
+            nivel += 1
+        elif not aspas and ch == ")":
+            nivel -= 1
+        if ch == "," and nivel == 0 and not aspas:
+            partes.append("".join(atual))
+            atual = []
+        else:
+            atual.append(ch)
+    partes.append("".join(atual))
+    return [p.strip() for p in partes if p.strip()]
+
+
+def _compilar_logico(expr):
+    """
+    Compila a sintaxe do or_/and do PostgREST ('a.gt.1,and(b.eq."x",c.is.null)')
+    em uma função linha -> bool.
+    """
+    termos = []
+    for parte in _dividir(expr):
+        grupo = re.match(r"^(not\.)?(and|or)\((.*)\)$", parte)
+        if grupo:
+            negar, tipo, interno = grupo.groups()
+            sub = _compilar_logico(interno)
+            juncao = all if tipo == "and" else any
+            termos.append(lambda l, s=sub, j=juncao, n=bool(negar): (j(f(l) for f in s)) != n)
+            continue
+        coluna, resto = parte.split(".", 1)
+        negar = resto.startswith("not.")
+        if negar:
+            resto = resto[4:]
+        operador, valor = resto.split(".", 1)
+        if valor.startswith('"') and valor.endswith('"'):
+            valor = valor[1:-1]
+        if operador == "in":
+            valor = [v.strip('"') for v in _dividir(valor.strip("()"))]
+        elif operador == "is" and valor == "null":
+            valor = None
+        termos.append(lambda l, c=coluna, o=operador, v=valor, n=negar: _avaliar(l, c, o, v) != n)
+    return termos
+
+
+# =====================================================
+# Consulta (table(...).select/insert/update/delete ...)
+# =====================================================
+class _Consulta:
+    def __init__(self, cliente, tabela):
+        self._cliente = cliente
+        self._tabela = tabela
+        self._operacao = "select"
+        self._colunas = "*"
+        self._valores = None
+        self._upsert_conflito = None
+        self._count = None
+        self._head = False
+        self._filtros = []
+        self._ordem = []
+        self._limite = None
+        self._inicio = 0
+        self._negar_proximo = False
+        self._unico = False
+
+    # ----- operações -----
+    def select(self, *colunas, count=None, head=False):
+        self._operacao = "select"
+        self._colunas = ",".join(colunas) if colunas else "*"
+        self._count = count
+        self._head = head
+        return self
+
+    def insert(self, valores, **_):
+        self._operacao = "insert"
+        self._valores = valores
+        return self
+
+    def upsert(self, valores, on_conflict="id", **_):
+        self._operacao = "upsert"
+        self._valores = valores
+        self._upsert_conflito = [c.strip() for c in on_conflict.split(",")]
+        return self
+
+    def update(self, valores, **_):
+        self._operacao = "update"
+        self._valores = valores
+        return self
+
+    def delete(self, **_):
+        self._operacao = "delete"
+        return self
+
+    # ----- filtros -----
+    @property
+    def not_(self):
+        self._negar_proximo = True
+        return self
+
+    def _filtro(self, coluna, operador, valor):
+        negar, self._negar_proximo = self._negar_proximo, False
+        self._filtros.append(lambda l: _avaliar(l, coluna, operador, valor) != negar)
+        return self
+
+    def eq(self, coluna, valor):
+        return self._filtro(coluna, "eq", valor)
+
+    def neq(self, coluna, valor):
+        return self._filtro(coluna, "neq", valor)
+
+    def gt(self, coluna, valor):
+        return self._filtro(coluna, "gt", valor)
+
+    def gte(self, coluna, valor):
+        return self._filtro(coluna, "gte", valor)
+
+    def lt(self, coluna, valor):
+        return self._filtro(coluna, "lt", valor)
+
+    def lte(self, coluna, valor):
+        return self._filtro(coluna, "lte", valor)
+
+    def like(self, coluna, padrao):
+        return self._filtro(coluna, "like", padrao)
+
+    def ilike(self, coluna, padrao):
+        return self._filtro(coluna, "ilike", padrao)
+
+    def in_(self, coluna, valores):
+        return self._filtro(coluna, "in", list(valores))
+
+    def is_(self, coluna, valor):
+        return self._filtro(coluna, "is", valor)
+
+    def contains(self, coluna, valores):
+        return self._filtro(coluna, "cs", list(valores))
+
+    def match(self, criterios):
+        for coluna, valor in criterios.items():
+            self.eq(coluna, valor)
+        return self
+
+    def or_(self, expr, reference_table=None):
+        termos = _compilar_logico(expr)
+        negar, self._negar_proximo = self._negar_proximo, False
+        self._filtros.append(lambda l: any(t(l) for t in termos) != negar)
+        return self
+
+    # ----- modificadores -----
+    def order(self, coluna, desc=False, nullsfirst=None, **_):
+        self._ordem.append((coluna, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, quantidade, **_):
+        self._limite = quantidade
+        return self
+
+    def range(self, inicio, fim, **_):
+        self._inicio = inicio
+        self._limite = fim - inicio + 1
+        return self
+
+    def single(self):
+        self._unico = True
+        return self
+
+    def execute(self):
+        return self._cliente._executar(self)
+
+
+class FakeSupabase:
+    """
+    Implementa o subconjunto da API do supabase-py usado no app, sobre tabelas em memória.
+    Cada execute() conta como um round trip; as estatísticas ficam em estatisticas().
+    """
+    def __init__(self, dados=None, latencia_ms=0.0, jitter_ms=0.0, max_linhas=1000):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.max_linhas = max_linhas
+        self._tabelas = defaultdict(list)
+        self._proximo_id = defaultdict(int)
+        self._rpcs = dict(RPCS_PADRAO)
+        self._views = dict(VIEWS_PADRAO)
+        self._lock = threading.RLock()
+        self.zerar_estatisticas()
+        for tabela, linhas in (dados or {}).items():
+            self.carregar(tabela, linhas)
+
+    # ----- dados -----
+    def carregar(self, tabela, linhas):
+        """
+        Substitui o conteúdo de 'tabela' (lista de dicts ou DataFrame).
+        """
+        if hasattr(linhas, "to_dict"):
+            linhas = linhas.astype(object).where(linhas.notna(), None).to_dict("records")
+        with self._lock:
+            self._tabelas[tabela] = [dict(l) for l in linhas]
+            if tabela in TABELAS_COM_UPDATED_AT:
+                # default now() da coluna (sql/002_chamados_updated_at.sql)
+                carimbo = datetime.now(timezone.utc).isoformat()
+                for linha in self._tabelas[tabela]:
+                    linha.setdefault("updated_at", carimbo)
+            ids = [l["id"] for l in self._tabelas[tabela] if isinstance(l.get("id"), int)]
+            self._proximo_id[tabela] = max(ids, default=0)
+
+    def linhas(self, tabela):
+        return self._tabelas[tabela]
+
+    def registrar_rpc(self, nome, funcao):
+        """
+        'funcao(cliente, params)' roda no "servidor": acessa as tabelas sem contar round trips.
+        """
+        self._rpcs[nome] = funcao
+
+    def registrar_view(self, nome, funcao):
+        """
+        'funcao(cliente)' devolve as linhas da view, calculadas a cada consulta.
+        """
+        self._views[nome] = funcao
+
+    # ----- estatísticas -----
+    def zerar_estatisticas(self):
+        with getattr(self, "_lock", threading.RLock()):
+            self._estatisticas = {
+                "chamadas": 0,
+                "linhas_retornadas": 0,
+                "por_operacao": defaultdict(lambda: {"chamadas": 0, "linhas": 0}),
+            }
+
+    def estatisticas(self):
+        """
+        {"chamadas": n, "linhas_retornadas": n, "por_operacao": {"select chamados": {...}, ...}}
+        """
+        with self._lock:
+            e = self._estatisticas
+            return {
+                "chamadas": e["chamadas"],
+                "linhas_retornadas": e["linhas_retornadas"],
+                "por_operacao": {k: dict(v) for k, v in sorted(e["por_operacao"].items())},
+            }
+
+    def _contabilizar(self, operacao, linhas):
+        with self._lock:
+            self._estatisticas["chamadas"] += 1
+            self._estatisticas["linhas_retornadas"] += linhas
+            item = self._estatisticas["por_operacao"][operacao]
+            item["chamadas"] += 1
+            item["linhas"] += linhas
+
+    def _esperar(self):
+        atraso = self.latencia_ms + (random.random() * self.jitter_ms if self.jitter_ms else 0.0)
+        if atraso > 0:
+            time.sleep(atraso / 1000.0)
+
+    # ----- API -----
+    def table(self, nome):
+        return _Consulta(self, nome)
+
+    from_ = table
+
+    def rpc(self, nome, params=None):
+        cliente = self
+
+        class _ChamadaRPC:
+            def execute(self_rpc):
+                cliente._esperar()
+                if nome not in cliente._rpcs:
+                    raise Exception(f"Could not find the function public.{nome} in the schema cache")
+                with cliente._lock:
+                    dados = cliente._rpcs[nome](cliente, params or {})
+                quantidade = len(dados) if isinstance(dados, list) else (0 if dados is None else 1)
+                cliente._contabilizar(f"rpc {nome}", quantidade)
+                return APIResponse(dados)
+
+        return _ChamadaRPC()
+
+    # ----- execução -----
+    def _selecionar(self, consulta):
+        if consulta._tabela in self._views:
+            origem = self._views[consulta._tabela](self)
+        else:
+            origem = self._tabelas[consulta._tabela]
+        return [l for l in origem if all(f(l) for f in consulta._filtros)]
+
+    @staticmethod
+    def _ordenar(linhas, ordem):
+        for coluna, desc, nulos_primeiro in reversed(ordem):
+            com_valor = [l for l in linhas if l.get(coluna) is not None]
+            nulos = [l for l in linhas if l.get(coluna) is None]
+            com_valor.sort(key=lambda l: l[coluna], reverse=desc)
+            linhas = nulos + com_valor if nulos_primeiro else com_valor + nulos
+        return linhas
+
+    @staticmethod
+    def _projetar(linhas, colunas):
+        nomes = [c.strip() for c in colunas.split(",") if c.strip()]
+        if not nomes or "*" in nomes:
+            return [dict(l) for l in linhas]
+        return [{c: l.get(c) for c in nomes} for l in linhas]
+
+    def _novo_id(self, tabela):
+        self._proximo_id[tabela] += 1
+        return self._proximo_id[tabela]
+
+    def _carimbar(self, tabela, linha):
+        if tabela in TABELAS_COM_UPDATED_AT:
+            linha["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+    def _executar(self, consulta):
+        self._esperar()
+        tabela, operacao = consulta._tabela, consulta._operacao
+        with self._lock:
+            if operacao == "select":
+                linhas = self._selecionar(consulta)
+                total = len(linhas)
+                linhas = self._ordenar(linhas, consulta._ordem)
+                fim = len(linhas) if consulta._limite is None else consulta._inicio + consulta._limite
+                linhas = linhas[consulta._inicio:fim][: self.max_linhas]
+                dados = [] if consulta._head else self._projetar(linhas, consulta._colunas)
+                count = total if consulta._count else None
+            elif operacao in ("insert", "upsert"):
+                valores = consulta._valores if isinstance(consulta._valores, list) else [consulta._valores]
+                dados = []
+                for valor in valores:
+                    linha = copy.deepcopy(valor)
+                    existente = None
+                    if operacao == "upsert":
+                        chave = consulta._upsert_conflito
+                        existente = next(
+                            (l for l in self._tabelas[tabela] if all(l.get(c) == linha.get(c) for c in chave)), None
+                        )
+                    if existente is not None:
+                        existente.update(linha)
+                        linha = existente
+                    else:
+                        if linha.get("id") is None:
+                            linha["id"] = self._novo_id(tabela)
+                        elif isinstance(linha["id"], int):
+                            self._proximo_id[tabela] = max(self._proximo_id[tabela], linha["id"])
+                        self._tabelas[tabela].append(linha)
+                    self._carimbar(tabela, linha)
+                    dados.append(dict(linha))
+                count = None
+            elif operacao == "update":
+                dados = []
+                for linha in self._selecionar(consulta):
+                    linha.update(copy.deepcopy(consulta._valores))
+                    self._carimbar(tabela, linha)
+                    dados.append(dict(linha))
+                count = None
+            elif operacao == "delete":
+                removidas = self._selecionar(consulta)
+                ids = {id(l) for l in removidas}
+                self._tabelas[tabela] = [l for l in self._tabelas[tabela] if id(l) not in ids]
+                dados = [dict(l) for l in removidas]
+                count = None
+            else:
+                raise NotImplementedError(operacao)
+        if consulta._unico:
+            if len(dados) != 1:
+                raise Exception(f"JSON object requested, multiple (or no) rows returned ({len(dados)})")
+            dados = dados[0]
+        self._contabilizar(f"{operacao} {tabela}", len(dados) if isinstance(dados, list) else 1)
+        return APIResponse(dados, count)
+
+
+# =====================================================
+# RPCs e views do banco (equivalentes aos arquivos em sql/)
+# =====================================================
+def _rpc_alocar_protocolos(cliente, params):
+    contador = cliente._tabelas["protocolo_contador"]
+    if not contador:
+        ultimo = max((l.get("protocolo") or 0 for l in cliente._tabelas["chamados"]), default=0)
+        contador.append({"id": 1, "ultimo": ultimo})
+    inicio = contador[0]["ultimo"] + 1
+    contador[0]["ultimo"] += int(params.get("p_quantidade", 1))
+    return inicio
+
+
+def _rpc_aplicar_movimentos(cliente, params):
+    estoque = cliente._tabelas["estoque"]
+    por_id = {l["id"]: l for l in estoque}
+
+    def _estoque_id(mov):
+        if mov.get("estoque_id") is not None:
+            return mov["estoque_id"]
+        ids = [l["id"] for l in estoque if l.get("nome") == mov.get("nome")]
+        return min(ids) if ids else None
+
+    # Mesma ordem de sql/009 (id da peça, sem id por último; empate pela posição no lote)
+    movimentos = sorted(
+        ((_estoque_id(m), i, m) for i, m in enumerate(params.get("p_movimentos") or [])),
+        key=lambda t: (t[0] is None, t[0] or 0, t[1]),
+    )
+    aplicados, nao_encontradas = [], []
+    for estoque_id, _, mov in movimentos:
+        item = por_id.get(estoque_id)
+        if item is None:
+            nao_encontradas.append(mov.get("nome") or str(estoque_id))
+            continue
+        anterior = item.get("quantidade") or 0
+        quantidade = int(mov.get("quantidade") or 0)
+        if mov.get("tipo") == "entrada":
+            saldo = anterior + abs(quantidade)
+        elif mov.get("tipo") == "saida":
+            saldo = max(anterior - abs(quantidade), 0)
+        elif mov.get("tipo") == "ajuste":
+            saldo = max(mov["saldo"] if mov.get("saldo") is not None else anterior + quantidade, 0)
+        else:
+            raise Exception(f"Tipo de movimento inválido: {mov.get('tipo')}")
+        item["quantidade"] = saldo
+        linha = {
+            "id": cliente._novo_id("estoque_movimentos"), "estoque_id": estoque_id, "peca_nome": item.get("nome"),
+            "tipo": mov["tipo"], "quantidade": saldo - anterior, "saldo_apos": saldo,
+            **{c: mov.get(c) for c in ("chamado_id", "nota_fiscal", "observacao", "username")},
+            "criado_em": datetime.now(timezone.utc).isoformat(),
+        }
+        cliente._tabelas["estoque_movimentos"].append(linha)
+        aplicados.append({c: linha[c] for c in ("id", "estoque_id", "peca_nome", "quantidade", "saldo_apos")})
+    return {"movimentos": aplicados, "nao_encontradas": nao_encontradas}
+
+
+def _rpc_adicionar_peca(cliente, params):
+    peca = params["p_peca"]
+    item = {
+        "id": cliente._novo_id("estoque"), "quantidade": 0,
+        **{c: peca.get(c) for c in ("nome", "descricao", "nota_fiscal", "data_adicao", "data_adicao_ts")},
+    }
+    cliente._tabelas["estoque"].append(item)
+    quantidade = int(params.get("p_quantidade") or 0)
+    if quantidade > 0:
+        _rpc_aplicar_movimentos(cliente, {"p_movimentos": [{
+            "estoque_id": item["id"], "tipo": "entrada", "quantidade": quantidade,
+            "nota_fiscal": peca.get("nota_fiscal") or None, "observacao": "Cadastro da peça",
+            "username": params.get("p_username"),
+        }]})
+    return {"id": item["id"], "saldo": item["quantidade"]}
+
+
+def _rpc_finalizar_chamado_tx(cliente, params):
+    chamado = next((l for l in cliente._tabelas["chamados"] if l.get("id") == params["p_chamado_id"]), None)
+    if chamado is None:
+        raise Exception(f"Chamado {params['p_chamado_id']} não encontrado")
+    if chamado.get("hora_fechamento") is not None:
+        raise Exception(f"Chamado {params['p_chamado_id']} já está finalizado")
+    fechamento_ts = params.get("p_fechamento_ts") or datetime.now(timezone.utc).isoformat()
+    chamado.update({
+        "solucao": params.get("p_solucao"),
+        "hora_fechamento": params.get("p_hora_fechamento"),
+        "hora_fechamento_ts": fechamento_ts,
+    })
+    cliente._carimbar("chamados", chamado)
+
+    pecas = params.get("p_pecas") or []
+    for peca in pecas:
+        for _ in range(int(peca["quantidade"])):
+            cliente._tabelas["pecas_usadas"].append({
+                "id": cliente._novo_id("pecas_usadas"), "chamado_id": chamado["id"], "peca_nome": peca["nome"],
+                "data_uso": params.get("p_hora_fechamento"), "data_uso_ts": fechamento_ts,
+            })
+    baixa = _rpc_aplicar_movimentos(cliente, {"p_movimentos": [
+        {"nome": peca["nome"], "tipo": "saida", "quantidade": peca["quantidade"], "chamado_id": chamado["id"],
+         "observacao": f"Chamado {chamado.get('protocolo') or chamado['id']}"}
+        for peca in pecas
+    ]})
+    nao_encontradas = baixa["nao_encontradas"]
+
+    if chamado.get("patrimonio"):
+        cliente._tabelas["historico_manutencao"].append({
+            "id": cliente._novo_id("historico_manutencao"), "numero_patrimonio": chamado["patrimonio"],
+            "descricao": params.get("p_descricao"), "data_manutencao": params.get("p_hora_fechamento"),
+            "data_manutencao_ts": fechamento_ts,
+        })
+    return {
+        "patrimonio": chamado.get("patrimonio"),
+        "pecas_nao_encontradas": nao_encontradas,
+        **{c: chamado.get(c) for c in ("ubs", "setor", "tipo_defeito", "hora_abertura", "hora_abertura_ts", "hora_fechamento_ts")},
+    }
+
+
+def _rpc_incrementar_rollup(cliente, params):
+    chaves = ("dia", "hora", "ubs", "setor", "tipo_defeito")
+    metricas = ("aberturas", "fechados", "soma_uteis_seg", "fechamentos")
+    linhas = cliente._tabelas["chamados_rollup"]
+    indice = {tuple(l[c] for c in chaves): l for l in linhas}
+    for delta in params.get("p_deltas") or []:
+        chave = tuple((delta.get(c) if c in ("dia", "hora") else delta.get(c) or "") for c in chaves)
+        linha = indice.get(chave)
+        if linha is None:
+            linha = {"id": cliente._novo_id("chamados_rollup"), **dict(zip(chaves, chave)), **{m: 0 for m in metricas}}
+            linhas.append(linha)
+            indice[chave] = linha
+        for m in metricas:
+            linha[m] += delta.get(m) or 0
+    return None
+
+
+def _rpc_limpar_rollup(cliente, params):
+    cliente._tabelas["chamados_rollup"] = []
+    return None
+
+
+def _rpc_reconstruir_rollup(cliente, params):
+    # Mesma regra de sql/010: calcular_rollup sobre todos os chamados, de uma vez
+    from rollup import calcular_rollup
+
+    rollup = calcular_rollup(pd.DataFrame(cliente._tabelas["chamados"]))
+    rollup["dia"] = rollup["dia"].astype(str)
+    cliente._tabelas["chamados_rollup"] = [
+        {"id": cliente._novo_id("chamados_rollup"), **linha}
+        for linha in json.loads(rollup.to_json(orient="records"))
+    ]
+    return len(rollup)
+
+
+def _rpc_backfill_datas(cliente, params):
+    from datas import parse_datas, para_iso
+
+    tabela, coluna = params["p_tabela"], params["p_coluna"]
+    apos_id, lote = int(params.get("p_apos_id", 0)), int(params.get("p_lote", 1000))
+    ids = sorted(l["id"] for l in cliente._tabelas[tabela] if l["id"] > apos_id)[:lote]
+    if not ids:
+        return {"atualizadas": 0, "ultimo_id": None}
+    ultimo = ids[-1]
+    pendentes = [
+        l for l in cliente._tabelas[tabela]
+        if apos_id < l["id"] <= ultimo and l.get(coluna + "_ts") is None and str(l.get(coluna) or "").strip()
+    ]
+    convertidas = parse_datas([l[coluna] for l in pendentes])
+    atualizadas = 0
+    for linha, valor in zip(pendentes, convertidas):
+        if not pd.isna(valor):
+            linha[coluna + "_ts"] = para_iso(valor)
+            atualizadas += 1
+    return {"atualizadas": atualizadas, "ultimo_id": ultimo}
+
+
+def _rpc_dashboard_resumo(cliente, params):
+    from datas import agora, coluna_data
+    from horas_uteis import calculate_working_hours_array
+
+    chamados = pd.DataFrame(cliente._tabelas["chamados"])
+    total = len(chamados)
+    abertos = chamados[chamados["hora_fechamento"].isna()] if total else chamados
+    # Como em sql/008_sla_deadline.sql: sla_deadline vencido; sem prazo, horas úteis > p_limite_horas
+    prazo = pd.to_datetime(abertos.get("sla_deadline", pd.Series(None, index=abertos.index, dtype=object)), utc=True)
+    segundos = calculate_working_hours_array(coluna_data(abertos, "hora_abertura"), agora()) if len(abertos) else []
+    limite = int(params.get("p_limite_horas", 48)) * 3600
+    vencidos = (prazo < pd.Timestamp.now(tz="UTC")).where(prazo.notna(), pd.Series(segundos, index=abertos.index, dtype=float) > limite)
+
+    rollup = pd.DataFrame(cliente._tabelas["chamados_rollup"], columns=["dia", "aberturas"])
+    dia = pd.to_datetime(rollup["dia"])
+    mensal = rollup.groupby(dia.dt.strftime("%Y-%m"))["aberturas"].sum()
+    semanal = rollup.groupby((dia - pd.to_timedelta(dia.dt.dayofweek, unit="D")).dt.strftime("%Y-%m-%d"))["aberturas"].sum()
+    return {
+        "total": total,
+        "abertos": len(abertos),
+        "fechados": total - len(abertos),
+        "atrasados": int(vencidos.sum()),
+        "mensal": [{"mes": k, "qtd_mensal": int(v)} for k, v in mensal.items() if v > 0],
+        "semanal": [{"semana": k, "qtd_semanal": int(v)} for k, v in semanal.items() if v > 0],
+    }
+
+
+def _rpc_recalcular_sla(cliente, params):
+    from datas import coluna_data, para_iso
+    from horas_uteis import add_working_hours_array
+
+    tipo, padrao = params.get("p_tipo_defeito"), float(params.get("p_horas_padrao", 48))
+    config = {l["tipo_defeito"]: float(l["horas_uteis"]) for l in cliente._tabelas["sla_config"]}
+    linhas = [
+        l for l in cliente._tabelas["chamados"]
+        if l.get("hora_fechamento") is None and (tipo is None or l.get("tipo_defeito") == tipo)
+    ]
+    if not linhas:
+        return 0
+    df = pd.DataFrame(linhas)
+    inicio = pd.to_datetime(df.get("sla_inicio_ts"), utc=True).dt.tz_convert("America/Fortaleza").dt.tz_localize(None) \
+        if "sla_inicio_ts" in df.columns else pd.Series(pd.NaT, index=df.index)
+    inicio = inicio.fillna(coluna_data(df, "hora_abertura"))
+    prazos = add_working_hours_array(inicio, [config.get(t, padrao) for t in df["tipo_defeito"]])
+    for linha, ini, prazo in zip(linhas, inicio, prazos):
+        linha["sla_inicio_ts"] = para_iso(ini) if not pd.isna(ini) else None
+        linha["sla_deadline"] = para_iso(pd.Timestamp(prazo)) if not pd.isna(prazo) else None
+        cliente._carimbar("chamados", linha)
+    return len(linhas)
+
+
+def _view_ubs_resumo(cliente):
+    inventario = defaultdict(int)
+    for l in cliente._tabelas["inventario"]:
+        inventario[l.get("localizacao")] += 1
+    chamados, abertos = defaultdict(int), defaultdict(int)
+    for l in cliente._tabelas["chamados"]:
+        chamados[l.get("ubs")] += 1
+        abertos[l.get("ubs")] += l.get("hora_fechamento") is None
+    return [
+        {"nome_ubs": u.get("nome_ubs"), "qtd_inventario": inventario[u.get("nome_ubs")],
+         "qtd_chamados": chamados[u.get("nome_ubs")], "chamados_abertos": abertos[u.get("nome_ubs")]}
+        for u in cliente._tabelas["ubs"]
+    ]
+
+
+RPCS_PADRAO = {
+    "adicionar_peca": _rpc_adicionar_peca,
+    "alocar_protocolos": _rpc_alocar_protocolos,
+    "aplicar_movimentos": _rpc_aplicar_movimentos,
+    "finalizar_chamado_tx": _rpc_finalizar_chamado_tx,
+    "incrementar_rollup": _rpc_incrementar_rollup,
+    "limpar_rollup": _rpc_limpar_rollup,
+    "reconstruir_rollup": _rpc_reconstruir_rollup,
+    "backfill_datas": _rpc_backfill_datas,
+    "dashboard_resumo": _rpc_dashboard_resumo,
+    "recalcular_sla": _rpc_recalcular_sla,
+}
+VIEWS_PADRAO = {
+    "ubs_resumo": _view_ubs_resumo,
+}
+
+
+def criar_cliente_fake():
+    """
+    Cria o cliente fake a partir das variáveis SUPABASE_FAKE_*.
+    """
+    dados = None
+    caminho = os.getenv("SUPABASE_FAKE_DADOS")
+    if caminho:
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    return FakeSupabase(
+        dados=dados,
+        latencia_ms=float(os.getenv("SUPABASE_FAKE_LATENCIA_MS", "0")),
+        jitter_ms=float(os.getenv("SUPABASE_FAKE_JITTER_MS", "0")),
+        max_linhas=int(os.getenv("SUPABASE_FAKE_MAX_LINHAS", "1000")),
+    )
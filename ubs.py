@@ -1,11 +1,44 @@
+import os
 import streamlit as st
-import pandas as pd
 from supabase_client import supabase
+from metricas import cronometrar
+from esquemas import tabela_chamados, tabela_inventario
 
+# Tempo (segundos) que as listas de referência ficam em cache no processo
+REFERENCE_CACHE_TTL = int(os.getenv("REFERENCE_CACHE_TTL", "600"))
+# Tempo (segundos) do cache de inventário/chamados exibidos por UBS
+UBS_DETALHES_CACHE_TTL = int(os.getenv("UBS_DETALHES_CACHE_TTL", "120"))
+
+@st.cache_data(ttl=REFERENCE_CACHE_TTL, show_spinner=False)
+def _fetch_ubs_list():
+    """
+    Lê os nomes das UBSs no Supabase. O resultado é compartilhado entre todas as
+    sessões do processo e invalidado pelas funções de escrita abaixo.
+    """
+    resp = supabase.table("ubs").select("nome_ubs").execute()
+    return [u["nome_ubs"] for u in resp.data] if resp.data else []
+
+def invalidate_ubs_cache():
+    _fetch_ubs_list.clear()
+    _fetch_inventario_por_ubs.clear()
+    _fetch_chamados_por_ubs.clear()
+
+def invalidate_inventario_ubs_cache():
+    """
+    Chamada após gravações no inventário (inventario.invalidate_inventario_cache).
+    """
+    _fetch_inventario_por_ubs.clear()
+
+def invalidate_chamados_ubs_cache():
+    """
+    Chamada após abrir, finalizar ou reabrir chamados, junto de snapshot.marcar_alteracao.
+    """
+    _fetch_chamados_por_ubs.clear()
+
+@cronometrar("fetch")
 def get_ubs_list():
     try:
-        resp = supabase.table("ubs").select("nome_ubs").execute()
-        return [u["nome_ubs"] for u in resp.data] if resp.data else []
+        return _fetch_ubs_list()
     except Exception as e:
         st.error("Erro ao recuperar UBSs.")
         print(f"Erro: {e}")
@@ -14,6 +47,7 @@ def get_ubs_list():
 def add_ubs(nome_ubs):
     try:
         supabase.table("ubs").insert({"nome_ubs": nome_ubs}).execute()
+        invalidate_ubs_cache()
         return True
     except Exception as e:
         st.error("Erro ao adicionar UBS.")
@@ -23,6 +57,7 @@ def add_ubs(nome_ubs):
 def remove_ubs(nome_ubs):
     try:
         supabase.table("ubs").delete().eq("nome_ubs", nome_ubs).execute()
+        invalidate_ubs_cache()
         return True
     except Exception as e:
         st.error("Erro ao remover UBS.")
@@ -32,16 +67,40 @@ def remove_ubs(nome_ubs):
 def update_ubs(old_name, new_name):
     try:
         supabase.table("ubs").update({"nome_ubs": new_name}).eq("nome_ubs", old_name).execute()
+        invalidate_ubs_cache()
         return True
     except Exception as e:
         st.error("Erro ao atualizar UBS.")
         print(f"Erro ao atualizar UBS: {e}")
         return False
 
-def get_inventario_por_ubs(ubs):
+@cronometrar("fetch")
+def get_resumo_ubs():
+    """
+    Retorna, em uma única consulta (view ubs_resumo), cada UBS com as contagens
+    de itens de inventário, chamados e chamados em aberto.
+    """
     try:
-        resp = supabase.table("inventario").select("*").eq("localizacao", ubs).execute()
+        resp = supabase.table("ubs_resumo").select("*").order("nome_ubs").execute()
         return resp.data if resp.data else []
+    except Exception as e:
+        st.error("Erro ao recuperar resumo das UBSs.")
+        print(f"Erro: {e}")
+        return []
+
+@st.cache_data(ttl=UBS_DETALHES_CACHE_TTL, show_spinner=False)
+def _fetch_inventario_por_ubs(ubs):
+    resp = supabase.table("inventario").select("*").eq("localizacao", ubs).execute()
+    return resp.data if resp.data else []
+
+@st.cache_data(ttl=UBS_DETALHES_CACHE_TTL, show_spinner=False)
+def _fetch_chamados_por_ubs(ubs):
+    resp = supabase.table("chamados").select("*").eq("ubs", ubs).execute()
+    return resp.data if resp.data else []
+
+def get_inventario_por_ubs(ubs):
+    try:
+        return _fetch_inventario_por_ubs(ubs)
     except Exception as e:
         st.error("Erro ao recuperar inventário.")
         print(f"Erro: {e}")
@@ -49,8 +108,7 @@ def get_inventario_por_ubs(ubs):
 
 def get_chamados_por_ubs(ubs):
     try:
-        resp = supabase.table("chamados").select("*").eq("ubs", ubs).execute()
-        return resp.data if resp.data else []
+        return _fetch_chamados_por_ubs(ubs)
     except Exception as e:
         st.error("Erro ao recuperar chamados técnicos.")
         print(f"Erro: {e}")
@@ -61,16 +119,25 @@ def manage_ubs():
     action = st.selectbox("Ação", ["Listar", "Adicionar", "Editar", "Remover"])
     
     if action == "Listar":
-        ubs = get_ubs_list()
-        if ubs:
-            # Exibe cada UBS em um expander para que o usuário possa clicar e visualizar os detalhes
-            for ubs_item in ubs:
-                with st.expander(f"{ubs_item}"):
+        resumo = get_resumo_ubs()
+        if resumo:
+            # Exibe cada UBS em um expander com as contagens; os detalhes só são
+            # consultados quando o usuário pede (e ficam em cache por UBS)
+            for item in resumo:
+                ubs_item = item["nome_ubs"]
+                titulo = (
+                    f"{ubs_item} — {item['qtd_inventario']} itens | "
+                    f"{item['qtd_chamados']} chamados ({item['chamados_abertos']} em aberto)"
+                )
+                with st.expander(titulo):
+                    if not st.toggle("Carregar detalhes", key=f"ubs_detalhes_{ubs_item}"):
+                        continue
+
                     # Consulta e exibe informações do inventário associadas à UBS
                     inventario = get_inventario_por_ubs(ubs_item)
                     if inventario:
                         st.markdown("**Inventário:**")
-                        df_inv = pd.DataFrame(inventario)
+                        df_inv = tabela_inventario(inventario)
                         st.dataframe(df_inv)
                     else:
                         st.write("Nenhum item de inventário encontrado.")
@@ -79,7 +146,7 @@ def manage_ubs():
                     chamados = get_chamados_por_ubs(ubs_item)
                     if chamados:
                         st.markdown("**Chamados Técnicos:**")
-                        df_chamados = pd.DataFrame(chamados)
+                        df_chamados = tabela_chamados(chamados)
                         st.dataframe(df_chamados)
                     else:
                         st.write("Nenhum chamado técnico encontrado.")